@@ -0,0 +1,63 @@
+import json
+from itertools import groupby
+from tqdm import tqdm
+from lib import ErrorHandler, Util, DatasetCatalog, CorrelationAccumulator, accumulate_files, device_accumulator, plot_correlation
+
+if __name__ == '__main__':
+    try:
+        # 設定ファイルの読み込み
+        with open(f'{Util.get_root_dir()}/config/config.json', 'r') as f:
+            config = json.load(f)
+
+        # 相関分析の設定（対象の処理段階・データ種別，ヒートマップを描画するか，並列数）
+        correlation_config = config.get("Correlation", {})
+        stage       = correlation_config.get("Stage", "preprocessed-data")
+        plot        = correlation_config.get("Plot", False)
+        devices     = config["FieldDevice"]["Pcap"]
+        result_dir  = f'{Util.get_root_dir()}/data/analysis/correlation'
+
+        with DatasetCatalog() as catalog:
+            catalog.refresh(stages=[stage])
+            for kind in correlation_config.get("Kinds", ["amp", "pha"]):
+                # デバイスごとのサブキャリア間の相関（ファイルごとの累積値をキャッシュし，日ごと・全期間で統合）
+                for device in tqdm(devices):
+                    artifacts    = catalog.query(stage=stage, kind=kind, devices=[device], fmt="csv")
+                    accumulators = accumulate_files(
+                        paths       = [f"{catalog.data_dir}/{artifact['path']}" for artifact in artifacts],
+                        cache_dir   = f"{result_dir}/{device}/{kind}/files",
+                        max_workers = correlation_config.get("MaxWorkers")
+                    )
+                    daily = {}
+                    for date, group in groupby(artifacts, key=lambda artifact: artifact["name"][:10]):
+                        daily[date] = CorrelationAccumulator.merge_all([accumulators[f"{catalog.data_dir}/{artifact['path']}"] for artifact in group])
+                        daily[date].save(f"{result_dir}/{device}/{kind}/{date}.npz")
+                    if not daily:
+                        continue
+                    total = CorrelationAccumulator.merge_all(list(daily.values()))
+                    total.save(f"{result_dir}/{device}/{kind}/total.npz")
+
+                    # ヒートマップは指定された場合のみ描画
+                    if plot:
+                        for date, accumulator in list(daily.items()) + [("total", total)]:
+                            plot_correlation(accumulator.correlation(), accumulator.columns,
+                                             save_path = f"{Util.get_root_dir()}/documents/heatmap/{device}/{kind}/{date}.png",
+                                             title     = f"Correlation Coefficient Heatmap of {device} {date}")
+
+                # デバイス間の相関（全デバイスに共通するファイルで統合）
+                common_file = catalog.common_files(stage=stage, kind=kind, devices=devices)
+                if not common_file:
+                    continue
+                total = CorrelationAccumulator.merge_all([
+                    device_accumulator({device: catalog.get_path(stage, device, file_name, kind=kind) for device in devices})
+                    for file_name in tqdm(common_file)
+                ])
+                total.save(f"{result_dir}/devices/{kind}.npz")
+                if plot:
+                    plot_correlation(total.correlation(), total.columns,
+                                     save_path = f"{Util.get_root_dir()}/documents/heatmap/devices/{kind}.png",
+                                     title     = f"Correlation Coefficient Heatmap between Devices ({kind})")
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f'{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log')
+        handler.handle_error(e)
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import importlib
+import numpy as np
+import pandas as pd
+
+from lib import Util, TimeAdjuster, PhaSignalProcessor, ChunkedTimeAdjuster, ChunkedPhaSignalProcessor
+from lib.pcap_generator import generate_pcap, generate_capture_set
+from decode_pcap2csv import decode_pcap2csv
+
+# ベンチマークの登録先（名前 -> ケース関数）
+BENCHMARKS = {}
+
+def benchmark(name: str):
+    """ベンチマークケースを登録するデコレータ（ケース関数は計測対象の関数を返す．必要なデータがない場合はNone）"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+def measure(func, repeat: int) -> dict:
+    """関数をrepeat回実行し，実行時間の統計量を返す"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": float(np.median(times)), "repeat": repeat}
+
+def generate_large_pcap(path: str, nframes: int, block_frames: int = 20000, rate: float = 100.0) -> str:
+    """
+    大きな160MHzのキャプチャを生成する（1ブロック分を生成し，受信時刻を秒単位でずらしながら繰り返し書き込む）
+
+    合成データの生成はフレーム数に比例してメモリを使うため，数GBのファイルもブロック単位で書き込む．
+    """
+    block_frames = min(block_frames, nframes)
+    block_path   = generate_pcap(f"{path}.block", bandwidth=160, nframes=block_frames, rate=rate, jitter=0.0005)
+    with open(block_path, "rb") as f:
+        header = f.read(24)
+        block  = np.frombuffer(f.read(), dtype=np.uint8)
+    os.remove(block_path)
+    records = block.reshape(block_frames, -1)                                 # 全レコードが同じ長さ
+    shift   = int(np.ceil(block_frames / rate)) + 1                           # ブロックごとにずらす秒数
+    with open(path, "wb") as f:
+        f.write(header)
+        for i in range(0, nframes, block_frames):
+            chunk = records[:min(block_frames, nframes - i)].copy()
+            chunk[:, 0:4] = (chunk[:, 0:4].copy().view("<u4") + (i // block_frames) * shift).view(np.uint8)
+            chunk.tofile(f)
+    return path
+
+def prepare_fixtures(work_dir: str, nframes: int, large_frames: int = 0, workers: int = None) -> dict:
+    """ベンチマーク用の合成データを生成する（large_framesを指定すると並列読み取り用の大きなキャプチャも生成）"""
+    decoder  = importlib.import_module("lib.interleaved")
+    fixtures = {"work_dir": work_dir, "pcap": {}, "workers": workers or os.cpu_count() or 1}
+    if large_frames > 0:
+        # 160MHzで1フレーム約2KBのため，100万フレームで約2GB
+        fixtures["large"] = generate_large_pcap(f"{work_dir}/large.pcap", nframes=large_frames)
+
+    # 帯域幅ごとの単一デバイスキャプチャ
+    for bandwidth in [20, 40, 80, 160]:
+        fixtures["pcap"][bandwidth] = generate_pcap(f"{work_dir}/bw{bandwidth}.pcap", bandwidth=bandwidth, nframes=nframes, jitter=0.0005)
+
+    # 複数デバイスのキャプチャ（受信時刻補正用，欠落あり）
+    captures = generate_capture_set(f"{work_dir}/pcap-data", ndevices=4, nframes=min(nframes, 500), bandwidth=20, jitter=0.002, drop_rate=0.01)
+    fixtures["csv"] = {}
+    for device, paths in captures.items():
+        filename = os.path.basename(paths[0])
+        decode_pcap2csv(decoder=decoder, pcap_path=os.path.dirname(paths[0]), csv_path=f"{work_dir}/csv-data/{device}", filename=filename)
+        fixtures["csv"][device] = f"{work_dir}/csv-data/{device}/amp/{Util.remove_extension(file_name=filename)}.csv"
+    fixtures["pha_csv"] = f"{work_dir}/csv-data/{device}/pha/{Util.remove_extension(file_name=filename)}.csv"
+
+    # 位相データフレーム（信号処理用，未使用サブキャリア除去・アンラップ済み）
+    samples = decoder.read_pcap(pcap_filepath=fixtures["pcap"][80])
+    df_pha  = pd.DataFrame(samples.get_phase())
+    sp      = PhaSignalProcessor(df_pha)
+    sp.remove_zero_subcarriers(inplace=True)
+    sp.upwrap_phase(inplace=True)
+    fixtures["pha"] = sp.df
+    return fixtures
+
+for _bandwidth in [20, 40, 80, 160]:
+    @benchmark(f"read_pcap[{_bandwidth}MHz]")
+    def _bench_read_pcap(fixtures, bandwidth=_bandwidth):
+        decoder = importlib.import_module("lib.interleaved")
+        return lambda: decoder.read_pcap(pcap_filepath=fixtures["pcap"][bandwidth])
+
+@benchmark("read_pcap_parallel[160MHz]")
+def _bench_read_pcap_parallel(fixtures):
+    decoder = importlib.import_module("lib.interleaved")
+    return lambda: decoder.read_pcap_parallel(pcap_filepath=fixtures["pcap"][160], nworkers=fixtures["workers"])
+
+@benchmark("read_pcap[160MHz,large]")
+def _bench_read_pcap_large(fixtures):
+    decoder = importlib.import_module("lib.interleaved")
+    return (lambda: decoder.read_pcap(pcap_filepath=fixtures["large"])) if fixtures.get("large") else None
+
+@benchmark("read_pcap_parallel[160MHz,large]")
+def _bench_read_pcap_parallel_large(fixtures):
+    decoder = importlib.import_module("lib.interleaved")
+    return (lambda: decoder.read_pcap_parallel(pcap_filepath=fixtures["large"], nworkers=fixtures["workers"])) if fixtures.get("large") else None
+
+@benchmark("read_pcap_summary[80MHz,no_index]")
+def _bench_scan_records(fixtures):
+    decoder = importlib.import_module("lib.interleaved")
+    def run():
+        # サイドカーインデックスを削除し，レコードの探索・検証から計測
+        if os.path.exists(f"{fixtures['pcap'][80]}.idx.npz"):
+            os.remove(f"{fixtures['pcap'][80]}.idx.npz")
+        return decoder.read_pcap_summary(fixtures["pcap"][80])
+    return run
+
+@benchmark("SampleSet.get_amplitude[160MHz,drop_nulls_pilots]")
+def _bench_get_amplitude_columns(fixtures):
+    decoder = importlib.import_module("lib.interleaved")
+    samples = decoder.read_pcap(pcap_filepath=fixtures["pcap"][160])
+    columns = decoder.keep_columns(160, rm_nulls=True, rm_pilots=True)
+    def run():
+        samples.clear_cache()
+        return samples.get_amplitude(columns=columns)
+    return run
+
+@benchmark("decode_pcap2csv[80MHz]")
+def _bench_decode_pcap2csv(fixtures):
+    decoder  = importlib.import_module("lib.interleaved")
+    pcap     = fixtures["pcap"][80]
+    csv_path = f"{fixtures['work_dir']}/export"
+    return lambda: decode_pcap2csv(decoder=decoder, pcap_path=os.path.dirname(pcap), csv_path=csv_path, filename=os.path.basename(pcap))
+
+@benchmark("decode_pcap2csv[80MHz,float32,fast_writer]")
+def _bench_decode_pcap2csv_fast(fixtures):
+    decoder  = importlib.import_module("lib.interleaved")
+    pcap     = fixtures["pcap"][80]
+    csv_path = f"{fixtures['work_dir']}/export-fast"
+    return lambda: decode_pcap2csv(decoder=decoder, pcap_path=os.path.dirname(pcap), csv_path=csv_path, filename=os.path.basename(pcap),
+                                   dtype="float32", decimals=4, drop_nulls=True, fast_writer=True)
+
+@benchmark("TimeAdjuster[4devices]")
+def _bench_time_adjuster(fixtures):
+    df_dict = {device: pd.read_csv(path, index_col=0) for device, path in fixtures["csv"].items()}
+    def run():
+        ta = TimeAdjuster(df_dict={key: df.copy() for key, df in df_dict.items()}, alpha=0.01)
+        try:
+            start = 0
+            while True:
+                start = ta.adjust_time(start)
+                if start is True:
+                    break
+        except KeyError:
+            pass
+    return run
+
+@benchmark("ChunkedTimeAdjuster[4devices]")
+def _bench_chunked_time_adjuster(fixtures):
+    save_path_dict = {device: f"{fixtures['work_dir']}/adjusted/{device}.csv" for device in fixtures["csv"]}
+    return lambda: ChunkedTimeAdjuster(path_dict=fixtures["csv"], alpha=0.01, chunksize=1000).adjust_time(save_path_dict)
+
+@benchmark("ChunkedPhaSignalProcessor.process")
+def _bench_chunked_pha_signal_processor(fixtures):
+    save_path = f"{fixtures['work_dir']}/preprocessed/pha.csv"
+    return lambda: ChunkedPhaSignalProcessor(fixtures["pha_csv"], chunksize=1000).process(save_path, fs=100.0)
+
+@benchmark("PhaSignalProcessor.remove_linear_drift")
+def _bench_remove_linear_drift(fixtures):
+    return lambda: PhaSignalProcessor(fixtures["pha"]).remove_linear_drift()
+
+@benchmark("PhaSignalProcessor.pca")
+def _bench_pca(fixtures):
+    return lambda: PhaSignalProcessor(fixtures["pha"]).pca(n_components=1)
+
+@benchmark("PhaSignalProcessor.compute_spectrogram")
+def _bench_compute_spectrogram(fixtures):
+    df_pc1 = PhaSignalProcessor(fixtures["pha"]).pca(n_components=1)
+    return lambda: PhaSignalProcessor(df_pc1).compute_spectrogram(column="PC1", fs=100.0, nperseg=128, noverlap=64)
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """ベースラインと比較し，閾値を超えて遅くなったケースを返す"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["min"] / baseline[name]["min"]
+        if ratio > 1.0 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合成Nexmon PCAPを用いたベンチマーク")
+    parser.add_argument("--frames",    type=int,   default=2000, help="キャプチャあたりのフレーム数")
+    parser.add_argument("--repeat",    type=int,   default=3,    help="各ケースの繰り返し回数")
+    parser.add_argument("--filter",    type=str,   default="",   help="ケース名に含まれる文字列で絞り込む")
+    parser.add_argument("--save",      type=str,   default=None, help="結果を保存するJSONファイル")
+    parser.add_argument("--compare",   type=str,   default=None, help="比較対象のベースラインJSONファイル")
+    parser.add_argument("--threshold", type=float, default=0.2,  help="回帰とみなす速度低下の割合")
+    parser.add_argument("--large",     type=int,   default=0,    help="並列読み取り用の大きなキャプチャのフレーム数（0の場合は生成しない）")
+    parser.add_argument("--workers",   type=int,   default=None, help="並列読み取りのプロセス数（省略時はCPU数）")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        fixtures = prepare_fixtures(work_dir=work_dir, nframes=args.frames, large_frames=args.large, workers=args.workers)
+        for name, case in BENCHMARKS.items():
+            func = case(fixtures) if args.filter in name else None
+            if func is None:
+                continue
+            results[name] = measure(func, repeat=args.repeat)
+            print(f"{name:<45} min={results[name]['min']*1e3:10.2f} ms  median={results[name]['median']*1e3:10.2f} ms")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"frames": args.frames, "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, threshold=args.threshold)
+        for name, ratio in regressions:
+            print(f"⚠️ {name}: ベースライン比 {ratio:.2f} 倍")
+        if regressions:
+            sys.exit(1)
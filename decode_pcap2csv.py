@@ -4,7 +4,93 @@ import numpy as np
 import pandas as pd
 from lib import Util, ErrorHandler
 
-def decode_pcap2csv(decoder, pcap_path: str, csv_path: str, filename: str) -> None:
+def _write_csv_fast(path: str, index, columns: list, values: np.ndarray, value_format: str, block_rows: int = 4096,
+                    first_format: str = None) -> None:
+    """
+    インデックス列付きのCSVファイルをブロック単位の書式化でまとめて書き込む
+    （pandas.DataFrame.to_csv と同じ列構成，first_formatを指定した場合は先頭列のみその書式）
+    """
+    row_format = "%d," + ",".join([first_format or value_format] + [value_format] * (values.shape[1] - 1)) + "\n"
+    with open(path, "w") as f:
+        f.write("," + ",".join(columns) + "\n")
+        for start in range(0, values.shape[0], block_rows):
+            block = values[start:start+block_rows]
+            rows  = np.empty((block.shape[0], block.shape[1] + 1), dtype=np.float64)
+            rows[:, 0]  = index[start:start+block_rows]
+            rows[:, 1:] = block
+            f.write((row_format * block.shape[0]) % tuple(rows.ravel().tolist()))
+
+def _save_csv(times, amp, pha, csv_path: str, subdir: str, filename: str, columns: np.ndarray = None,
+              dtype: str = "float64", decimals: int = None, fast_writer: bool = False, time_base: str = "relative") -> None:
+    """受信時刻と振幅・位相（columnsを指定した場合はそのサブキャリアの列のみ）をCSVファイルに保存する"""
+    nsub = amp.shape[1] if amp.ndim == 2 else 0
+    if columns is None:
+        columns = np.arange(nsub)
+    labels = np.array(Util.get_alphabet_list(num=int(columns[-1]) + 1 if len(columns) > 0 else 0), dtype=object)
+
+    for kind, values in [("amp", amp), ("pha", pha)]:
+        # 指定した精度に変換
+        values = np.asarray(values).astype(dtype) if nsub > 0 else np.asarray(values)
+        if decimals is not None:
+            values = np.round(values, decimals)
+        names = ['Time'] + list(labels[columns])
+
+        Util.create_path(f"{csv_path}/{kind}{subdir}")
+        path = f"{csv_path}/{kind}{subdir}/{Util.remove_extension(file_name=filename)}.csv"
+        if fast_writer and nsub > 0:
+            # 書式を固定してブロック単位で書き込む（float64は pandas と同じ最短表現，float32は有効桁数9桁）
+            if decimals is not None:
+                value_format = f"%.{decimals}f"
+            else:
+                value_format = "%.9g" if np.dtype(dtype) == np.float32 else "%r"
+            # 受信時刻は精度・桁数の指定によらずマイクロ秒まで書き込む（Time列は時刻補正の基準のため）
+            _write_csv_fast(path, np.arange(len(times)), names, np.column_stack([np.asarray(times, dtype=np.float64), values]), value_format,
+                            first_format="%.6f")
+            continue
+
+        # 受信時間を先頭カラムに追加
+        df = pd.concat([pd.DataFrame(times), pd.DataFrame(values)], axis=1)
+        # カラム名の変更
+        df.columns = names
+        # CSVファイルに保存
+        df.to_csv(path)
+
+def _export_columns(decoder, bandwidth: int, drop_nulls: bool, drop_pilots: bool):
+    """保存するサブキャリア列のインデックス（Null・Pilotを除外する場合，帯域幅ごとに作成済みの配列）"""
+    if not (drop_nulls or drop_pilots):
+        return None
+    return decoder.keep_columns(bandwidth, rm_nulls=drop_nulls, rm_pilots=drop_pilots)
+
+def _save_samples(decoder, samples, csv_path: str, subdir: str, filename: str, split_streams: bool,
+                  drop_nulls: bool = False, drop_pilots: bool = False, **export_options) -> None:
+    """SampleSetを振幅・位相のCSVファイルとして保存する"""
+    columns  = _export_columns(decoder, samples.bandwidth, drop_nulls, drop_pilots)
+    absolute = export_options.get("time_base") == "absolute"
+    if not split_streams:
+        # データの抽出（複素CSIを作らずに，保存する列のみの振幅・位相を計算）
+        amp = samples.get_amplitude(rm_nulls=True, rm_pilots=False, columns=columns) # 振幅
+        pha = samples.get_phase(rm_nulls=True, rm_pilots=False, columns=columns)     # 位相
+        times = samples.get_epoch_time() if absolute else samples.timestamps
+        _save_csv(times=times, amp=amp, pha=pha, csv_path=csv_path, subdir=subdir, filename=filename, columns=columns, **export_options)
+        return
+
+    # コア・空間ストリームごとに整列したテンソルに変換
+    tensor = samples.to_tensor()
+    tensor.csi[..., decoder.subcarrier_mask(tensor.bandwidth)] = 0
+    for core in range(tensor.ncores):
+        for stream in range(tensor.nstreams):
+            time, csi = tensor.get_stream(core=core, stream=stream, absolute=absolute)
+            if len(time) == 0:
+                continue
+            time = decoder.epoch_seconds(time) if absolute else time
+            csi = csi if columns is None else csi[..., columns]
+            _save_csv(times=time, amp=np.abs(csi), pha=np.angle(csi), csv_path=csv_path, subdir=f"{subdir}/core{core}-ss{stream}",
+                      filename=filename, columns=columns, **export_options)
+
+def decode_pcap2csv(decoder, pcap_path: str, csv_path: str, filename: str, split_streams: bool = False,
+                    macs: list = None, fctls: list = None, rssi_min: int = None, demux: bool = False, bandwidth: int = 0,
+                    dtype: str = "float64", decimals: int = None, drop_nulls: bool = False, drop_pilots: bool = False,
+                    fast_writer: bool = False, time_base: str = "relative") -> None:
     """
     PCAPファイルをCSVファイルに変換する関数
 
@@ -18,33 +104,48 @@ def decode_pcap2csv(decoder, pcap_path: str, csv_path: str, filename: str) -> No
         保存先のパス
     filename: str
         ファイル名
+    split_streams: bool
+        Trueの場合，コア・空間ストリームごとに {csv_path}/amp/core{c}-ss{s}/ 以下へ分けて保存する
+    macs: list
+        受け入れる送信元MACアドレスのリスト（Noneの場合は全て）
+    fctls: list
+        受け入れるFCTLの値のリスト（Noneの場合は全て）
+    rssi_min: int
+        受け入れる最小RSSI（Noneの場合は全て）
+    demux: bool
+        Trueの場合，送信元MACアドレスごとに {csv_path}/amp/{MACアドレス}/ 以下へ分けて保存する
+    bandwidth: int
+        帯域幅（0の場合はファイルから推定）
+    dtype: str
+        保存する値の精度（"float64" / "float32"）
+    decimals: int
+        小数点以下の桁数（Noneの場合は丸めない）
+    drop_nulls: bool
+        Trueの場合，Nullサブキャリアの列を0埋めせずに削除する
+    drop_pilots: bool
+        Trueの場合，Pilotサブキャリアの列を削除する
+    fast_writer: bool
+        Trueの場合，pandasを介さずにブロック単位で書き込む
+    time_base: str
+        Time列の基準（"relative": 先頭レコードからの相対時間 [s]，"absolute": エポック秒（マイクロ秒精度））
 
     return
     ------
     None
     """
     try:
-        # データの読み込み
-        samples = decoder.read_pcap(pcap_filepath=f"{pcap_path}/{filename}")
-
-        # データの抽出
-        df_amp  = pd.DataFrame([np.abs(samples.get_csi(index=index, rm_nulls=True, rm_pilots=False)) for index in range(samples.nsamples)])   # 振幅
-        df_pha  = pd.DataFrame([np.angle(samples.get_csi(index=index, rm_nulls=True, rm_pilots=False)) for index in range(samples.nsamples)]) # 位相
-        df_time = pd.DataFrame([samples.get_time(index=index) for index in range(samples.nsamples)])                                          # 受信時刻
-
-        # 受信時間を先頭カラムに追加
-        df_amp = pd.concat([df_time, df_amp], axis=1)
-        df_pha = pd.concat([df_time, df_pha], axis=1)
+        # データの読み込み（フィルタはCSI変換前にヘッダに対して適用）
+        pcap_filepath = f"{pcap_path}/{filename}"
+        if demux:
+            sample_sets = decoder.demux_pcap(pcap_filepath=pcap_filepath, bandwidth=bandwidth, macs=macs, fctls=fctls, rssi_min=rssi_min)
+        else:
+            sample_sets = {None: decoder.read_pcap(pcap_filepath=pcap_filepath, bandwidth=bandwidth, macs=macs, fctls=fctls, rssi_min=rssi_min)}
 
-        # カラム名の変更
-        df_amp.columns = ['Time'] + Util.get_alphabet_list(num=df_amp.shape[1]-1)
-        df_pha.columns = ['Time'] + Util.get_alphabet_list(num=df_pha.shape[1]-1)
-
-        # CSVファイルに保存
-        Util.create_path(f"{csv_path}/amp")
-        Util.create_path(f"{csv_path}/pha")
-        df_amp.to_csv(f"{csv_path}/amp/{Util.remove_extension(file_name=filename)}.csv")
-        df_pha.to_csv(f"{csv_path}/pha/{Util.remove_extension(file_name=filename)}.csv")
+        for mac, samples in sample_sets.items():
+            subdir = f"/{mac.replace(':', '-')}" if mac else ""
+            _save_samples(decoder=decoder, samples=samples, csv_path=csv_path, subdir=subdir, filename=filename, split_streams=split_streams,
+                          drop_nulls=drop_nulls, drop_pilots=drop_pilots, dtype=dtype, decimals=decimals, fast_writer=fast_writer,
+                          time_base=time_base)
 
     except Exception as e:
         # エラーハンドラを初期化
@@ -57,15 +158,36 @@ if __name__ == '__main__':
         with open(f'{Util.get_root_dir()}/config/config.json', 'r') as f:
             config = json.load(f)
 
+        # デコード設定（フィルタ・分割の指定，未指定の場合は全フレームを1つのCSVに保存）
+        decode_config = config.get("Decode", {})
+
         # PCAPファイルのデコード
+        decoder = importlib.import_module(f"lib.interleaved")
         for all_device in config["AllDevice"]["Pcap"]:
+            # デバイスごとに帯域幅を推定（ディレクトリが変わるまでは前回の値を再利用）
+            device_meta = decoder.get_device_meta(f"{Util.get_root_dir()}/data/pcap-data/{all_device}")
+            if device_meta is None:
+                # PCAPファイルがないデバイスはスキップ
+                continue
             for filename in Util.get_file_name_list(path=f"{Util.get_root_dir()}/data/pcap-data/{all_device}", ext='.pcap'):
                 # PCAPファイルをCSVファイルに変換
                 decode_pcap2csv(
-                    decoder   = importlib.import_module(f"lib.interleaved"),
-                    pcap_path = f"{Util.get_root_dir()}/data/pcap-data/{all_device}",
-                    csv_path  = f"{Util.get_root_dir()}/data/csv-data/{all_device}",
-                    filename  = filename
+                    decoder       = decoder,
+                    pcap_path     = f"{Util.get_root_dir()}/data/pcap-data/{all_device}",
+                    csv_path      = f"{Util.get_root_dir()}/data/csv-data/{all_device}",
+                    filename      = filename,
+                    split_streams = decode_config.get("SplitStreams", False),
+                    macs          = decode_config.get("Macs"),
+                    fctls         = decode_config.get("Fctls"),
+                    rssi_min      = decode_config.get("RssiMin"),
+                    demux         = decode_config.get("Demux", False),
+                    bandwidth     = device_meta["bandwidth"],
+                    dtype         = decode_config.get("Dtype", "float64"),
+                    decimals      = decode_config.get("Decimals"),
+                    drop_nulls    = decode_config.get("DropNulls", False),
+                    drop_pilots   = decode_config.get("DropPilots", False),
+                    fast_writer   = decode_config.get("FastWriter", False),
+                    time_base     = decode_config.get("TimeBase", "relative")
                 )
 
     except Exception as e:
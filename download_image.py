@@ -1,5 +1,6 @@
 import json
-from lib import AWSHandler, ErrorHandler, Util
+from tqdm import tqdm
+from lib import AWSHandler, ErrorHandler, Util, S3TransferEngine
 
 if __name__ == '__main__':
     try:
@@ -7,18 +8,34 @@ if __name__ == '__main__':
         with open(f"{Util.get_root_dir()}/config/config.json") as f:
             config = json.load(f)
 
-        # AWSハンドラを初期化
-        aws_handler = AWSHandler(region_name='ap-northeast-1', bucket_name='minelab-iot-storage')
+        # AWSハンドラを初期化（リージョン・バケット・接続設定は "AWS"，ローカルスタブは "Transfer" セクションから取得）
+        aws_handler = AWSHandler.from_config(config)
 
-        for all_device in config["AllDevice"]["Image"]:
-            Util.create_path(path=f'{Util.get_root_dir()}/data/image-data/{all_device}')
-            # 指定した時間範囲のオブジェクトをダウンロード
-            aws_handler.download_s3_objects(
-                remote_path = f'projects/csi/image-data/{all_device}/',               # S3のプレフィックス
-                local_path  = f'{Util.get_root_dir()}/data/image-data/{all_device}/', # ローカルパス
-                start_time  = Util.get_timestamp(delta_hour=-24),                     # 開始時間
-                end_time    = Util.get_timestamp()                                    # 終了時間
-            )
+        # 転送設定（同時転送数・帯域上限 [byte/s]）
+        transfer_config = config.get("Transfer", {})
+
+        # 進捗表示
+        progress_bar = tqdm(unit='B', unit_scale=True)
+        def on_progress(progress, nbytes):
+            progress_bar.total = progress.total_bytes
+            progress_bar.update(nbytes)
+
+        # 全デバイスのプレフィックスを並行にダウンロード
+        engine = S3TransferEngine(
+            s3_client         = aws_handler.s3_client,
+            bucket_name       = aws_handler.s3_bucket_name,
+            max_concurrency   = transfer_config.get("MaxConcurrency", 16),
+            max_bandwidth     = transfer_config.get("MaxBandwidth"),
+            progress_callback = on_progress
+        )
+        engine.download(
+            jobs       = [(f'projects/csi/image-data/{all_device}/',                # S3のプレフィックス
+                           f'{Util.get_root_dir()}/data/image-data/{all_device}/')  # ローカルパス
+                          for all_device in config["AllDevice"]["Image"]],
+            start_time = Util.get_timestamp(delta_hour=-24),                       # 開始時間
+            end_time   = Util.get_timestamp()                                      # 終了時間
+        )
+        progress_bar.close()
 
     except Exception as e:
         # エラーハンドラを初期化
@@ -0,0 +1,43 @@
+import json
+from tqdm import tqdm
+from lib import AWSHandler, ErrorHandler, Util, S3TransferEngine
+
+if __name__ == '__main__':
+    try:
+        # 設定ファイルの読み込み
+        with open(f"{Util.get_root_dir()}/config/config.json") as f:
+            config = json.load(f)
+
+        # AWSハンドラを初期化（リージョン・バケット・接続設定は "AWS"，ローカルスタブは "Transfer" セクションから取得）
+        aws_handler = AWSHandler.from_config(config)
+
+        # 転送設定（同時転送数・帯域上限 [byte/s]）
+        transfer_config = config.get("Transfer", {})
+
+        # 進捗表示
+        progress_bar = tqdm(unit='B', unit_scale=True)
+        def on_progress(progress, nbytes):
+            progress_bar.total = progress.total_bytes
+            progress_bar.update(nbytes)
+
+        # 全デバイスのプレフィックスを並行にダウンロード
+        engine = S3TransferEngine(
+            s3_client         = aws_handler.s3_client,
+            bucket_name       = aws_handler.s3_bucket_name,
+            max_concurrency   = transfer_config.get("MaxConcurrency", 16),
+            max_bandwidth     = transfer_config.get("MaxBandwidth"),
+            progress_callback = on_progress
+        )
+        engine.download(
+            jobs       = [(f'projects/csi/pcap-data/{all_device}/',                # S3のプレフィックス
+                           f'{Util.get_root_dir()}/data/pcap-data/{all_device}/')  # ローカルパス
+                          for all_device in config["AllDevice"]["Pcap"]],
+            start_time = Util.get_timestamp(delta_hour=-24),                       # 開始時間
+            end_time   = Util.get_timestamp()                                      # 終了時間
+        )
+        progress_bar.close()
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f'{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log')
+        handler.handle_error(e)
\ No newline at end of file
@@ -0,0 +1,40 @@
+import json
+from tqdm import tqdm
+from lib import ErrorHandler, Util, DatasetCatalog, CSIWindowDataset, FeatureExtractor, build_feature_store
+
+if __name__ == '__main__':
+    try:
+        # 設定ファイルの読み込み
+        with open(f"{Util.get_root_dir()}/config/config.json") as f:
+            config = json.load(f)
+
+        # 特徴量抽出の設定（窓長・移動量 [行]，STFT・帯域・主成分の数）
+        feature_config = config.get("FeatureExtract", {})
+        params = {
+            "fs":           feature_config.get("Fs", 100.0),
+            "nperseg":      feature_config.get("Nperseg", 32),
+            "noverlap":     feature_config.get("Noverlap", 16),
+            "nbands":       feature_config.get("NBands", 4),
+            "n_components": feature_config.get("NComponents", 3),
+        }
+
+        with DatasetCatalog() as catalog:
+            catalog.refresh(stages=["adjusted-data"])
+            # 振幅・位相ごとに，全デバイスで共通するファイルの窓から特徴量ストアを作成
+            for kind in tqdm(feature_config.get("Kinds", ["amp", "pha"])):
+                # 時刻補正済みのデータがない種類（time_adjust.py の未実行など）は作成できない
+                if not catalog.common_files(stage="adjusted-data", kind=kind, devices=config["AllDevice"]["Pcap"]):
+                    raise FileNotFoundError(f"adjusted-data に {kind} のデータがありません（time_adjust.py を実行してください）")
+                extractor = FeatureExtractor(**params, kind=kind)
+                dataset = CSIWindowDataset.from_catalog(
+                    catalog, stage="adjusted-data", kind=kind, devices=sorted(config["AllDevice"]["Pcap"]),
+                    cache_dir = f'{Util.get_root_dir()}/data/cache',
+                    window    = feature_config.get("Window", 256),
+                    stride    = feature_config.get("Stride", 128)
+                )
+                build_feature_store(dataset, extractor, store_dir=f'{Util.get_root_dir()}/data/feature-store/{kind}')
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f'{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log')
+        handler.handle_error(e)
@@ -0,0 +1,26 @@
+import json
+from tqdm import tqdm
+from lib import ErrorHandler, Util, ImageStore
+
+if __name__ == '__main__':
+    try:
+        # 設定ファイルの読み込み
+        with open(f"{Util.get_root_dir()}/config/config.json") as f:
+            config = json.load(f)
+
+        # 画像ストアの設定（縮小後のサイズ [幅, 高さ]・カラーモード）
+        image_config = config.get("ImageStore", {})
+
+        for all_device in tqdm(config["AllDevice"]["Image"]):
+            # ダウンロード済みの画像のうち未登録のものをデコードして追加
+            store = ImageStore(
+                store_dir = f'{Util.get_root_dir()}/data/image-store/{all_device}',
+                size      = image_config.get("Size", [64, 64]),
+                mode      = image_config.get("Mode", "RGB")
+            )
+            store.build(image_dirs=[f'{Util.get_root_dir()}/data/image-data/{all_device}'])
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f'{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log')
+        handler.handle_error(e)
\ No newline at end of file
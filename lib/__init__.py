@@ -1,6 +1,51 @@
-from .aws_handler import AWSHandler
+import importlib
+
 from .error_handler import ErrorHandler
 from .util import Util
 from .time_adjuster import TimeAdjuster
 #from .amp_signal_processor import AmpSignalProcessor
-from .pha_signal_processor import PhaSignalProcessor
\ No newline at end of file
+from .chunked_io import ChunkedReader, ChunkedWriter
+from .chunked_time_adjuster import ChunkedTimeAdjuster
+from .dataset_catalog import DatasetCatalog
+from .s3_transfer import S3TransferEngine, LocalS3Client
+from .csi_dataset import CSIWindowDataset
+from .pcap_timeline import PcapTimeline
+
+# 重い依存パッケージ（boto3・scikit-learn・tslearn・SciPy・Pillow・joblib）を読み込むモジュールは，最初に参照された時点で読み込む
+_LAZY_IMPORTS = {
+    "AWSHandler":                ".aws_handler",
+    "PhaSignalProcessor":        ".pha_signal_processor",
+    "ChunkedPhaSignalProcessor": ".chunked_pha_signal_processor",
+    "ChunkedSpectrogram":        ".chunked_pha_signal_processor",
+    "ImageStore":                ".image_store",
+    "FeatureExtractor":          ".feature_extractor",
+    "build_feature_store":       ".feature_extractor",
+    "load_feature_store":        ".feature_extractor",
+    "DistanceCache":             ".ts_baseline",
+    "LBKeoghKNeighbors":         ".ts_baseline",
+    "to_series":                 ".ts_baseline",
+    "dataset_to_series":         ".ts_baseline",
+    "evaluate_baselines":        ".ts_baseline",
+    "InferenceRunner":           ".inference_runner",
+    "save_model":                ".inference_runner",
+    "load_model":                ".inference_runner",
+    "CorrelationAccumulator":    ".correlation",
+    "accumulate_files":          ".correlation",
+    "subcarrier_accumulator":    ".correlation",
+    "device_accumulator":        ".correlation",
+    "plot_correlation":          ".correlation",
+    "PlotEngine":                ".plot_engine",
+    "downsample":                ".plot_engine",
+    "downsample_columns":        ".plot_engine",
+}
+
+def __getattr__(name: str):
+    """遅延読み込みするクラス・関数を，参照された時点でモジュールから読み込む"""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> list:
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
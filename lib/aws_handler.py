@@ -1,15 +1,99 @@
 import os
 import boto3
+import tarfile
+import hashlib
+import tempfile
+import threading
 from datetime import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+from .s3_transfer import LocalS3Client
+
+# マルチパートアップロードの既定値
+MULTIPART_THRESHOLD = 8 * 1024 * 1024 # この大きさ以上のファイルをマルチパートで送信 [byte]
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024 # パートの大きさ [byte]
+
+# 既定のリージョン・バケット
+DEFAULT_REGION_NAME = "ap-northeast-1"
+DEFAULT_BUCKET_NAME = "minelab-iot-storage"
+
+# 設定ごとに共有するS3クライアント（boto3のクライアントはスレッドセーフなため，全ハンドラ・スレッドで再利用）
+_s3_clients      = {}
+_s3_clients_lock = threading.Lock()
+
+def get_s3_client(region_name: str = DEFAULT_REGION_NAME, max_pool_connections: int = 50, retry_mode: str = "standard",
+                  max_attempts: int = 5, connect_timeout: float = 10, read_timeout: float = 60, tcp_keepalive: bool = True):
+    """
+    接続プール・リトライ・タイムアウトを設定したS3クライアントを取得（同じ設定のクライアントは1つだけ作成して共有）
+
+    params
+    ------
+    region_name: str
+        リージョン名
+    max_pool_connections: int
+        接続プールの大きさ（既定の10では並行転送が待たされるため，同時転送数以上にする）
+    retry_mode: str
+        リトライモード（legacy / standard / adaptive）
+    max_attempts: int
+        最大リトライ回数（初回の送信を除く）
+    connect_timeout: float
+        接続タイムアウト [s]
+    read_timeout: float
+        読み取りタイムアウト [s]
+    tcp_keepalive: bool
+        TCPキープアライブを有効にするか
+
+    return
+    ------
+    S3クライアント
+    """
+    key = (region_name, max_pool_connections, retry_mode, max_attempts, connect_timeout, read_timeout, tcp_keepalive)
+    with _s3_clients_lock:
+        if key not in _s3_clients:
+            # boto3の既定セッションはスレッドセーフではないため，クライアントごとにセッションを作成
+            _s3_clients[key] = boto3.session.Session().client('s3', region_name=region_name, config=Config(
+                max_pool_connections = max_pool_connections,
+                retries              = {'mode': retry_mode, 'max_attempts': max_attempts},
+                connect_timeout      = connect_timeout,
+                read_timeout         = read_timeout,
+                tcp_keepalive        = tcp_keepalive
+            ))
+        return _s3_clients[key]
+
+def get_s3_client_options(config: dict) -> dict:
+    """設定ファイルの "AWS" セクションからget_s3_clientの引数を作成"""
+    aws_config = config.get("AWS", {})
+    options    = {
+        "region_name":          aws_config.get("Region"),
+        "max_pool_connections": aws_config.get("MaxPoolConnections"),
+        "retry_mode":           aws_config.get("RetryMode"),
+        "max_attempts":         aws_config.get("MaxAttempts"),
+        "connect_timeout":      aws_config.get("ConnectTimeout"),
+        "read_timeout":         aws_config.get("ReadTimeout"),
+        "tcp_keepalive":        aws_config.get("TcpKeepalive")
+    }
+    return {key: value for key, value in options.items() if value is not None}
 
 class AWSHandler:
     """AWSの各種サービスを操作するためのハンドラクラス"""
 
-    def __init__(self, region_name: str, bucket_name: str):
-        """コンストラクタ"""
-        self.s3_client      = boto3.client('s3', region_name=region_name)
+    def __init__(self, region_name: str = DEFAULT_REGION_NAME, bucket_name: str = DEFAULT_BUCKET_NAME, s3_client=None, **client_options):
+        """コンストラクタ（s3_clientを省略すると共有クライアントを使用，ローカルスタブでの検証時は指定する）"""
+        self.s3_client      = s3_client or get_s3_client(region_name=region_name, **client_options)
         self.s3_bucket_name = bucket_name
 
+    @classmethod
+    def from_config(cls, config: dict):
+        """設定ファイルの "AWS" セクション（Region, Bucket, 接続設定）と "Transfer" セクション（LocalStub）から初期化"""
+        local_stub = config.get("Transfer", {}).get("LocalStub")
+        return cls(
+            bucket_name = config.get("AWS", {}).get("Bucket", DEFAULT_BUCKET_NAME),
+            s3_client   = LocalS3Client(root_dir=local_stub) if local_stub else None,
+            **get_s3_client_options(config)
+        )
+
     def _list_s3_objects(self, prefix: str) -> list:
         """指定したS3プレフィックス内のすべてのオブジェクト（ファイル）一覧を取得"""
         try:
@@ -88,6 +172,125 @@ class AWSHandler:
         except Exception as e:
             raise e
 
+    @staticmethod
+    def _local_etags(path: str, chunksize: int) -> set:
+        """ローカルファイルのETag候補（単一パートのMD5と，chunksize単位のマルチパートETag）を計算"""
+        md5, part_digests = hashlib.md5(), []
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunksize), b''):
+                md5.update(chunk)
+                part_digests.append(hashlib.md5(chunk).digest())
+        etags = {md5.hexdigest()}
+        if len(part_digests) > 1:
+            etags.add(f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}")
+        return etags
+
+    @staticmethod
+    def _pack_shard(files: list, shard_path: str) -> None:
+        """小さいファイルをtarシャードにまとめる（同じ内容からは同じバイト列になるよう属性を固定）"""
+        with tarfile.open(shard_path, 'w') as tar:
+            for local_file, arcname in files:
+                info       = tar.gettarinfo(local_file, arcname=arcname)
+                info.uid   = info.gid = 0
+                info.uname = info.gname = ''
+                info.mtime = int(info.mtime)
+                with open(local_file, 'rb') as f:
+                    tar.addfile(info, f)
+
+    def upload_s3_objects(self, local_path: str, remote_path: str, ext: str = "", max_concurrency: int = 8,
+                          multipart_threshold: int = MULTIPART_THRESHOLD, multipart_chunksize: int = MULTIPART_CHUNKSIZE,
+                          skip_unchanged: bool = True, shard_threshold: int = 0, shard_size: int = 64 * 1024 * 1024) -> dict:
+        """
+        ローカルディレクトリ内のファイルをS3にまとめてアップロード
+
+        params
+        ------
+        local_path: str
+            ローカルパス（サブディレクトリも含めて送信）
+        remote_path: str
+            S3のプレフィックス
+        ext: str
+            対象とするファイルの拡張子
+        max_concurrency: int
+            同時に送信するファイル数（マルチパートの各ファイルもこの数まで並行にパートを送信）
+        multipart_threshold: int
+            この大きさ以上のファイルをマルチパートで送信 [byte]
+        multipart_chunksize: int
+            マルチパートのパートの大きさ [byte]
+        skip_unchanged: bool
+            Trueの場合，S3上のETagとローカルのMD5が一致するファイルを送信しない
+        shard_threshold: int
+            この大きさ未満のファイルを {remote_path}_shards/ 以下のtarシャードにまとめて送信 [byte]（0の場合はまとめない）
+        shard_size: int
+            1シャードの大きさの目安 [byte]
+
+        return
+        ------
+        dict
+            uploaded（送信したキー）・skipped（変更がなく送信しなかったキー）・shards（各シャードのキーと格納したファイル）
+        """
+        try:
+            # 対象ファイルの一覧（S3のキー順）
+            files = []
+            for dirpath, _, filenames in os.walk(local_path):
+                for filename in filenames:
+                    if filename.endswith(ext):
+                        local_file = os.path.join(dirpath, filename)
+                        key        = remote_path + os.path.relpath(local_file, local_path).replace(os.sep, '/')
+                        files.append((local_file, key))
+            files.sort(key=lambda f: f[1])
+
+            # S3上の既存オブジェクトのETagを1回の一覧取得でまとめて取得
+            remote_etags = {}
+            if skip_unchanged:
+                remote_etags = {obj['Key']: obj.get('ETag', '').strip('"') for obj in self._list_s3_objects(prefix=remote_path)}
+
+            # 小さいファイルをシャードにまとめる
+            result, shards, current, current_size = {'uploaded': [], 'skipped': [], 'shards': {}}, [], [], 0
+            if shard_threshold > 0:
+                singles = []
+                for local_file, key in files:
+                    size = os.path.getsize(local_file)
+                    if size >= shard_threshold:
+                        singles.append((local_file, key))
+                        continue
+                    current.append((local_file, key[len(remote_path):]))
+                    current_size += size
+                    if current_size >= shard_size:
+                        shards.append(current)
+                        current, current_size = [], 0
+                if current:
+                    shards.append(current)
+                files = singles
+
+            config = TransferConfig(multipart_threshold=multipart_threshold, multipart_chunksize=multipart_chunksize,
+                                    max_concurrency=max_concurrency, use_threads=True)
+
+            def upload(local_file, key):
+                if skip_unchanged and remote_etags.get(key) in self._local_etags(local_file, multipart_chunksize):
+                    return key, False
+                self.s3_client.upload_file(local_file, self.s3_bucket_name, key, Config=config)
+                return key, True
+
+            def upload_shard(members):
+                key = f"{remote_path}_shards/{os.path.splitext(members[0][1])[0]}.tar"
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    shard_path = os.path.join(tmp_dir, 'shard.tar')
+                    self._pack_shard(members, shard_path)
+                    result['shards'][key] = [arcname for _, arcname in members]
+                    return upload(shard_path, key)
+
+            # ファイル・シャードを並行に送信
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                futures  = [executor.submit(upload, local_file, key) for local_file, key in files]
+                futures += [executor.submit(upload_shard, members) for members in shards]
+                for future in futures:
+                    key, uploaded = future.result()
+                    result['uploaded' if uploaded else 'skipped'].append(key)
+            return result
+        except Exception as e:
+            raise e
+
 # 使用例
 if __name__ == "__main__":
     # AWSハンドラの初期化
@@ -98,4 +301,10 @@ if __name__ == "__main__":
         local_path  = "..data/image-data/minelab-iot-camera-1/",
         start_time  = "2025-03-13T00-00-00",
         end_time    = "2025-03-14T00-00-00"
+    )
+    # 処理済みのデータをアップロード（変更のないファイルはスキップ，1MB未満のファイルはtarシャードにまとめる）
+    aws_handler.upload_s3_objects(
+        local_path      = "../data/preprocessed-data/minelab-iot-nexmon-1/",
+        remote_path     = "projects/csi/preprocessed-data/minelab-iot-nexmon-1/",
+        shard_threshold = 1024 * 1024
     )
\ No newline at end of file
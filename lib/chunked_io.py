@@ -0,0 +1,59 @@
+import os
+import numpy as np
+import pandas as pd
+
+class ChunkedReader:
+    """CSVファイルを一定行数ずつ読み込むクラス"""
+
+    def __init__(self, path: str, chunksize: int = 10000, index_col: int = 0):
+        """コンストラクタ"""
+        self.path      = path      # CSVファイルのパス
+        self.chunksize = chunksize # 1チャンクの行数
+        self.index_col = index_col # インデックス列
+
+    def __iter__(self):
+        """データフレームをチャンク単位で返す"""
+        with pd.read_csv(self.path, index_col=self.index_col, chunksize=self.chunksize) as reader:
+            for chunk in reader:
+                yield chunk
+
+    def get_columns(self) -> list:
+        """列名を取得（先頭行のみ読み込む）"""
+        return list(pd.read_csv(self.path, index_col=self.index_col, nrows=0).columns)
+
+    def iter_arrays(self, columns: list = None):
+        """指定した列をfloat64配列としてチャンク単位で返す"""
+        for chunk in self:
+            if columns is not None:
+                chunk = chunk[columns]
+            yield chunk.to_numpy(dtype=np.float64)
+
+    def scan_nonzero_columns(self, exclude: list = ("Time",)) -> list:
+        """全ての値が0ではない列名を取得（ファイル全体を1度走査する）"""
+        columns = [col for col in self.get_columns() if col not in exclude]
+        nonzero = np.zeros(len(columns), dtype=bool)
+        for values in self.iter_arrays(columns=columns):
+            nonzero |= np.any(values != 0, axis=0)
+        return [col for col, keep in zip(columns, nonzero) if keep]
+
+class ChunkedWriter:
+    """データをチャンク単位でCSVファイルに追記するクラス"""
+
+    def __init__(self, path: str, columns: list):
+        """コンストラクタ（既存のファイルは上書き）"""
+        self.path    = path    # CSVファイルのパス
+        self.columns = columns # 列名
+        self.nrows   = 0       # 書き込み済みの行数
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, values: np.ndarray, index=None) -> None:
+        """行を追記（インデックスを省略すると通し番号）"""
+        if len(values) == 0 and self.nrows > 0:
+            return
+        if index is None:
+            index = np.arange(self.nrows, self.nrows + len(values))
+        df = pd.DataFrame(values, index=index, columns=self.columns)
+        df.to_csv(self.path, mode="a", header=(self.nrows == 0))
+        self.nrows += len(values)
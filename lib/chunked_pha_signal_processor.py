@@ -0,0 +1,182 @@
+import os
+import tempfile
+import numpy as np
+from scipy.signal import get_window, stft
+
+from .chunked_io import ChunkedReader, ChunkedWriter
+
+class ChunkedSpectrogram:
+    """
+    STFTによるスペクトログラムをチャンク単位で計算するクラス
+
+    scipy.signal.stft（boundary='zeros', padded=True）と同じフレーム分割を，
+    直前のチャンクの末尾（nperseg - hop サンプル）を持ち越すことで再現する
+    """
+
+    def __init__(self, fs: float = 50.0, nperseg: int = 128, noverlap: int = 64, window: str = "hann"):
+        """コンストラクタ"""
+        self.fs       = fs
+        self.nperseg  = nperseg
+        self.noverlap = noverlap
+        self.hop      = nperseg - noverlap
+        self.win      = get_window(window, nperseg)
+        self.window   = window
+        self.freqs    = np.fft.rfftfreq(nperseg, d=1.0/fs)
+        self.buffer   = np.zeros(nperseg // 2)  # 先頭の境界（0埋め）
+        self.nframes  = 0                       # 出力済みのフレーム数
+        self.nsamples = 0                       # 入力済みのサンプル数
+
+    def _frames(self) -> tuple:
+        """バッファから計算可能なフレームを取り出してSTFTの絶対値を計算"""
+        nseg = (len(self.buffer) - self.nperseg) // self.hop + 1 if len(self.buffer) >= self.nperseg else 0
+        if nseg == 0:
+            return np.empty(0), np.empty((0, len(self.freqs)))
+        segments = np.lib.stride_tricks.sliding_window_view(self.buffer, self.nperseg)[::self.hop][:nseg]
+        spec     = np.abs(np.fft.rfft(segments * self.win, axis=1) / self.win.sum())
+        times    = (self.nframes + np.arange(nseg)) * self.hop / self.fs
+        self.nframes += nseg
+        self.buffer   = self.buffer[nseg * self.hop:]
+        return times, spec
+
+    def push(self, samples: np.ndarray) -> tuple:
+        """サンプルを追加し，確定したフレームの (時刻, |STFT|) を返す"""
+        self.nsamples += len(samples)
+        self.buffer    = np.concatenate([self.buffer, samples])
+        if self.nsamples < self.nperseg:
+            # 信号長がnpersegに満たない間は窓長が確定しないため保留
+            return np.empty(0), np.empty((0, len(self.freqs)))
+        return self._frames()
+
+    def finish(self) -> tuple:
+        """末尾の境界（0埋め）を追加し，残りのフレームを返す"""
+        if self.nsamples < self.nperseg:
+            # 信号長がnpersegより短い場合は，PhaSignalProcessorと同様にnpersegを信号長に合わせて計算
+            series   = self.buffer[self.nperseg // 2:]
+            nperseg  = max(1, len(series))
+            noverlap = min(self.noverlap, nperseg-1)
+            self.freqs, times, Zxx = stft(series, fs=self.fs, window=self.window, nperseg=nperseg, noverlap=noverlap)
+            return times, np.abs(Zxx).T
+        padded = self.nsamples + 2 * (self.nperseg // 2)
+        nadd   = (-(padded - self.nperseg) % self.hop) % self.nperseg
+        self.buffer = np.concatenate([self.buffer, np.zeros(self.nperseg // 2 + nadd)])
+        return self._frames()
+
+class ChunkedPhaSignalProcessor:
+    """
+    位相成分の信号処理をチャンク単位で行うクラス
+
+    PhaSignalProcessorと同じ処理（未使用サブキャリア除去 → 位相アンラップ → 線形ドリフト除去 → PCA → STFT）を，
+    ファイル全体をメモリに載せずに行う．
+    - 未使用サブキャリアの判定はファイル全体を1度走査して決定
+    - アンラップは直前のチャンクの最終行を引き継いで連続させる
+    - PCAは共分散行列をチャンクごとに統合して求め，ドリフト除去後のデータは一時ファイルに退避する
+    - STFTは直前のチャンクの末尾を持ち越して窓を連続させる
+    """
+
+    def __init__(self, path: str, chunksize: int = 10000, work_dir: str = None):
+        """コンストラクタ"""
+        self.reader      = ChunkedReader(path, chunksize=chunksize)                       # 入力CSVファイル
+        self.subcarriers = [col for col in self.reader.get_columns() if col != "Time"]    # サブキャリア列
+        self.work_dir    = work_dir                                                       # 一時ファイルの保存先
+        self.columns     = None                                                           # 使用するサブキャリア列
+        self.keep        = None                                                           # 使用するサブキャリア列のマスク
+        self.last_row    = None                                                           # 直前のチャンクのアンラップ済み最終行
+
+    def _iter_rows(self):
+        """全サブキャリア列をチャンク単位で返す（欠損を含む行は除去）"""
+        for values in self.reader.iter_arrays(columns=self.subcarriers):
+            yield values[~np.any(np.isnan(values), axis=1)]
+
+    def remove_zero_subcarriers(self) -> list:
+        """全ての値が0のサブキャリア列を除いた列名を決定する（ファイル全体を1度走査）"""
+        nonzero = np.zeros(len(self.subcarriers), dtype=bool)
+        for values in self._iter_rows():
+            nonzero |= np.any(values != 0, axis=0)
+        self.columns = [col for col, keep in zip(self.subcarriers, nonzero) if keep]
+        self.keep    = nonzero
+        return self.columns
+
+    def iter_chunks(self):
+        """使用するサブキャリア列をチャンク単位で返す"""
+        if self.columns is None:
+            self.remove_zero_subcarriers()
+        for values in self._iter_rows():
+            yield values[:, self.keep]
+
+    def unwrap_phase(self, values: np.ndarray) -> np.ndarray:
+        """直前のチャンクから連続するように，時間方向に位相をアンラップする"""
+        if len(values) == 0:
+            return values
+        if self.last_row is None:
+            unwrapped = np.unwrap(values, axis=0)
+        else:
+            unwrapped = np.unwrap(np.vstack([self.last_row, values]), axis=0)[1:]
+        self.last_row = unwrapped[-1:]
+        return unwrapped
+
+    @staticmethod
+    def remove_linear_drift(values: np.ndarray) -> np.ndarray:
+        """各時刻ごとにサブキャリア方向の回帰直線（傾き＋オフセット）を除去する（全行をまとめて計算）"""
+        x     = np.arange(values.shape[1], dtype=np.float64)
+        x_c   = x - x.mean()
+        slope = (values - values.mean(axis=1, keepdims=True)) @ x_c / (x_c @ x_c)
+        drift = values.mean(axis=1, keepdims=True) + slope[:, None] * x_c[None, :]
+        return values - drift
+
+    @staticmethod
+    def _merge_moments(n_a: int, mean_a: np.ndarray, m2_a: np.ndarray, values: np.ndarray) -> tuple:
+        """平均と偏差積和行列にチャンクを統合する"""
+        n_b    = len(values)
+        mean_b = values.mean(axis=0)
+        m2_b   = (values - mean_b).T @ (values - mean_b)
+        n      = n_a + n_b
+        delta  = mean_b - mean_a
+        mean   = mean_a + delta * n_b / n
+        m2     = m2_a + m2_b + np.outer(delta, delta) * n_a * n_b / n
+        return n, mean, m2
+
+    @staticmethod
+    def pca_components(mean: np.ndarray, m2: np.ndarray, n: int, n_components: int) -> np.ndarray:
+        """共分散行列の固有ベクトルから主成分を求める（符号はscikit-learnのPCAと同じ規則で決定）"""
+        eigvals, eigvecs = np.linalg.eigh(m2 / max(n - 1, 1))
+        components = eigvecs[:, ::-1][:, :n_components].T
+        signs      = np.sign(components[np.arange(n_components), np.argmax(np.abs(components), axis=1)])
+        return components * signs[:, None]
+
+    def process(self, save_path: str, n_components: int = 1, column: str = "PC1", fs: float = 50.0,
+                nperseg: int = 128, noverlap: int = 64) -> int:
+        """全ての処理を行い，スペクトログラムをCSVファイルに保存する（保存したフレーム数を返す）"""
+        self.last_row = None
+        fd, tmp_path  = tempfile.mkstemp(suffix=".f64", dir=self.work_dir)
+        try:
+            # 1回目：アンラップ・ドリフト除去を行い一時ファイルに退避しつつ，PCAの統計量を集計
+            n, mean, m2 = 0, None, None
+            with os.fdopen(fd, "wb") as f:
+                for values in self.iter_chunks():
+                    if len(values) == 0:
+                        continue
+                    corrected = self.remove_linear_drift(self.unwrap_phase(values))
+                    corrected.tofile(f)
+                    if mean is None:
+                        mean, m2 = np.zeros(corrected.shape[1]), np.zeros((corrected.shape[1], corrected.shape[1]))
+                    n, mean, m2 = self._merge_moments(n, mean, m2, corrected)
+
+            # 2回目：主成分に射影し，STFTをチャンク単位で計算して保存
+            spectrogram = ChunkedSpectrogram(fs=fs, nperseg=nperseg, noverlap=noverlap)
+            writer      = ChunkedWriter(save_path, columns=list(spectrogram.freqs))
+            if n > 0:
+                components = self.pca_components(mean, m2, n, n_components)
+                data       = np.memmap(tmp_path, dtype=np.float64, mode="r").reshape(n, len(self.columns))
+                series_idx = int(column.replace("PC", "")) - 1
+                for start in range(0, n, self.reader.chunksize):
+                    series = (data[start:start+self.reader.chunksize] - mean) @ components[series_idx]
+                    times, spec = spectrogram.push(series)
+                    if len(times) > 0:
+                        writer.write(spec, index=times)
+                del data
+            times, spec = spectrogram.finish()
+            writer.columns = list(spectrogram.freqs)
+            writer.write(spec, index=times)
+            return writer.nrows
+        finally:
+            os.remove(tmp_path)
@@ -0,0 +1,88 @@
+import numpy as np
+
+from .chunked_io import ChunkedReader, ChunkedWriter
+
+def delayed_devices(times: np.ndarray, alpha: float) -> np.ndarray:
+    """受信時刻が一致しない行で，後ろにずらすデバイスを判定する（Trueのデバイスは行を保持，それ以外は行を除去）"""
+    delayed = np.zeros(len(times), dtype=bool)
+    while np.nanstd(np.where(delayed, np.nan, times)) > alpha:
+        delayed[np.nanargmax(np.where(delayed, np.nan, times))] = True
+    return delayed
+
+class ChunkedTimeAdjuster:
+    """
+    受信時刻補正をチャンク単位で行うクラス
+
+    TimeAdjusterと同じ規則（各行の受信時刻の標準偏差が閾値を超える場合，受信時刻が最大のデバイスの行を
+    1つ後ろにずらし，その行を全デバイスから除去する）を，デバイスごとの読み出し位置を進める形で適用する．
+    一致している区間はまとめて判定・出力するため，メモリ使用量はチャンクサイズにのみ依存する．
+    """
+
+    def __init__(self, path_dict: dict, alpha: float, chunksize: int = 10000):
+        """コンストラクタ"""
+        self.path_dict = path_dict # デバイス名 -> CSVファイルのパス
+        self.alpha     = alpha     # 標準偏差の閾値
+        self.chunksize = chunksize # 1チャンクの行数
+        self.nremoved  = 0         # 除去した行数
+
+    def _refill(self, key: str, buffers: dict, ptr: dict, readers: dict) -> None:
+        """読み出し位置以降の行数がチャンクサイズ未満であれば，次のチャンクを読み込む"""
+        if readers[key] is None or len(buffers[key]) - ptr[key] >= self.chunksize:
+            return
+        try:
+            chunk = next(readers[key])
+        except StopIteration:
+            readers[key] = None
+            return
+        buffers[key] = np.concatenate([buffers[key][ptr[key]:], chunk])
+        ptr[key]     = 0
+
+    def _delayed(self, times: np.ndarray) -> np.ndarray:
+        """受信時刻が一致しない行で，後ろにずらすデバイスを判定する（Trueのデバイスは行を保持）"""
+        return delayed_devices(times, self.alpha)
+
+    def adjust_time(self, save_path_dict: dict) -> int:
+        """受信時刻の補正を行い，デバイスごとのCSVファイルに保存する（保存した行数を返す）"""
+        keys      = list(self.path_dict.keys())
+        columns   = ChunkedReader(self.path_dict[keys[0]]).get_columns()
+        time_col  = columns.index("Time")
+        readers   = {key: iter(ChunkedReader(self.path_dict[key], chunksize=self.chunksize).iter_arrays(columns=columns)) for key in keys}
+        buffers   = {key: np.empty((0, len(columns)), dtype=np.float64) for key in keys}
+        ptr       = {key: 0 for key in keys}
+        writers   = {key: ChunkedWriter(save_path_dict[key], columns=columns) for key in keys}
+        pending   = {key: [] for key in keys}
+        npending  = 0
+
+        while True:
+            for key in keys:
+                self._refill(key, buffers, ptr, readers)
+            avail = min(len(buffers[key]) - ptr[key] for key in keys)
+            if avail == 0:
+                break
+
+            # 受信時刻が一致している先頭からの区間をまとめて出力
+            times = np.stack([buffers[key][ptr[key]:ptr[key]+avail, time_col] for key in keys], axis=1)
+            bad   = np.flatnonzero(np.nanstd(times, axis=1) > self.alpha)
+            nok   = int(bad[0]) if len(bad) > 0 else avail
+            for key in keys:
+                pending[key].append(buffers[key][ptr[key]:ptr[key]+nok])
+                ptr[key] += nok
+            npending += nok
+
+            # 一致しない行：ずらさないデバイスの行を除去
+            if nok < avail:
+                delayed = self._delayed(times[nok])
+                for key, keep in zip(keys, delayed):
+                    if not keep:
+                        ptr[key] += 1
+                self.nremoved += 1
+
+            if npending >= self.chunksize:
+                for key in keys:
+                    writers[key].write(np.concatenate(pending[key]))
+                    pending[key] = []
+                npending = 0
+
+        for key in keys:
+            writers[key].write(np.concatenate(pending[key]) if pending[key] else np.empty((0, len(columns))))
+        return writers[keys[0]].nrows
@@ -0,0 +1,168 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .chunked_io import ChunkedReader
+
+class CorrelationAccumulator:
+    """
+    平均と偏差積和行列をチャンク単位で更新し，相関係数行列を求めるクラス（Welford法・Chanの併合式）
+
+    ファイル・日ごとに計算したものをmergeで統合できるため，全データを読み直さずに
+    任意の期間の相関係数行列を求められる．NaNを含む行は除外する（pandasのcorrとは異なり，行単位で除外）．
+    """
+
+    def __init__(self, columns: list):
+        """コンストラクタ"""
+        self.columns = list(columns)                                     # 列名
+        self.n       = 0                                                 # 行数
+        self.mean    = np.zeros(len(self.columns))                       # 平均
+        self.m2      = np.zeros((len(self.columns), len(self.columns)))  # 偏差積和行列
+
+    def _combine(self, n_b: int, mean_b: np.ndarray, m2_b: np.ndarray) -> None:
+        """別の (行数, 平均, 偏差積和行列) を統合"""
+        if n_b == 0:
+            return
+        n          = self.n + n_b
+        delta      = mean_b - self.mean
+        self.m2    = self.m2 + m2_b + np.outer(delta, delta) * self.n * n_b / n
+        self.mean  = self.mean + delta * n_b / n
+        self.n     = n
+
+    def update(self, values: np.ndarray) -> "CorrelationAccumulator":
+        """チャンク (行数, 列数) を追加"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values) > 0:
+            mean = values.mean(axis=0)
+            self._combine(len(values), mean, (values - mean).T @ (values - mean))
+        return self
+
+    def merge(self, other: "CorrelationAccumulator") -> "CorrelationAccumulator":
+        """別の累積値を統合（列名が一致している必要がある）"""
+        if other.columns != self.columns:
+            raise ValueError("列名が一致しません")
+        self._combine(other.n, other.mean, other.m2)
+        return self
+
+    @classmethod
+    def merge_all(cls, accumulators: list, columns: list = None) -> "CorrelationAccumulator":
+        """複数の累積値を統合した新しい累積値を返す"""
+        merged = cls(columns if columns is not None else accumulators[0].columns)
+        for accumulator in accumulators:
+            merged.merge(accumulator)
+        return merged
+
+    def covariance(self, ddof: int = 1) -> np.ndarray:
+        """共分散行列"""
+        return self.m2 / max(self.n - ddof, 1)
+
+    def correlation(self) -> np.ndarray:
+        """相関係数行列（分散が0の列はNaN）"""
+        std = np.sqrt(np.diag(self.m2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self.m2 / np.outer(std, std)
+        return np.clip(corr, -1.0, 1.0)
+
+    def save(self, path: str, **meta) -> None:
+        """累積値をNPZファイルに保存（metaは付加情報として保存）"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(f, columns=np.array(self.columns, dtype=str), n=self.n, mean=self.mean, m2=self.m2, **meta)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "CorrelationAccumulator":
+        """saveで保存した累積値を読み込む"""
+        with np.load(path) as data:
+            accumulator      = cls(data["columns"].tolist())
+            accumulator.n    = int(data["n"])
+            accumulator.mean = data["mean"]
+            accumulator.m2   = data["m2"]
+        return accumulator
+
+def subcarrier_accumulator(path: str, chunksize: int = 10000, exclude: list = ("Time",)) -> CorrelationAccumulator:
+    """1つのCSVファイルのサブキャリア（列）間の相関の累積値を計算"""
+    reader      = ChunkedReader(path, chunksize=chunksize)
+    columns     = [col for col in reader.get_columns() if col not in exclude]
+    accumulator = CorrelationAccumulator(columns)
+    for values in reader.iter_arrays(columns=columns):
+        accumulator.update(values)
+    return accumulator
+
+def device_accumulator(path_dict: dict, chunksize: int = 10000, exclude: list = ("Time",)) -> CorrelationAccumulator:
+    """
+    時刻補正済みの同名ファイル（デバイス名 -> CSVファイルのパス）について，
+    サブキャリア平均の時系列のデバイス間の相関の累積値を計算（行数が異なる場合は短い方に合わせる）
+    """
+    devices = list(path_dict.keys())
+    readers = [ChunkedReader(path_dict[device], chunksize=chunksize) for device in devices]
+    columns = [[col for col in reader.get_columns() if col not in exclude] for reader in readers]
+    accumulator = CorrelationAccumulator(devices)
+    for chunks in zip(*[reader.iter_arrays(columns=cols) for reader, cols in zip(readers, columns)]):
+        nrows = min(len(chunk) for chunk in chunks)
+        accumulator.update(np.column_stack([np.nanmean(chunk[:nrows], axis=1) for chunk in chunks]))
+    return accumulator
+
+def _cached_accumulator(path: str, cache_path: str, chunksize: int) -> tuple:
+    """ワーカープロセス：ファイルの累積値を計算して保存（保存済みでCSVが更新されていなければ読み込む）"""
+    mtime = os.stat(path).st_mtime_ns
+    if cache_path is not None and os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            cached = int(data["mtime_ns"]) == mtime
+        if cached:
+            return path, CorrelationAccumulator.load(cache_path)
+    accumulator = subcarrier_accumulator(path, chunksize=chunksize)
+    if cache_path is not None:
+        accumulator.save(cache_path, mtime_ns=mtime)
+    return path, accumulator
+
+def accumulate_files(paths: list, cache_dir: str = None, chunksize: int = 10000, max_workers: int = None) -> dict:
+    """
+    複数のCSVファイルのサブキャリア間の相関の累積値をプロセスで並列に計算
+
+    cache_dirを指定すると，ファイルごとの累積値を {cache_dir}/{ファイル名}.npz に保存し，
+    次回以降は新しいファイル・更新されたファイルのみを計算する．
+
+    return
+    ------
+    dict
+        ファイルパス -> CorrelationAccumulator
+    """
+    cache_paths = [os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}.npz") if cache_dir else None for path in paths]
+    if max_workers == 1 or len(paths) <= 1:
+        return dict(_cached_accumulator(path, cache_path, chunksize) for path, cache_path in zip(paths, cache_paths))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return dict(executor.map(_cached_accumulator, paths, cache_paths, [chunksize] * len(paths)))
+
+def draw_correlation(figure, ax, corr: np.ndarray, labels: list, title: str = "", max_ticks: int = 32) -> None:
+    """相関係数行列のヒートマップを指定した軸に描画（目盛りラベルは最大max_ticks個に間引く）"""
+    image = ax.imshow(corr, cmap="coolwarm", vmin=-1.0, vmax=1.0, interpolation="nearest")
+    ticks = np.arange(0, len(labels), max(1, int(np.ceil(len(labels) / max_ticks))))
+    ax.set_xticks(ticks, [labels[i] for i in ticks], rotation=90, fontsize=6)
+    ax.set_yticks(ticks, [labels[i] for i in ticks], fontsize=6)
+    ax.set_title(title)
+    figure.colorbar(image, ax=ax, fraction=0.046, pad=0.04)
+
+def plot_correlation(corr: np.ndarray, labels: list, save_path: str, title: str = "", max_ticks: int = 32,
+                     figsize: float = 8.0, dpi: int = 150) -> None:
+    """
+    相関係数行列をヒートマップとして保存
+
+    列数によらず図の大きさを一定にし，目盛りラベルは最大max_ticks個に間引く．
+    """
+    import matplotlib.pyplot as plt
+    figure, ax = plt.subplots(figsize=(figsize, figsize))
+    draw_correlation(figure, ax, corr, labels, title=title, max_ticks=max_ticks)
+    os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+    figure.savefig(save_path, dpi=dpi, bbox_inches="tight")
+    plt.close(figure)
+
+# 使用例
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(10000, 5)) @ rng.normal(size=(5, 5))
+    # 3分割して別々に計算した累積値を統合
+    parts = [CorrelationAccumulator(list("ABCDE")).update(part) for part in np.array_split(data, 3)]
+    merged = CorrelationAccumulator.merge_all(parts)
+    print(np.abs(merged.correlation() - np.corrcoef(data, rowvar=False)).max())
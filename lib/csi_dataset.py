@@ -0,0 +1,209 @@
+import os
+import json
+import queue
+import threading
+import numpy as np
+
+from .chunked_io import ChunkedReader
+
+class CSIWindowDataset:
+    """
+    デバイス間で時刻補正済みのCSI・スペクトログラムのCSVを固定長の窓に分割して返すデータセット
+
+    各CSVは初回のみチャンク単位でfloat32のバイナリ（{cache_dir}/{デバイス名}/{ファイル名}.f32）に変換し，
+    以降はメモリマップで窓を切り出すため，全データをメモリに載せずに学習に使用できる．
+    1サンプルは (デバイス数, 窓長, 特徴量数) の配列で，窓はファイルをまたがない．
+    """
+
+    def __init__(self, file_dict: dict, cache_dir: str, window: int, stride: int = None, labels=None,
+                 chunksize: int = 10000):
+        """
+        コンストラクタ
+
+        params
+        ------
+        file_dict: dict
+            ファイル名 -> {デバイス名: CSVファイルのパス}（全てのファイルで同じデバイスの組を指定）
+        cache_dir: str
+            変換したバイナリの保存先
+        window: int
+            窓長 [行]
+        stride: int
+            窓の移動量 [行]（省略時は窓長）
+        labels: dict or callable
+            ファイル名 -> ラベルの辞書，または (ファイル名, 窓の先頭時刻, 窓の末尾時刻) -> ラベル の関数（省略時はラベルなし）
+        chunksize: int
+            CSVを変換する際の1チャンクの行数
+        """
+        self.file_names = sorted(file_dict.keys())
+        self.devices    = list(file_dict[self.file_names[0]].keys()) if self.file_names else []
+        self.cache_dir  = cache_dir
+        self.window     = window
+        self.stride     = stride or window
+        self.chunksize  = chunksize
+        self.arrays     = {}   # (ファイル番号, デバイス名) -> 特徴量のメモリマップ
+        self.times      = {}   # ファイル番号 -> 時刻（先頭デバイス）
+        self.columns    = None # 特徴量の列名
+        self.sources    = {}   # ファイル名 -> {デバイス名: CSVの更新時刻}（特徴量ストアの再計算の判定用）
+
+        # ファイルごとに変換し，全デバイスで共通の行数から窓を作成
+        win_file, win_start = [], []
+        for file_idx, file_name in enumerate(self.file_names):
+            nrows = min(self._open(file_idx, device, file_dict[file_name][device]) for device in self.devices)
+            starts = np.arange(0, nrows - self.window + 1, self.stride)
+            win_file.append(np.full(len(starts), file_idx))
+            win_start.append(starts)
+        self.win_file  = np.concatenate(win_file)  if win_file else np.empty(0, dtype=int)
+        self.win_start = np.concatenate(win_start) if win_start else np.empty(0, dtype=int)
+        self.labels    = self._make_labels(labels)
+
+    @classmethod
+    def from_catalog(cls, catalog, stage: str, kind: str, devices: list, cache_dir: str, window: int,
+                     start=None, end=None, **kwargs):
+        """データセットカタログから，全デバイスに共通するファイルでデータセットを作成"""
+        file_names = catalog.common_files(stage=stage, kind=kind, devices=devices, start=start, end=end)
+        file_dict  = {name: {device: catalog.get_path(stage, device, name, kind=kind) for device in devices} for name in file_names}
+        return cls(file_dict, cache_dir=os.path.join(cache_dir, stage, kind), window=window, **kwargs)
+
+    def _convert(self, csv_path: str, cache_path: str) -> dict:
+        """CSVをチャンク単位でfloat32のバイナリに変換（Time列，なければインデックスを時刻として別に保存）"""
+        reader  = ChunkedReader(csv_path, chunksize=self.chunksize)
+        columns = reader.get_columns()
+        nrows   = 0
+        with open(f"{cache_path}.tmp", "wb") as f_values, open(f"{cache_path}.time.tmp", "wb") as f_times:
+            for chunk in reader:
+                if "Time" in chunk.columns:
+                    times = chunk["Time"].to_numpy(dtype=np.float64)
+                    chunk = chunk.drop(columns="Time")
+                else:
+                    times = chunk.index.to_numpy(dtype=np.float64)
+                chunk.to_numpy(dtype=np.float32).tofile(f_values)
+                times.tofile(f_times)
+                nrows += len(chunk)
+        os.replace(f"{cache_path}.tmp", cache_path)
+        os.replace(f"{cache_path}.time.tmp", f"{cache_path}.time")
+        meta = {"rows": nrows, "columns": [col for col in columns if col != "Time"], "mtime": os.stat(csv_path).st_mtime}
+        with open(f"{cache_path}.json", "w") as f:
+            json.dump(meta, f)
+        return meta
+
+    def _open(self, file_idx: int, device: str, csv_path: str) -> int:
+        """変換済みのバイナリをメモリマップで開く（未変換・CSVが更新されている場合は変換），行数を返す"""
+        cache_path = os.path.join(self.cache_dir, device, f"{os.path.splitext(self.file_names[file_idx])[0]}.f32")
+        meta       = None
+        if os.path.exists(f"{cache_path}.json"):
+            with open(f"{cache_path}.json", "r") as f:
+                meta = json.load(f)
+            if meta["mtime"] != os.stat(csv_path).st_mtime:
+                meta = None
+        if meta is None:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            meta = self._convert(csv_path, cache_path)
+        if self.columns is None:
+            self.columns = meta["columns"]
+        elif len(meta["columns"]) != len(self.columns):
+            raise ValueError(f"特徴量の数が一致しません: {csv_path}")
+        self.sources.setdefault(self.file_names[file_idx], {})[device] = meta["mtime"]
+        shape = (meta["rows"], len(meta["columns"]))
+        self.arrays[(file_idx, device)] = np.memmap(cache_path, dtype=np.float32, mode="r", shape=shape) if meta["rows"] > 0 else np.empty(shape, dtype=np.float32)
+        if file_idx not in self.times:
+            self.times[file_idx] = np.fromfile(f"{cache_path}.time", dtype=np.float64)
+        return meta["rows"]
+
+    def _make_labels(self, labels) -> np.ndarray:
+        """窓ごとのラベルを作成"""
+        if labels is None:
+            return None
+        if isinstance(labels, dict):
+            return np.array([labels[self.file_names[f]] for f in self.win_file])
+        return np.array([
+            labels(self.file_names[f], self.times[f][s], self.times[f][s + self.window - 1])
+            for f, s in zip(self.win_file, self.win_start)
+        ])
+
+    def __len__(self) -> int:
+        return len(self.win_file)
+
+    def __getitem__(self, index: int) -> tuple:
+        """1つの窓 (デバイス数, 窓長, 特徴量数) とラベルを返す"""
+        x, y = self.get_batch([index])
+        return x[0], (y[0] if y is not None else None)
+
+    def get_times(self, index: int) -> np.ndarray:
+        """窓の各行の時刻を返す"""
+        file_idx, start = self.win_file[index], self.win_start[index]
+        return self.times[file_idx][start:start + self.window]
+
+    def get_batch(self, indices) -> tuple:
+        """複数の窓をまとめて (窓数, デバイス数, 窓長, 特徴量数) の配列とラベルで返す"""
+        indices = np.asarray(indices)
+        batch   = np.empty((len(indices), len(self.devices), self.window, len(self.columns)), dtype=np.float32)
+        # 同じファイルの窓をまとめて切り出す
+        for file_idx in np.unique(self.win_file[indices]):
+            pos  = np.flatnonzero(self.win_file[indices] == file_idx)
+            rows = self.win_start[indices[pos]][:, None] + np.arange(self.window)[None, :]
+            for d, device in enumerate(self.devices):
+                batch[pos, d] = self.arrays[(file_idx, device)][rows]
+        return batch, (self.labels[indices] if self.labels is not None else None)
+
+    def iter_batches(self, batch_size: int = 32, shuffle: bool = True, seed: int = 0, drop_last: bool = False, prefetch: int = 2):
+        """
+        バッチ単位で (X, y) を返すイテレータ
+
+        バッチの切り出しはバックグラウンドのスレッドで行い，最大prefetch個を先読みする．
+        シャッフルは窓の索引のみを並べ替えるため，データ自体はメモリに載せない．
+        """
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        stop  = len(order) - len(order) % batch_size if drop_last else len(order)
+        batches = [order[i:min(i + batch_size, stop)] for i in range(0, stop, batch_size)]
+
+        buffer   = queue.Queue(maxsize=max(prefetch, 1))
+        finished = threading.Event()
+        def put(item) -> bool:
+            """打ち切られるまで待ちながらキューに追加（打ち切られた場合はFalse）"""
+            while not finished.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer():
+            try:
+                for indices in batches:
+                    if not put(self.get_batch(indices)):
+                        return
+                put(None)
+            except Exception as e:
+                put(e)
+
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 途中で打ち切られた場合も先読みスレッドを終了させる
+            finished.set()
+            thread.join()
+
+# 使用例
+if __name__ == "__main__":
+    from .util import Util
+    from .dataset_catalog import DatasetCatalog
+    group1_devices = ["minelab-iot-nexmon-1", "minelab-iot-nexmon-2", "minelab-iot-nexmon-3", "minelab-iot-nexmon-4"]
+    with DatasetCatalog() as catalog:
+        dataset = CSIWindowDataset.from_catalog(
+            catalog, stage="adjusted-data", kind="amp", devices=group1_devices,
+            cache_dir=f"{Util.get_root_dir()}/data/cache", window=256, stride=128
+        )
+    print("Windows: ", len(dataset))
+    for x, y in dataset.iter_batches(batch_size=32):
+        print(x.shape)
+        break
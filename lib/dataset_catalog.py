@@ -0,0 +1,210 @@
+import os
+import sqlite3
+from datetime import datetime
+
+from .util import Util
+from .interleaved import read_pcap_summary
+
+# 登録するファイル形式（拡張子 -> 形式名）
+FORMATS = {".pcap": "pcap", ".csv": "csv", ".jpg": "jpg", ".jpeg": "jpg", ".png": "png"}
+
+# 処理段階（data/ 以下のディレクトリ名）
+STAGES = ["pcap-data", "csv-data", "adjusted-data", "adjusted-data-natori", "preprocessed-data", "image-data"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path     TEXT PRIMARY KEY, -- data/ からの相対パス
+    stage    TEXT NOT NULL,    -- 処理段階（pcap-data, csv-data, ...）
+    device   TEXT NOT NULL,    -- デバイス名
+    kind     TEXT NOT NULL,    -- データ種別（amp, pha, PCAP・画像は空文字）
+    variant  TEXT NOT NULL,    -- 分割保存のサブディレクトリ（MACアドレス・コア/ストリーム，なければ空文字）
+    name     TEXT NOT NULL,    -- ファイル名
+    start    REAL,             -- ファイル名の日時（エポック秒）
+    duration REAL,             -- 記録時間 [s]
+    rows     INTEGER,          -- 行数（PCAPはレコード数）
+    format   TEXT NOT NULL,    -- ファイル形式
+    size     INTEGER NOT NULL, -- ファイルサイズ
+    mtime    REAL NOT NULL     -- 更新時刻
+);
+CREATE INDEX IF NOT EXISTS artifacts_stage_kind_start ON artifacts (stage, kind, start);
+CREATE INDEX IF NOT EXISTS artifacts_device_start ON artifacts (device, start);
+"""
+
+class DatasetCatalog:
+    """
+    data/ 以下の全ての成果物（PCAP・CSV・画像）を記録するSQLiteカタログ
+
+    ファイル名の日時・記録時間・行数・形式をデバイス／処理段階ごとに保持し，
+    ディレクトリ走査やパスの組み立てを行わずに時間範囲で検索できるようにする．
+    更新時はサイズ・更新時刻が変わったファイルのみを再検査する．
+    PCAPの検査ではファイルの隣にサイドカーインデックス（.idx.npz）を作成する（書き込めない場所では作成しない）．
+    """
+
+    def __init__(self, data_dir: str = None, db_path: str = None):
+        """コンストラクタ"""
+        self.data_dir = str(data_dir or f"{Util.get_root_dir()}/data") # データディレクトリ
+        self.db_path  = str(db_path or f"{self.data_dir}/catalog.sqlite") # カタログのパス
+        Util.create_path(os.path.dirname(os.path.abspath(self.db_path)))
+        self.conn     = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """カタログを閉じる"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _to_epoch(value) -> float:
+        """日時（datetime・「YYYY-MM-DDThh-mm-ss」形式の文字列・エポック秒）をエポック秒に変換"""
+        if value is None or isinstance(value, (int, float)):
+            return value
+        if isinstance(value, str):
+            value = datetime.strptime(value, Util.TIMESTAMP_FORMAT)
+        return value.timestamp()
+
+    @staticmethod
+    def _inspect_csv(path: str) -> tuple:
+        """CSVファイルの行数と記録時間（Time列，なければインデックス列の末尾と先頭の差）を取得"""
+        with open(path, "rb") as f:
+            header = f.readline().decode().rstrip("\r\n").split(",")
+            first  = f.readline()
+            if not first.strip():
+                return 0, None
+            # 改行を数えて行数を取得（末尾に改行がない場合は1行加える）
+            rows, tail = 1, b"\n"
+            for block in iter(lambda: f.read(1 << 20), b""):
+                rows += block.count(b"\n")
+                tail  = block[-1:]
+            rows += tail != b"\n"
+            # 末尾の行を取得
+            f.seek(max(0, f.tell() - 65536))
+            last = f.read().rstrip(b"\r\n").rsplit(b"\n", 1)[-1]
+        col = header.index("Time") if "Time" in header else 0
+        try:
+            duration = float(last.decode().split(",")[col]) - float(first.decode().split(",")[col])
+        except (ValueError, IndexError):
+            duration = None
+        return rows, duration if duration == duration else None
+
+    def _inspect(self, path: str, fmt: str) -> tuple:
+        """
+        ファイル形式ごとに行数と記録時間を取得
+
+        読み取れないファイル（壊れた・Nexmon以外のPCAPなど）は行数・記録時間をNone（NULL）とし，他のファイルの登録を止めない．
+        PCAPはサイドカーインデックス（{path}.idx.npz）を作成・使用して検査する（以降の読み取りでも再利用される）．
+        """
+        try:
+            if fmt == "pcap":
+                summary = read_pcap_summary(path)
+                return summary["nrecords"], summary["duration"]
+            if fmt == "csv":
+                return self._inspect_csv(path)
+        except (OSError, ValueError):
+            return None, None
+        return None, None
+
+    def _walk(self, stage: str):
+        """処理段階のディレクトリを走査し，(デバイス, 種別, サブディレクトリ, 相対パス, ファイルカタログ) を返す"""
+        stage_dir = f"{self.data_dir}/{stage}"
+        if not os.path.isdir(stage_dir):
+            return
+        for device in Util.get_dir_list(stage_dir):
+            stack = [[]]
+            while stack:
+                parts = stack.pop()
+                path  = "/".join([stage_dir, device] + parts)
+                for entry in Util.get_file_catalog(path):
+                    if os.path.splitext(entry["name"])[1].lower() in FORMATS:
+                        kind    = parts[0] if parts else ""
+                        variant = "/".join(parts[1:])
+                        yield device, kind, variant, "/".join([stage, device] + parts + [entry["name"]]), entry
+                stack.extend([parts + [d] for d in reversed(Util.get_dir_list(path))])
+
+    def refresh(self, stages: list = None) -> int:
+        """カタログを更新する（変更のあったファイルのみ再検査し，追加・更新・削除した件数を返す）"""
+        stages  = stages or STAGES
+        known   = {row["path"]: (row["size"], row["mtime"]) for row in self.conn.execute(
+            f"SELECT path, size, mtime FROM artifacts WHERE stage IN ({','.join('?' * len(stages))})", stages)}
+        seen    = set()
+        updates = []
+        for stage in stages:
+            for device, kind, variant, rel_path, entry in self._walk(stage):
+                seen.add(rel_path)
+                if known.get(rel_path) == (entry["size"], entry["mtime"]):
+                    continue
+                fmt        = FORMATS[os.path.splitext(entry["name"])[1].lower()]
+                rows, dur  = self._inspect(f"{self.data_dir}/{rel_path}", fmt)
+                start      = entry["datetime"].timestamp() if entry["datetime"] is not None else None
+                updates.append((rel_path, stage, device, kind, variant, entry["name"], start, dur, rows, fmt, entry["size"], entry["mtime"]))
+        removed = [(path,) for path in known.keys() - seen]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", updates)
+            self.conn.executemany("DELETE FROM artifacts WHERE path = ?", removed)
+        return len(updates) + len(removed)
+
+    def query(self, stage: str = None, kind: str = None, devices: list = None, start=None, end=None,
+              variant: str = "", fmt: str = None) -> list:
+        """
+        条件に一致する成果物を開始時刻・デバイス順に返す
+
+        params
+        ------
+        stage: str
+            処理段階（pcap-data, csv-data, adjusted-data, ...）
+        kind: str
+            データ種別（amp, pha）
+        devices: list
+            デバイス名のリスト
+        start, end:
+            時間範囲 [start, end)（datetime・「YYYY-MM-DDThh-mm-ss」形式の文字列・エポック秒）．記録時間が範囲と重なるものを返す
+        variant: str
+            分割保存のサブディレクトリ（Noneの場合は全て）
+        fmt: str
+            ファイル形式
+
+        return
+        ------
+        list
+            成果物（dict）のリスト．pathはdata/からの相対パス
+        """
+        conds, params = [], []
+        for column, value in [("stage", stage), ("kind", kind), ("variant", variant), ("format", fmt)]:
+            if value is not None:
+                conds.append(f"{column} = ?")
+                params.append(value)
+        if devices is not None:
+            conds.append(f"device IN ({','.join('?' * len(devices))})")
+            params.extend(devices)
+        if end is not None:
+            conds.append("start < ?")
+            params.append(self._to_epoch(end))
+        if start is not None:
+            conds.append("start + COALESCE(duration, 0) >= ?")
+            params.append(self._to_epoch(start))
+        where = f"WHERE {' AND '.join(conds)}" if conds else ""
+        return [dict(row) for row in self.conn.execute(f"SELECT * FROM artifacts {where} ORDER BY start, device, path", params)]
+
+    def common_files(self, stage: str, kind: str, devices: list, start=None, end=None, variant: str = "") -> list:
+        """全てのデバイスに共通して存在するファイル名を返す"""
+        names = {}
+        for row in self.query(stage=stage, kind=kind, devices=devices, start=start, end=end, variant=variant):
+            names.setdefault(row["name"], set()).add(row["device"])
+        return sorted(name for name, found in names.items() if len(found) == len(set(devices)))
+
+    def get_path(self, stage: str, device: str, name: str, kind: str = "", variant: str = "") -> str:
+        """成果物の絶対パスを返す"""
+        return "/".join([self.data_dir, stage, device] + [p for p in [kind, variant] if p] + [name])
+
+# 使用例
+if __name__ == "__main__":
+    with DatasetCatalog() as catalog:
+        print("Updated: ", catalog.refresh())
+        group1_devices = ["minelab-iot-nexmon-1", "minelab-iot-nexmon-2", "minelab-iot-nexmon-3", "minelab-iot-nexmon-4"]
+        for row in catalog.query(stage="adjusted-data", kind="amp", devices=group1_devices, start="2025-03-13T00-00-00", end="2025-03-14T00-00-00"):
+            print(row["device"], row["name"], row["rows"], row["duration"])
@@ -0,0 +1,167 @@
+import os
+import json
+import numpy as np
+from scipy.signal import get_window
+
+class FeatureExtractor:
+    """
+    CSIの窓 (窓数, デバイス数, 窓長, サブキャリア数) から特徴量行列 (窓数, 特徴量数) を計算するクラス
+
+    全ての窓・デバイスをまとめてNumPyの配列演算で計算する．
+    - 分散　　　　: サブキャリアごとの時間方向の分散の平均・標準偏差・最大値（デバイスごと）
+    - 帯域エネルギー: STFTのパワーをサブキャリア・フレームで平均し，nbands個の等幅の帯域で合計（デバイスごと）
+    - デバイス間相関: サブキャリア平均の時系列のデバイス間の相関係数（デバイスの組ごと）
+    - PCA　　　　 : サブキャリア間の共分散行列の固有値から求めた上位n_components個の寄与率（デバイスごと）
+    位相（kind="pha"）の場合は，PhaSignalProcessorと同じく窓ごとに時間方向のアンラップ・線形ドリフト除去を行ってから計算する．
+    """
+
+    def __init__(self, fs: float = 100.0, nperseg: int = 32, noverlap: int = 16, nbands: int = 4, n_components: int = 3,
+                 kind: str = "amp"):
+        """コンストラクタ"""
+        self.fs           = fs           # サンプリング周波数 [Hz]
+        self.nperseg      = nperseg      # STFTの窓長
+        self.noverlap     = noverlap     # STFTの重なり
+        self.nbands       = nbands       # 帯域の数
+        self.n_components = n_components # 主成分の数
+        self.kind         = kind         # "amp"（振幅）または "pha"（位相）
+
+    def get_params(self) -> dict:
+        """パラメータを返す"""
+        return {"fs": self.fs, "nperseg": self.nperseg, "noverlap": self.noverlap, "nbands": self.nbands, "n_components": self.n_components,
+                "kind": self.kind}
+
+    def feature_names(self, devices: list) -> list:
+        """特徴量の列名を返す"""
+        names = []
+        for device in devices:
+            names += [f"{device}/var_mean", f"{device}/var_std", f"{device}/var_max"]
+            names += [f"{device}/band{b}" for b in range(self.nbands)]
+            names += [f"{device}/pc{k+1}_ratio" for k in range(self.n_components)]
+        for i in range(len(devices)):
+            for j in range(i + 1, len(devices)):
+                names.append(f"corr/{devices[i]}/{devices[j]}")
+        return names
+
+    def prepare(self, X: np.ndarray) -> np.ndarray:
+        """
+        位相の窓を時間方向にアンラップし，フレームごとにサブキャリア方向の線形ドリフト（傾き＋オフセット）を除去
+
+        窓内で全ての値が0のサブキャリア（Null）は回帰に使用せず，0のままとする．
+        アンラップの2πの整数倍のずれはサブキャリアごとの定数となり，以降の特徴量には影響しないため，窓ごとに独立に処理できる．
+        """
+        if self.kind != "pha":
+            return X
+        X      = np.unwrap(X, axis=2)
+        w      = np.any(X != 0, axis=2, keepdims=True).astype(X.dtype)          # 使用するサブキャリア (窓数, デバイス数, 1, サブキャリア数)
+        x      = np.arange(X.shape[3], dtype=X.dtype)
+        n      = np.maximum(w.sum(axis=3, keepdims=True), 1)
+        x_c    = x - (w * x).sum(axis=3, keepdims=True) / n
+        y_mean = (w * X).sum(axis=3, keepdims=True) / n
+        denom  = (w * x_c * x_c).sum(axis=3, keepdims=True)
+        slope  = np.divide((w * (X - y_mean) * x_c).sum(axis=3, keepdims=True), denom, out=np.zeros_like(y_mean), where=denom > 0)
+        return (X - y_mean - slope * x_c) * w
+
+    def variance(self, X: np.ndarray) -> np.ndarray:
+        """サブキャリアごとの分散の統計量 (窓数, デバイス数, 3)"""
+        var = X.var(axis=2)
+        return np.stack([var.mean(axis=2), var.std(axis=2), var.max(axis=2)], axis=2)
+
+    def band_energies(self, X: np.ndarray) -> np.ndarray:
+        """STFTの帯域ごとのエネルギー (窓数, デバイス数, nbands)"""
+        nperseg = min(self.nperseg, X.shape[2])
+        hop     = max(nperseg - min(self.noverlap, nperseg - 1), 1)
+        win     = get_window("hann", nperseg).astype(X.dtype)
+        frames  = np.lib.stride_tricks.sliding_window_view(X, nperseg, axis=2)[:, :, ::hop] # (窓数, デバイス数, フレーム数, サブキャリア数, nperseg)
+        frames  = frames - frames.mean(axis=-1, keepdims=True)
+        power   = np.square(np.abs(np.fft.rfft(frames * win, axis=-1))).mean(axis=(2, 3))  # (窓数, デバイス数, 周波数)
+        edges   = np.linspace(0, power.shape[-1], self.nbands + 1).astype(int)
+        return np.add.reduceat(power, edges[:-1], axis=-1) if power.shape[-1] >= self.nbands else np.zeros(power.shape[:2] + (self.nbands,))
+
+    def pca_ratios(self, X: np.ndarray) -> np.ndarray:
+        """サブキャリア間の共分散行列の上位の固有値の寄与率 (窓数, デバイス数, n_components)"""
+        centered = X - X.mean(axis=2, keepdims=True)
+        cov      = np.einsum("bdtf,bdtg->bdfg", centered, centered) / max(X.shape[2] - 1, 1)
+        eigvals  = np.linalg.eigvalsh(cov.astype(np.float64))[..., ::-1][..., :self.n_components]
+        total    = np.trace(cov, axis1=2, axis2=3)[..., None]
+        ratios   = np.divide(eigvals, total, out=np.zeros_like(eigvals), where=total > 0)
+        return np.pad(ratios, ((0, 0), (0, 0), (0, self.n_components - ratios.shape[-1])))
+
+    def cross_correlation(self, X: np.ndarray) -> np.ndarray:
+        """サブキャリア平均の時系列のデバイス間の相関係数 (窓数, デバイスの組の数)"""
+        series = X.mean(axis=3)
+        series = series - series.mean(axis=2, keepdims=True)
+        norm   = np.linalg.norm(series, axis=2, keepdims=True)
+        series = np.divide(series, norm, out=np.zeros_like(series), where=norm > 0)
+        corr   = np.einsum("bit,bjt->bij", series, series)
+        i, j   = np.triu_indices(X.shape[1], k=1)
+        return corr[:, i, j]
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """窓 (窓数, デバイス数, 窓長, サブキャリア数) を特徴量行列 (窓数, 特徴量数) に変換"""
+        X = self.prepare(np.nan_to_num(np.asarray(X, dtype=np.float32)))
+        per_device = np.concatenate([self.variance(X), self.band_energies(X), self.pca_ratios(X)], axis=2)
+        return np.concatenate([per_device.reshape(len(X), -1), self.cross_correlation(X)], axis=1).astype(np.float32)
+
+def build_feature_store(dataset, extractor: FeatureExtractor, store_dir: str, batch_size: int = 256) -> np.ndarray:
+    """
+    データセットの全ての窓の特徴量を計算し，特徴量ストアとして保存
+
+    {store_dir}/features.npy : 特徴量行列（窓数, 特徴量数）
+    {store_dir}/labels.npy   : ラベル（ラベルがある場合）
+    {store_dir}/windows.npz  : 窓ごとのファイル名・先頭時刻
+    {store_dir}/meta.json    : 特徴量の列名・入力のサブキャリア列・抽出パラメータ・対象ファイルとその更新時刻
+    同じパラメータ・対象ファイルで作成済みの場合は再計算せずに読み込む．
+    """
+    meta = {
+        "feature_names": extractor.feature_names(dataset.devices),
+        "columns":       dataset.columns,
+        "params":        extractor.get_params() | {"window": dataset.window, "stride": dataset.stride},
+        "devices":       dataset.devices,
+        "files":         dataset.file_names,
+        "sources":       dataset.sources,
+    }
+    if os.path.exists(os.path.join(store_dir, "meta.json")):
+        with open(os.path.join(store_dir, "meta.json"), "r") as f:
+            if json.load(f) == meta:
+                return load_feature_store(store_dir)[0]
+
+    os.makedirs(store_dir, exist_ok=True)
+    features = np.lib.format.open_memmap(os.path.join(store_dir, "features.tmp.npy"), mode="w+", dtype=np.float32,
+                                         shape=(len(dataset), len(meta["feature_names"])))
+    labels   = []
+    start    = 0
+    for X, y in dataset.iter_batches(batch_size=batch_size, shuffle=False):
+        features[start:start+len(X)] = extractor.transform(X)
+        start += len(X)
+        if y is not None:
+            labels.append(y)
+    features.flush()
+    del features
+    os.replace(os.path.join(store_dir, "features.tmp.npy"), os.path.join(store_dir, "features.npy"))
+    if labels:
+        np.save(os.path.join(store_dir, "labels.npy"), np.concatenate(labels))
+    elif os.path.exists(os.path.join(store_dir, "labels.npy")):
+        os.remove(os.path.join(store_dir, "labels.npy"))
+    np.savez(os.path.join(store_dir, "windows.npz"),
+             file_names=np.array(dataset.file_names)[dataset.win_file] if len(dataset) > 0 else np.empty(0, dtype=str),
+             start_times=np.array([dataset.get_times(i)[0] for i in range(len(dataset))]))
+    with open(os.path.join(store_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return load_feature_store(store_dir)[0]
+
+def load_feature_store(store_dir: str) -> tuple:
+    """特徴量ストアを読み込み，(特徴量行列（メモリマップ）, ラベル, メタデータ) を返す"""
+    with open(os.path.join(store_dir, "meta.json"), "r") as f:
+        meta = json.load(f)
+    features    = np.load(os.path.join(store_dir, "features.npy"), mmap_mode="r")
+    labels_path = os.path.join(store_dir, "labels.npy")
+    labels      = np.load(labels_path) if os.path.exists(labels_path) else None
+    return features, labels, meta
+
+# 使用例
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    X   = rng.normal(size=(8, 4, 256, 52)).astype(np.float32)
+    extractor = FeatureExtractor(fs=100.0, nperseg=32, noverlap=16, nbands=4, n_components=3)
+    features  = extractor.transform(X)
+    print(features.shape, len(extractor.feature_names([f"dev{i}" for i in range(4)])))
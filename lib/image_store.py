@@ -0,0 +1,183 @@
+import os
+import json
+import numpy as np
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+
+from .util import Util
+
+# 対象とする画像の拡張子
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+class ImageStore:
+    """
+    カメラ画像を1度だけデコードし，縮小済みのuint8配列（メモリマップNPY）として保存するクラス
+
+    {store_dir}/images.npy  : 画像配列（枚数, 高さ, 幅, チャネル）
+    {store_dir}/index.npz   : ファイル名・撮影時刻（ファイル名の日時，エポック秒）
+    {store_dir}/meta.json   : 画像サイズ・カラーモード・チャネルごとの平均と標準偏差
+    学習時はデコード済みの配列をメモリマップで読み出し，CSIの窓に最も近い画像を索引で引く．
+    """
+
+    def __init__(self, store_dir: str, size: tuple = (64, 64), mode: str = "RGB"):
+        """コンストラクタ"""
+        self.store_dir  = store_dir                # 保存先ディレクトリ
+        self.size       = tuple(size)              # 縮小後の画像サイズ（幅, 高さ）
+        self.mode       = mode                     # カラーモード（RGB / L）
+        self.names      = np.empty(0, dtype=str)   # ファイル名
+        self.timestamps = np.empty(0)              # 撮影時刻 [s]
+        self.images     = None                     # 画像配列（メモリマップ）
+        self.mean       = None                     # チャネルごとの平均（0-1）
+        self.std        = None                     # チャネルごとの標準偏差（0-1）
+        if os.path.exists(self._path("meta.json")):
+            self._load()
+
+    def _path(self, name: str) -> str:
+        """保存ファイルのパス"""
+        return os.path.join(self.store_dir, name)
+
+    @property
+    def nchannels(self) -> int:
+        """チャネル数"""
+        return 1 if self.mode == "L" else 3
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _load(self) -> None:
+        """保存済みのストアを読み込む（画像サイズ・カラーモードが異なる場合は読み込まない）"""
+        with open(self._path("meta.json"), "r") as f:
+            meta = json.load(f)
+        if tuple(meta["size"]) != self.size or meta["mode"] != self.mode:
+            return
+        index           = np.load(self._path("index.npz"))
+        self.names      = index["names"]
+        self.timestamps = index["timestamps"]
+        self.mean       = np.array(meta["mean"])
+        self.std        = np.array(meta["std"])
+        self.images     = np.load(self._path("images.npy"), mmap_mode="r")
+
+    def _decode(self, path: str) -> np.ndarray:
+        """画像を縮小してデコード（JPEGはdraftで縮小デコードしてからリサイズ）"""
+        with Image.open(path) as image:
+            image.draft(self.mode, (self.size[0] * 2, self.size[1] * 2))
+            return np.asarray(image.convert(self.mode).resize(self.size, Image.BILINEAR), dtype=np.uint8)
+
+    def build(self, image_dirs: list, max_workers: int = 8) -> int:
+        """
+        画像ディレクトリ内の未登録の画像をデコードしてストアに追加
+
+        params
+        ------
+        image_dirs: list
+            画像ディレクトリのリスト（ファイル名は「YYYY-MM-DDThh-mm-ss.拡張子」形式）
+        max_workers: int
+            デコードの並列数
+
+        return
+        ------
+        int
+            追加した画像の枚数
+        """
+        # 未登録の画像を撮影時刻順に列挙
+        known, targets = set(self.names.tolist()), []
+        for image_dir in image_dirs:
+            for entry in Util.get_file_catalog(image_dir):
+                if entry["name"].lower().endswith(IMAGE_EXTS) and entry["datetime"] is not None and entry["name"] not in known:
+                    targets.append((entry["datetime"].timestamp(), entry["name"], os.path.join(image_dir, entry["name"])))
+        if not targets:
+            return 0
+        targets.sort()
+
+        # 既存の画像と新しい画像を撮影時刻順の位置に書き込む（一時ファイルに書いてから置き換え）
+        os.makedirs(self.store_dir, exist_ok=True)
+        nold, nnew = len(self.names), len(targets)
+        timestamps = np.concatenate([self.timestamps, [t for t, _, _ in targets]])
+        names      = np.concatenate([self.names, [name for _, name, _ in targets]])
+        order      = np.argsort(timestamps, kind="stable")
+        position   = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        shape      = (nold + nnew, self.size[1], self.size[0], self.nchannels)
+        tmp_path   = self._path("images.tmp.npy")
+        images     = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=shape)
+        if nold > 0:
+            images[position[:nold]] = self.images
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for i, array in enumerate(executor.map(self._decode, [path for _, _, path in targets])):
+                images[position[nold + i]] = array.reshape(shape[1:])
+        images.flush()
+        del images
+        os.replace(tmp_path, self._path("images.npy"))
+
+        # 索引と統計量を保存
+        self.names, self.timestamps = names[order], timestamps[order]
+        self.images = np.load(self._path("images.npy"), mmap_mode="r")
+        self.mean, self.std = self._channel_stats()
+        np.savez(self._path("index.npz"), names=self.names, timestamps=self.timestamps)
+        with open(self._path("meta.json"), "w") as f:
+            json.dump({"size": list(self.size), "mode": self.mode, "mean": self.mean.tolist(), "std": self.std.tolist()}, f)
+        return nnew
+
+    def _channel_stats(self, chunk: int = 1024) -> tuple:
+        """チャネルごとの平均と標準偏差（0-1）をチャンク単位で計算"""
+        total, total_sq, count = np.zeros(self.nchannels), np.zeros(self.nchannels), 0
+        for start in range(0, len(self.images), chunk):
+            block     = self.images[start:start+chunk].reshape(-1, self.nchannels).astype(np.float64) / 255.0
+            total    += block.sum(axis=0)
+            total_sq += np.square(block).sum(axis=0)
+            count    += len(block)
+        mean = total / max(count, 1)
+        return mean, np.sqrt(np.maximum(total_sq / max(count, 1) - mean ** 2, 0.0))
+
+    def get(self, indices, normalize: bool = True) -> np.ndarray:
+        """指定した画像をfloat32で返す（normalize=Trueの場合はチャネルごとに標準化，Falseの場合は0-1）"""
+        images = np.asarray(self.images[indices], dtype=np.float32) / 255.0
+        if normalize:
+            images = (images - self.mean.astype(np.float32)) / np.maximum(self.std, 1e-8).astype(np.float32)
+        return images
+
+    def nearest(self, times, max_gap: float = None) -> np.ndarray:
+        """各時刻（エポック秒）に最も近い画像のインデックスを返す（max_gap [s] より離れている場合は-1）"""
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        if len(self.timestamps) == 0:
+            return np.full(len(times), -1)
+        right   = np.clip(np.searchsorted(self.timestamps, times), 1, len(self.timestamps) - 1) if len(self.timestamps) > 1 else np.zeros(len(times), dtype=int)
+        left    = np.maximum(right - 1, 0)
+        nearest = np.where(np.abs(self.timestamps[left] - times) <= np.abs(self.timestamps[right] - times), left, right)
+        if max_gap is not None:
+            nearest = np.where(np.abs(self.timestamps[nearest] - times) <= max_gap, nearest, -1)
+        return nearest
+
+    def window_index(self, file_name: str, window_times, max_gap: float = None) -> np.ndarray:
+        """
+        CSIファイルの窓ごとに最も近い画像のインデックスを返す
+
+        params
+        ------
+        file_name: str
+            CSIファイル名（「YYYY-MM-DDThh-mm-ss.拡張子」形式，記録開始時刻）
+        window_times: array
+            窓の中心時刻（ファイル先頭からの相対時刻 [s]．スペクトログラムのインデックスなど）
+        max_gap: float
+            許容する時刻のずれ [s]（超える場合は-1）
+        """
+        start = Util.parse_timestamp(file_name)
+        if start is None:
+            raise ValueError(f"ファイル名から日時を取得できません: {file_name}")
+        return self.nearest(start.timestamp() + np.asarray(window_times, dtype=np.float64), max_gap=max_gap)
+
+# 使用例
+if __name__ == "__main__":
+    import tempfile
+    from datetime import datetime, timedelta
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # ダミー画像を作成
+        os.makedirs(f"{tmp_dir}/image-data/minelab-iot-camera-1")
+        for minute in range(10):
+            timestamp = (datetime(2025, 3, 13) + timedelta(minutes=minute)).strftime(Util.TIMESTAMP_FORMAT)
+            Image.fromarray(np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)).save(f"{tmp_dir}/image-data/minelab-iot-camera-1/{timestamp}.jpg")
+        store = ImageStore(f"{tmp_dir}/image-store", size=(64, 64))
+        print("Added: ", store.build([f"{tmp_dir}/image-data/minelab-iot-camera-1"]))
+        # CSIファイル（2025-03-13T00-02-30から記録）の窓に最も近い画像
+        index = store.window_index("2025-03-13T00-02-30.csv", window_times=[0.0, 45.0, 120.0], max_gap=60.0)
+        print("Nearest: ", store.names[index], store.get(index).shape)
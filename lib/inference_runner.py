@@ -0,0 +1,257 @@
+import json
+import time
+import joblib
+import numpy as np
+
+from . import interleaved
+from .util import Util
+from .chunked_io import ChunkedWriter
+from .chunked_time_adjuster import delayed_devices
+from .feature_extractor import FeatureExtractor
+
+def save_model(path: str, model, meta: dict) -> None:
+    """
+    学習済みモデルと，学習に使用した特徴量ストアの前処理の設定をまとめて保存
+
+    推論時も学習時と同じデバイスの組・サブキャリア列・特徴量抽出器で特徴量を計算するため，設定は特徴量ストアから引き継ぐ．
+
+    params
+    ------
+    model: object
+        predictを持つ学習済みモデル（特徴量行列 (窓数, 特徴量数) を入力とする）
+    meta: dict
+        学習に使用した特徴量ストアのメタデータ（load_feature_storeの戻り値）
+    """
+    params = dict(meta["params"])
+    joblib.dump({
+        "model":     model,
+        "extractor": {key: value for key, value in params.items() if key not in ("window", "stride")},
+        "window":    params["window"],
+        "stride":    params["stride"],
+        "devices":   meta["devices"],
+        "columns":   meta["columns"],
+    }, path)
+
+def load_model(path: str) -> dict:
+    """save_modelで保存したモデルを読み込む"""
+    return joblib.load(path)
+
+class InferenceRunner:
+    """
+    PCAPから逐次読み取ったSampleSetのチャンクに前処理・特徴量抽出・推論をマイクロバッチで適用するクラス
+
+    学習時のCSV（decode_pcap2csv.py → time_adjust.py）と同じく，Nullサブキャリアを0にした振幅・位相のサブキャリア列を取り出し，
+    デバイス間の受信時刻が一致する行のみを揃えて (窓数, デバイス数, 窓長, サブキャリア数) の窓にする．
+    チャンクをまたぐ窓のため末尾のフレームを保持し，窓がbatch_size個揃うごとにまとめて推論する．
+    窓の最後のフレームを含むチャンクを受け取ってから推論結果が出るまでの時間を遅延として記録する．
+    追記中のファイルを追跡する場合（track_lag=True）は，窓の最後のフレームの受信時刻から推論結果が出るまでの時間を
+    キャプチャからの遅れとして別に記録する（過去のファイルでは経過時間になるため記録しない）．
+    """
+
+    def __init__(self, bundle: dict, batch_size: int = 64, devices: list = None, alpha: float = 0.01, track_lag: bool = False):
+        """
+        コンストラクタ
+
+        params
+        ------
+        bundle: dict
+            load_modelで読み込んだモデル
+        batch_size: int
+            マイクロバッチの窓数
+        devices: list
+            推論するデバイスの組（学習時のデバイスの組と同じ順序，省略時は学習時のデバイス名）
+        alpha: float
+            受信時刻が一致しているとみなす標準偏差の閾値 [s]（time_adjust.pyと同じ）
+        track_lag: bool
+            Trueの場合，キャプチャ（受信時刻）からの遅れも記録する（追記中のファイルを追跡する場合のみ意味がある）
+        """
+        self.model       = bundle["model"]                          # 学習済みモデル
+        self.extractor   = FeatureExtractor(**bundle["extractor"])  # 特徴量抽出器
+        self.window      = bundle["window"]                         # 窓長 [フレーム]
+        self.stride      = bundle["stride"]                         # 窓の移動量 [フレーム]
+        self.columns     = bundle["columns"]                        # 学習時のサブキャリア列名
+        self.devices     = devices or bundle["devices"]             # デバイスの組
+        self.alpha       = alpha                                    # 受信時刻の標準偏差の閾値 [s]
+        self.batch_size  = batch_size                               # マイクロバッチの窓数
+        self.track_lag   = track_lag                                # キャプチャからの遅れを記録するか
+        self.latencies   = []                                       # 窓ごとの遅延（チャンクの受け取りから推論結果まで）[s]
+        self.lags        = []                                       # 窓ごとのキャプチャからの遅れ（受信時刻から推論結果まで）[s]
+        self.batch_times = []                                       # バッチごとの処理時間 [s]
+        self._keep       = None                                     # 使用するサブキャリアの列インデックス
+        self._heads      = {device: None for device in self.devices} # デバイスごとの未整列のフレーム (値, 受信時間, 受信時刻)
+        self._values     = None                                     # 次の窓の先頭以降の整列済みフレーム (フレーム数, デバイス数, サブキャリア数)
+        self._times      = None                                     # 上記フレームの受信時間（先頭デバイス）
+        self._epochs     = None                                     # 上記フレームの受信時刻（全デバイスで最後に受信した時刻）[エポック秒]
+        self._pending    = []                                       # 推論待ちの窓 (窓, 先頭時刻, 末尾時刻, 受信時刻, 到着時刻)
+
+        if len(self.devices) != len(bundle["devices"]):
+            raise ValueError(f"デバイス数が学習時と一致しません: {len(self.devices)} != {len(bundle['devices'])}")
+
+    @staticmethod
+    def column_indices(columns: list, nsubcarriers: int) -> np.ndarray:
+        """CSVのサブキャリア列名（A, B, ..., AA, ...）をサブキャリアの列インデックスに変換"""
+        labels = {label: i for i, label in enumerate(Util.get_alphabet_list(num=nsubcarriers))}
+        missing = [col for col in columns if col not in labels]
+        if missing:
+            raise ValueError(f"学習時のサブキャリア列がありません（帯域幅が異なります）: {missing[:5]}")
+        return np.array([labels[col] for col in columns])
+
+    def preprocess(self, samples) -> np.ndarray:
+        """SampleSetを学習時のCSVと同じ (フレーム数, サブキャリア数) の振幅・位相に変換（Nullサブキャリアは0）"""
+        if self._keep is None:
+            self._keep = self.column_indices(self.columns, samples.nsubcarriers)
+        if self.extractor.kind == "amp":
+            return samples.get_amplitude(rm_nulls=True, columns=self._keep).astype(np.float32)
+        return samples.get_phase(rm_nulls=True, columns=self._keep).astype(np.float32)
+
+    def _align(self) -> tuple:
+        """
+        全デバイスに揃っている先頭のフレームから受信時刻が一致する行を取り出す
+
+        一致しない行はtime_adjust.py（ChunkedTimeAdjuster）と同じ規則で，受信時刻が最も遅いデバイス以外の行を除去する．
+        """
+        values, times, epochs = [], [], []
+        while all(self._heads[device] is not None and len(self._heads[device][0]) > 0 for device in self.devices):
+            heads = [self._heads[device] for device in self.devices]
+            n     = min(len(head[0]) for head in heads)
+            stamp = np.stack([head[2][:n] for head in heads], axis=1)
+            bad   = np.flatnonzero(np.std(stamp, axis=1) > self.alpha)
+            nok   = int(bad[0]) if len(bad) > 0 else n
+            values.append(np.stack([head[0][:nok] for head in heads], axis=1))
+            times.append(heads[0][1][:nok])
+            epochs.append(stamp[:nok].max(axis=1))
+            for device, head in zip(self.devices, heads):
+                self._heads[device] = tuple(array[nok:] for array in head)
+
+            # 一致しない行：ずらさないデバイスの行を除去
+            if nok < n:
+                for device, keep in zip(self.devices, delayed_devices(stamp[nok], self.alpha)):
+                    if not keep:
+                        self._heads[device] = tuple(array[1:] for array in self._heads[device])
+        if not values:
+            return np.empty((0, len(self.devices), len(self.columns)), dtype=np.float32), np.empty(0), np.empty(0)
+        return np.concatenate(values), np.concatenate(times), np.concatenate(epochs)
+
+    def push(self, samples) -> list:
+        """
+        SampleSetのチャンクを追加し，推論できた窓の (先頭時刻, 末尾時刻, 予測) のリストを返す
+
+        複数デバイスの場合は デバイス名 -> SampleSet の辞書を渡す．
+        チャンク内で完成した窓は推論待ちに追加し，batch_size個揃った分だけ推論する．
+        """
+        arrival = time.perf_counter()
+        chunks  = samples if isinstance(samples, dict) else {self.devices[0]: samples}
+        for device, chunk in chunks.items():
+            head = (self.preprocess(chunk), np.asarray(chunk.timestamps, dtype=np.float64), chunk.get_epoch_time())
+            if self._heads[device] is not None:
+                head = tuple(np.concatenate([old, new]) for old, new in zip(self._heads[device], head))
+            self._heads[device] = head
+
+        values, times, epochs = self._align()
+        if self._values is not None:
+            values = np.concatenate([self._values, values])
+            times  = np.concatenate([self._times, times])
+            epochs = np.concatenate([self._epochs, epochs])
+
+        # 完成した窓を切り出し，次の窓の先頭以降のフレームのみを保持
+        starts = np.arange(0, len(values) - self.window + 1, self.stride)
+        if len(starts) > 0:
+            windows = np.lib.stride_tricks.sliding_window_view(values, self.window, axis=0)[starts].transpose(0, 1, 3, 2)
+            for start, win in zip(starts, windows):
+                self._pending.append((win, times[start], times[start + self.window - 1], epochs[start + self.window - 1], arrival))
+        next_start   = starts[-1] + self.stride if len(starts) > 0 else 0
+        self._values = values[next_start:].copy()
+        self._times  = times[next_start:].copy()
+        self._epochs = epochs[next_start:].copy()
+
+        results = []
+        while len(self._pending) >= self.batch_size:
+            results += self._run_batch(self._pending[:self.batch_size])
+            self._pending = self._pending[self.batch_size:]
+        return results
+
+    def flush(self) -> list:
+        """推論待ちの窓をすべて推論（batch_sizeに満たなくても実行）"""
+        results, self._pending = (self._run_batch(self._pending) if self._pending else []), []
+        return results
+
+    def _run_batch(self, batch: list) -> list:
+        """窓 (窓数, デバイス数, 窓長, サブキャリア数) をまとめて特徴量抽出・推論"""
+        start       = time.perf_counter()
+        X           = np.stack([win for win, _, _, _, _ in batch])
+        predictions = self.model.predict(self.extractor.transform(X))
+        end         = time.perf_counter()
+        self.batch_times.append(end - start)
+        self.latencies += [end - arrival for _, _, _, _, arrival in batch]
+        if self.track_lag:
+            now = time.time()
+            self.lags += [now - received for _, _, _, received, _ in batch]
+        return [(t0, t1, prediction) for (_, t0, t1, _, _), prediction in zip(batch, predictions)]
+
+    def run(self, chunks, save_path: str = None) -> list:
+        """
+        SampleSetのチャンク（複数デバイスの場合は デバイス名 -> SampleSet の辞書）のイテレータを最後まで推論
+
+        save_pathを指定すると，推論結果をバッチごとにCSV（Start, End, Prediction）へ追記する．
+        """
+        writer  = ChunkedWriter(save_path, columns=["Start", "End", "Prediction"]) if save_path else None
+        results = []
+        for samples in chunks:
+            results += self._write(writer, self.push(samples))
+        results += self._write(writer, self.flush())
+        return results
+
+    @staticmethod
+    def _write(writer, results: list) -> list:
+        """推論結果をCSVに追記（スカラーでない推論結果はJSON文字列にする）"""
+        if writer is not None and results:
+            writer.write([(t0, t1, InferenceRunner._format(prediction)) for t0, t1, prediction in results])
+        return results
+
+    @staticmethod
+    def _format(prediction):
+        """推論結果をCSVの1セルに書ける値にする"""
+        prediction = np.asarray(prediction)
+        return prediction.item() if prediction.ndim == 0 else json.dumps(prediction.tolist())
+
+    def latency_report(self) -> dict:
+        """窓ごとの遅延のパーセンタイル [ms] とスループット（track_lag=Trueの場合はキャプチャからの遅れも）を返す"""
+        if not self.latencies:
+            return {"windows": 0}
+        latencies = np.array(self.latencies) * 1e3
+        p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99])
+        report = {
+            "windows":        len(latencies),
+            "batches":        len(self.batch_times),
+            "p50_ms":         float(p50),
+            "p90_ms":         float(p90),
+            "p95_ms":         float(p95),
+            "p99_ms":         float(p99),
+            "max_ms":         float(latencies.max()),
+            "windows_per_s":  len(latencies) / max(sum(self.batch_times), 1e-12),
+        }
+        if self.lags:
+            lags = np.array(self.lags) * 1e3
+            report |= {"lag_p50_ms": float(np.percentile(lags, 50)), "lag_p99_ms": float(np.percentile(lags, 99)), "lag_max_ms": float(lags.max())}
+        return report
+
+# 使用例
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from sklearn.dummy import DummyClassifier
+    from .pcap_generator import generate_capture_set
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 2デバイスのダミーのPCAPと，そのデバイスの組で学習したダミーのモデルを作成
+        captures  = generate_capture_set(tmp_dir, ndevices=2, nfiles=1, nframes=3000, bandwidth=80)
+        devices   = sorted(captures)
+        extractor = FeatureExtractor(fs=100.0, kind="pha")
+        meta      = {"params": extractor.get_params() | {"window": 256, "stride": 128}, "devices": devices,
+                     "columns": Util.get_alphabet_list(num=256)}
+        features  = np.zeros((2, len(extractor.feature_names(devices))))
+        save_model(f"{tmp_dir}/model.joblib", DummyClassifier().fit(features, [0, 1]), meta)
+        # 1024フレームずつ読み取りながら推論
+        runner  = InferenceRunner(load_model(f"{tmp_dir}/model.joblib"), batch_size=8)
+        chunks  = zip(*[interleaved.iter_pcap(captures[device][0], chunk_records=1024) for device in devices])
+        results = runner.run((dict(zip(devices, group)) for group in chunks), save_path=f"{tmp_dir}/predictions.csv")
+        print(len(results), os.path.getsize(f"{tmp_dir}/predictions.csv"), runner.latency_report())
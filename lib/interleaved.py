@@ -1,14 +1,23 @@
 import os
+import mmap
+import time
+import struct
+import threading
+import traceback
 import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
 
-__all__ = ['read_pcap']
+__all__ = ['read_pcap', 'subcarrier_mask', 'keep_columns', 'read_pcap_tensor', 'read_pcap_parallel', 'read_pcap_range', 'read_pcap_slice', 'read_pcap_summary', 'read_pcap_index', 'iter_pcap', 'get_device_meta', 'demux_pcap', 'epoch_seconds', 'match_times']
 
 # Null および Pilot OFDMサブキャリアのインデックス
 nulls = {
     20:  [x+32  for x in [-32, -31, -30, -29, 31, 30, 29, 0]],
     40:  [x+64  for x in [-64, -63, -62, -61, -60, -59, -1, 63, 62, 61, 60, 59, 1, 0]],
     80:  [x+128 for x in [-128, -127, -126, -125, -124, -123, -1, 127, 126, 125, 124, 123, 1, 0]],
-    160: [x+256 for x in [-256, -255, -254, -253, -252, -251, -129, -128, -127, -5, -4, -3, -2, -1, 255, 254, 253, 252, 251, 129, 128, 127, 5, 4, 3, 3, 1, 0]]
+    160: [x+256 for x in [-256, -255, -254, -253, -252, -251, -129, -128, -127, -5, -4, -3, -2, -1, 255, 254, 253, 252, 251, 129, 128, 127, 5, 4, 3, 2, 1, 0]]
 }
 
 pilots = {
@@ -18,51 +27,337 @@ pilots = {
     160: [x+256 for x in [-231, -203, -167, -139, -117, -89, -53, -25, 231, 203, 167, 139, 117, 89, 53, 25]]
 }
 
+# 帯域幅ごとのサブキャリア数・データサブキャリア数（IEEE 802.11ac）
+NSUBCARRIERS = {bandwidth: int(bandwidth * 3.2) for bandwidth in nulls}
+NDATA        = {20: 52, 40: 108, 80: 234, 160: 468}
+
+def __build_masks(indices):
+    """サブキャリアのインデックスのリストを帯域幅ごとの読み取り専用のブールマスクに変換"""
+    masks = {}
+    for bandwidth, index in indices.items():
+        mask = np.zeros(NSUBCARRIERS[bandwidth], dtype=bool)
+        mask[index] = True
+        mask.setflags(write=False)
+        masks[bandwidth] = mask
+    return masks
+
+# Null・Pilotサブキャリアのブールマスク（fftshift後の並び）
+NULL_MASKS  = __build_masks(nulls)
+PILOT_MASKS = __build_masks(pilots)
+
+def __validate_masks():
+    """マスクがNexmonの並び（802.11acのトーン配置）と一致することを確認"""
+    for bandwidth, nsub in NSUBCARRIERS.items():
+        null_mask, pilot_mask = NULL_MASKS[bandwidth], PILOT_MASKS[bandwidth]
+        if len(nulls[bandwidth]) != null_mask.sum() or len(pilots[bandwidth]) != pilot_mask.sum():
+            raise ValueError(f"{bandwidth}MHzのNull・Pilotサブキャリアのインデックスが重複しています")
+        if np.any(null_mask & pilot_mask) or nsub - null_mask.sum() - pilot_mask.sum() != NDATA[bandwidth]:
+            raise ValueError(f"{bandwidth}MHzのNull・Pilotサブキャリアの配置が不正です")
+        if not null_mask[nsub // 2] or not null_mask[0]:
+            raise ValueError(f"{bandwidth}MHzのDC・ガードサブキャリアがNullに含まれていません")
+
+__validate_masks()
+
+# 除外するサブキャリアの組み合わせごとのマスク・列インデックス（(帯域幅, rm_nulls, rm_pilots) -> 配列）
+_mask_cache = {}
+
+def subcarrier_mask(bandwidth, rm_nulls=True, rm_pilots=False):
+    """除外するサブキャリアのブールマスク（読み取り専用，帯域幅・組み合わせごとに1度だけ作成）"""
+    key = ('mask', bandwidth, rm_nulls, rm_pilots)
+    if key not in _mask_cache:
+        mask = np.zeros(NSUBCARRIERS[bandwidth], dtype=bool)
+        if rm_nulls:
+            mask |= NULL_MASKS[bandwidth]
+        if rm_pilots:
+            mask |= PILOT_MASKS[bandwidth]
+        mask.setflags(write=False)
+        _mask_cache[key] = mask
+    return _mask_cache[key]
+
+def keep_columns(bandwidth, rm_nulls=True, rm_pilots=False):
+    """除外しないサブキャリアの列インデックス（読み取り専用，帯域幅・組み合わせごとに1度だけ作成）"""
+    key = ('columns', bandwidth, rm_nulls, rm_pilots)
+    if key not in _mask_cache:
+        columns = np.flatnonzero(~subcarrier_mask(bandwidth, rm_nulls, rm_pilots))
+        columns.setflags(write=False)
+        _mask_cache[key] = columns
+    return _mask_cache[key]
+
+# SampleSetが保持するヘッダフィールドの型
+HEADER_DTYPE = np.dtype([
+    ('rssi',   'i1'),          # RSSI
+    ('fctl',   'u1'),          # フレームコントロール
+    ('mac',    'u1', (6,)),    # 送信元MACアドレス
+    ('seq',    '<u2'),         # シーケンス番号
+    ('frag',   'u1'),          # フラグメント番号
+    ('css',    '<u2'),         # コア・空間ストリーム（生の値）
+    ('core',   'u1'),          # コア番号
+    ('stream', 'u1'),          # 空間ストリーム番号
+])
+
+# MACアドレスの文字列変換用テーブル
+HEX_TABLE = np.array([f'{i:02x}' for i in range(256)])
+
+def epoch_seconds(time_us, origin_us=0):
+    """絶対時刻 [us]（int64）を origin_us からの秒（float64）に変換（整数のまま差を取ってから変換するため丸め誤差は1回のみ）"""
+    return (np.asarray(time_us, dtype=np.int64) - np.int64(origin_us)) / 1e6
+
+def match_times(ref_us, query_us, tolerance_us):
+    """
+    各クエリ時刻 [us] に最も近い基準時刻の行番号を求める（差がtolerance_usを超える場合は-1）
+
+    基準時刻は昇順に並んでいる必要がある．整数の時刻を二分探索でまとめて対応付けるため，
+    デバイス間・ファイル間のフレームの結合を丸め誤差なく行える．
+    """
+    ref_us   = np.asarray(ref_us, dtype=np.int64)
+    query_us = np.asarray(query_us, dtype=np.int64)
+    if len(ref_us) == 0:
+        return np.full(len(query_us), -1, dtype=np.int64)
+    right   = np.clip(np.searchsorted(ref_us, query_us), 1, len(ref_us) - 1) if len(ref_us) > 1 else np.zeros(len(query_us), dtype=np.int64)
+    left    = np.maximum(right - 1, 0)
+    nearest = np.where(np.abs(ref_us[left] - query_us) <= np.abs(ref_us[right] - query_us), left, right)
+    return np.where(np.abs(ref_us[nearest] - query_us) <= tolerance_us, nearest, -1).astype(np.int64)
+
 class SampleSet(object):
     """PCAPファイルから読み取ったデータを格納するヘルパークラス"""
-    def __init__(self, samples, bandwidth, timestamps):
-        self.rssi, self.fctl, self.mac, self.seq, self.css, self.csi = samples
-        self.timestamps   = timestamps        # 受信時間を追加
-        self.nsamples     = self.csi.shape[0] # サンプル数
-        self.nsubcarriers = self.csi.shape[1] # サブキャリア数
+    __slots__ = ('headers', 'raw', 'timestamps', 'time_us', 'time_origin', 'bandwidth', 'precision', 'nsamples', 'nsubcarriers', '_cache')
+
+    chunk_size = 4096 # 振幅・位相を計算する際に一度に複素数へ変換する行数
+
+    def __init__(self, headers, csi, bandwidth, timestamps, precision='complex128', time_us=None, time_origin=0):
+        self.headers      = headers           # ヘッダフィールドの構造化配列（HEADER_DTYPE）
+        self.timestamps   = timestamps        # 受信時間（time_originからの相対時間 [s]）
+        self.time_us      = time_us           # 絶対受信時刻 [us]（int64）
+        self.time_origin  = time_origin       # 相対時間の基準 [us]（ファイルの先頭レコードの受信時刻）
         self.bandwidth    = bandwidth         # 帯域幅
+        self.precision    = precision         # 複素CSIの精度（complex128 / complex64）
+        self._cache       = {}                # 変換済みCSIのキャッシュ
+        if np.iscomplexobj(csi):
+            # 変換済みの複素CSIが与えられた場合はそのまま保持
+            self.raw = None
+            self._cache['csi'] = csi
+            self.nsamples, self.nsubcarriers = csi.shape
+        else:
+            # Nexmonの並び（fftshift前）のint16 I/Q列 (サンプル数, サブキャリア数*2) を保持し，必要な時に変換
+            self.raw = csi
+            self.nsamples     = csi.shape[0]      # サンプル数
+            self.nsubcarriers = csi.shape[1] // 2 # サブキャリア数
+
+    @classmethod
+    def concat(cls, sample_sets, time_origin=None):
+        """
+        複数のSampleSetを行方向に連結（受信時間は time_origin [us]（Noneの場合は先頭のSampleSetの基準）からの相対時間）
+
+        全てのSampleSetがint16 I/Q列を保持している場合は，複素CSIに変換せずに連結する．
+        """
+        first       = sample_sets[0]
+        time_origin = first.time_origin if time_origin is None else time_origin
+        time_us     = np.concatenate([samples.time_us for samples in sample_sets])
+        if all(samples.raw is not None for samples in sample_sets):
+            csi = np.concatenate([samples.raw for samples in sample_sets])
+        else:
+            csi = np.concatenate([samples.csi for samples in sample_sets])
+        return cls(np.concatenate([samples.headers for samples in sample_sets]), csi, first.bandwidth,
+                   epoch_seconds(time_us, time_origin), precision=first.precision, time_us=time_us, time_origin=time_origin)
+
+    @property
+    def rssi(self):
+        """全サンプルのRSSI"""
+        return self.headers['rssi']
+
+    @property
+    def fctl(self):
+        """全サンプルのFCTL"""
+        return self.headers['fctl']
+
+    @property
+    def mac(self):
+        """全サンプルの送信元MACアドレス (サンプル数, 6)"""
+        return self.headers['mac']
+
+    @property
+    def seq(self):
+        """全サンプルのシーケンス番号"""
+        return self.headers['seq']
+
+    @property
+    def csi(self):
+        """複素CSI（初回アクセス時に変換してキャッシュ）"""
+        if 'csi' not in self._cache:
+            self._cache['csi'] = self._to_complex(self.raw)
+        return self._cache['csi']
+
+    def _real_dtype(self):
+        """精度に対応する実数型"""
+        return np.float32 if np.dtype(self.precision) == np.complex64 else np.float64
+
+    def _iq(self, raw, columns=None):
+        """int16 I/Q列をサブキャリア順に並べ替えた実部・虚部に分ける（columnsを指定するとその列のみ）"""
+        if columns is None:
+            real = np.fft.fftshift(raw[..., ::2],  axes=(-1,)).astype(self._real_dtype())
+            imag = np.fft.fftshift(raw[..., 1::2], axes=(-1,)).astype(self._real_dtype())
+            return real, imag
+        # fftshift後の列に対応する並べ替え前の位置から直接取り出す
+        positions = (np.asarray(columns) + self.nsubcarriers // 2) % self.nsubcarriers
+        return raw[..., 2 * positions].astype(self._real_dtype()), raw[..., 2 * positions + 1].astype(self._real_dtype())
+
+    def _to_complex(self, raw, columns=None):
+        """int16 I/Q列を複素CSIに変換（columnsを指定するとその列のみ）"""
+        ncols = self.nsubcarriers if columns is None else len(columns)
+        csi = np.empty(raw.shape[:-1] + (ncols,), dtype=self.precision)
+        csi.real, csi.imag = self._iq(raw, columns)
+        return csi
+
+    def _mask(self, values, rm_nulls, rm_pilots, columns=None):
+        """Null・Pilotサブキャリアを0にする（全行に対して1度のブールマスク代入で処理）"""
+        if rm_nulls or rm_pilots:
+            mask = subcarrier_mask(self.bandwidth, rm_nulls, rm_pilots)
+            values[..., mask if columns is None else mask[columns]] = 0
+        return values
+
+    def _derive(self, kind, rows, rm_nulls, rm_pilots, columns=None):
+        """振幅・位相を計算（全行の場合はキャッシュ，columnsを指定するとその列のみを計算）"""
+        key = (kind, rm_nulls, rm_pilots, None if columns is None else np.asarray(columns).tobytes())
+        if rows is None and key in self._cache:
+            return self._cache[key]
+
+        func = np.abs if kind == 'amp' else np.angle
+        if 'csi' in self._cache:
+            csi    = self._cache['csi'] if rows is None else self._cache['csi'][rows]
+            values = func(csi if columns is None else csi[..., columns])
+        else:
+            # 全体の複素配列は作らず，一定行数ずつ変換して計算
+            raw    = self.raw if rows is None else self.raw[rows]
+            ncols  = self.nsubcarriers if columns is None else len(columns)
+            values = np.empty(raw.shape[:-1] + (ncols,), dtype=self._real_dtype())
+            for start in range(0, len(raw), self.chunk_size):
+                values[start:start+self.chunk_size] = func(self._to_complex(raw[start:start+self.chunk_size], columns))
+        values = self._mask(values, rm_nulls, rm_pilots, columns)
+
+        if rows is None:
+            self._cache[key] = values
+        return values
+
+    def get_amplitude(self, rows=None, rm_nulls=False, rm_pilots=False, columns=None):
+        """振幅を取得（rowsを省略すると全サンプル，columnsを指定するとそのサブキャリアの列のみ）"""
+        return self._derive('amp', rows, rm_nulls, rm_pilots, columns)
+
+    def get_phase(self, rows=None, rm_nulls=False, rm_pilots=False, columns=None):
+        """位相を取得（rowsを省略すると全サンプル，columnsを指定するとそのサブキャリアの列のみ）"""
+        return self._derive('pha', rows, rm_nulls, rm_pilots, columns)
+
+    def clear_cache(self):
+        """変換済みCSIのキャッシュを破棄"""
+        if self.raw is not None:
+            self._cache.clear()
 
     def get_rssi(self, index):
         """RSSIを取得"""
-        return self.rssi[index]
+        return self.headers['rssi'][index]
 
     def get_fctl(self, index):
         """FCTLを取得"""
-        return self.fctl[index]
+        return self.headers['fctl'][index]
 
     def get_mac(self, index):
         """MACアドレスを取得"""
-        return self.mac[index*6: (index+1)*6]
+        return self.headers['mac'][index].tobytes()
 
     def get_seq(self, index):
         """シーケンス番号とフラグメント番号を取得"""
-        sc = int.from_bytes(self.seq[index*2: (index+1)*2], byteorder='little', signed=False)
-        fn = sc % 16
-        sc = (sc - fn) // 16
-        return (sc, fn)
+        return (int(self.headers['seq'][index]), int(self.headers['frag'][index]))
 
     def get_css(self, index):
         """コアと空間ストリームを取得"""
-        return self.css[index*2: (index+1)*2]
+        return int(self.headers['css'][index]).to_bytes(2, byteorder='little')
 
-    def get_csi(self, index, rm_nulls=False, rm_pilots=False):
-        """CSIを取得"""
-        csi = self.csi[index].copy()
-        if rm_nulls:
-            csi[nulls[self.bandwidth]]  = 0
-        if rm_pilots:
-            csi[pilots[self.bandwidth]] = 0
-        return csi
+    def get_csi(self, index, rm_nulls=False, rm_pilots=False, columns=None):
+        """CSIを取得（columnsを指定するとそのサブキャリアの列のみ）"""
+        if 'csi' in self._cache:
+            csi = self._cache['csi'][index]
+            csi = csi.copy() if columns is None else csi[..., columns]
+        else:
+            csi = self._to_complex(self.raw[index], columns)
+        return self._mask(csi, rm_nulls, rm_pilots, columns)
 
     def get_time(self, index):
         """受信時間を取得（開始からの相対時間）"""
         return self.timestamps[index]
 
+    def get_absolute_time(self, index):
+        """絶対受信時刻 [us] を取得"""
+        return self.time_us[index]
+
+    def get_epoch_time(self):
+        """全サンプルの受信時刻をエポック秒で取得"""
+        return epoch_seconds(self.time_us)
+
+    def get_relative_time(self, origin_us=None):
+        """全サンプルの受信時刻を origin_us [us]（Noneの場合はファイルの先頭レコード）からの相対時間 [s] で取得"""
+        return epoch_seconds(self.time_us, self.time_origin if origin_us is None else origin_us)
+
+    def get_core_stream(self):
+        """全サンプルのコア番号と空間ストリーム番号を配列で取得"""
+        return self.headers['core'], self.headers['stream']
+
+    def get_mac_strings(self):
+        """全サンプルの送信元MACアドレスを「xx:xx:xx:xx:xx:xx」形式の文字列配列で取得"""
+        parts  = HEX_TABLE[self.headers['mac']]
+        macids = parts[:, 0]
+        for i in range(1, 6):
+            macids = np.char.add(np.char.add(macids, ':'), parts[:, i])
+        return macids
+
+    def header_table(self):
+        """全サンプルのヘッダフィールドと受信時間を1つの構造化配列で取得"""
+        table = np.empty(self.nsamples, dtype=HEADER_DTYPE.descr + [('time', '<f8'), ('time_us', '<i8')])
+        for name in HEADER_DTYPE.names:
+            table[name] = self.headers[name]
+        table['time']    = self.timestamps
+        table['time_us'] = self.time_us
+        return table
+
+    def to_dataframe(self):
+        """全サンプルのヘッダフィールドと受信時間をデータフレームで取得"""
+        return pd.DataFrame({
+            'Time':   self.timestamps,
+            'TimeUs': self.time_us,
+            'MAC':    self.get_mac_strings(),
+            'Seq':    self.headers['seq'],
+            'Frag':   self.headers['frag'],
+            'Core':   self.headers['core'],
+            'Stream': self.headers['stream'],
+            'RSSI':   self.headers['rssi'],
+            'FCTL':   self.headers['fctl'],
+        })
+
+    def to_tensor(self):
+        """同一フレーム（MACアドレス・シーケンス番号が同じ連続サンプル）をまとめ，(時刻, コア, 空間ストリーム, サブキャリア)のテンソルに変換"""
+        core, stream = self.get_core_stream()
+        seq = self.headers['seq'].astype(np.uint32) << 4 | self.headers['frag']
+        mac = self.headers['mac']
+
+        # 直前のサンプルとMACアドレスまたはシーケンス番号が異なれば新しいフレーム
+        new_frame     = np.ones(self.nsamples, dtype=bool)
+        new_frame[1:] = (seq[1:] != seq[:-1]) | np.any(mac[1:] != mac[:-1], axis=1)
+        frame_idx     = np.cumsum(new_frame) - 1
+        nframes       = int(frame_idx[-1]) + 1 if self.nsamples > 0 else 0
+        ncores        = int(core.max()) + 1 if self.nsamples > 0 else 1
+        nstreams      = int(stream.max()) + 1 if self.nsamples > 0 else 1
+
+        # 連続したメモリ上にテンソルを構築（欠落したストリームは0，時刻はNaN）
+        csi        = np.zeros((nframes, ncores, nstreams, self.nsubcarriers), dtype=self.csi.dtype)
+        timestamps = np.full((nframes, ncores, nstreams), np.nan, dtype=np.float64)
+        time_us    = np.zeros((nframes, ncores, nstreams), dtype=np.int64)
+        valid      = np.zeros((nframes, ncores, nstreams), dtype=bool)
+        csi[frame_idx, core, stream]        = self.csi
+        timestamps[frame_idx, core, stream] = self.timestamps
+        time_us[frame_idx, core, stream]    = self.time_us
+        valid[frame_idx, core, stream]      = True
+
+        return CSITensor(csi, timestamps, valid, self.headers['seq'][new_frame], mac[new_frame], self.bandwidth,
+                         time_us=time_us, time_origin=self.time_origin)
+
     def print(self, index):
         """サンプルを表示"""
         macid  = self.get_mac(index).hex()
@@ -74,72 +369,671 @@ class SampleSet(object):
         time   = self.get_time(index)
         print(f'\nSample #{index}\n---------------\nSource Mac ID: {macid}\nSequence: {sc}.{fn}\nCore and Spatial Stream: 0x{css}\nRSSI: {rssi}\nFCTL: {fctl}\nTime: {time:.6f} sec\n')
 
-def __find_bandwidth(incl_len):
-    '''帯域幅を推定する'''
-    pkt_len = int.from_bytes(incl_len, byteorder='little', signed=False)
-    nbytes_before_csi = 60
-    pkt_len += (128-nbytes_before_csi)
-    bandwidth = 20*int(pkt_len//(20*3.2*4))
-    return bandwidth
+class CSITensor(object):
+    """コア・空間ストリームごとに整列したCSIを格納するヘルパークラス"""
+    def __init__(self, csi, timestamps, valid, seq, mac, bandwidth, time_us=None, time_origin=0):
+        self.csi          = csi                # (フレーム数, コア数, 空間ストリーム数, サブキャリア数)
+        self.timestamps   = timestamps         # ストリームごとの受信時間 (フレーム数, コア数, 空間ストリーム数)
+        self.time_us      = time_us            # ストリームごとの絶対受信時刻 [us]（受信していないストリームは0）
+        self.time_origin  = time_origin        # 相対時間の基準 [us]
+        self.valid        = valid              # ストリームを受信したかどうか (フレーム数, コア数, 空間ストリーム数)
+        self.seq          = seq                # フレームごとのシーケンス番号
+        self.mac          = mac                # フレームごとの送信元MACアドレス (フレーム数, 6)
+        self.bandwidth    = bandwidth          # 帯域幅
+        self.nframes, self.ncores, self.nstreams, self.nsubcarriers = csi.shape
+
+    def get_stream(self, core, stream, absolute=False):
+        """指定したコア・空間ストリームの受信時間とCSIを取得（受信したフレームのみ，absolute=Trueの場合は絶対受信時刻 [us]）"""
+        valid = self.valid[:, core, stream]
+        times = self.time_us if absolute else self.timestamps
+        return times[valid, core, stream], self.csi[valid, core, stream]
+
+    def get_frame_time(self):
+        """フレームごとの受信時間（最初に受信したストリームの時刻）を取得"""
+        return np.nanmin(self.timestamps.reshape(self.nframes, -1), axis=1)
+
+# クラシックPCAPのマジックナンバー -> (バイトオーダー, 1秒あたりのタイムスタンプの単位数)
+PCAP_MAGICS = {
+    b'\xd4\xc3\xb2\xa1': ('<', 10**6), # リトルエンディアン・マイクロ秒
+    b'\x4d\x3c\xb2\xa1': ('<', 10**9), # リトルエンディアン・ナノ秒
+    b'\xa1\xb2\xc3\xd4': ('>', 10**6), # ビッグエンディアン・マイクロ秒
+    b'\xa1\xb2\x3c\x4d': ('>', 10**9), # ビッグエンディアン・ナノ秒
+}
+
+# pcapngのブロックタイプ・バイトオーダーマジック
+PCAPNG_SHB        = 0x0A0D0D0A # Section Header Block
+PCAPNG_IDB        = 1          # Interface Description Block
+PCAPNG_EPB        = 6          # Enhanced Packet Block
+PCAPNG_BYTE_ORDER = 0x1A2B3C4D
+
+# Ethernetのリンクタイプ，パケット先頭からNexmonヘッダ・CSIまでのバイト数
+LINKTYPE_ETHERNET = 1
+NEXMON_HEADER_POS = 42
+NEXMON_CSI_POS    = 60
+
+def __find_bandwidth(caplen):
+    '''パケット長から帯域幅を推定する（配列にも対応）'''
+    nbytes_before_csi = NEXMON_CSI_POS
+    return 20 * ((np.asarray(caplen, dtype=np.int64) + (128 - nbytes_before_csi)) // 256) # 256 = 20*3.2*4
+
+def __walk_blocks(buf, filesize, start, len_pos, overhead, min_size, endian):
+    """
+    長さフィールドを持つブロック（PCAPレコード・pcapngブロック）を先頭から辿り，各ブロックの先頭位置を求める
+
+    同じ長さのブロックが続く区間は長さの整数倍の位置をまとめて検証して一度に進む
+    （一致が続く間は検証する個数を倍に増やす）．途中で切れた末尾のブロックは含めない．
+    """
+    u4    = np.dtype(endian + 'u4')
+    runs  = []
+    ptr   = start
+    probe = 16
+    while ptr + len_pos + 4 <= filesize:
+        length = int(buf[ptr+len_pos:ptr+len_pos+4].view(u4)[0])
+        size   = length + overhead
+        if size < min_size or ptr + size > filesize:
+            break # 壊れた・途中で切れたブロック以降は読み飛ばす
+        n      = min(probe, (filesize - ptr) // size)
+        cand   = ptr + np.arange(n, dtype=np.int64) * size
+        same   = __gather(buf, cand + len_pos, 4).view(u4).ravel() == length
+        nrun   = n if same.all() else int(np.argmin(same))
+        runs.append(cand[:nrun])
+        ptr    = int(cand[nrun-1]) + size
+        probe  = probe * 2 if nrun == n else 16
+    return np.concatenate(runs) if runs else np.empty(0, dtype=np.int64)
+
+def __ticks_to_us(sec, frac, units):
+    """(秒, 秒未満のタイムスタンプ単位) を絶対時刻 [us] に変換"""
+    return sec.astype(np.int64) * 1_000_000 + frac.astype(np.int64) * 1_000_000 // units
+
+def __scan_pcap(buf, filesize, endian, units, start=24):
+    """
+    クラシックPCAPの全レコードの (パケット先頭位置, キャプチャ長, 元の長さ, 絶対時刻 [us], Ethernetか) を求める
+
+    start（レコードの境界）から filesize バイト目までの範囲のみを探索することもできる．
+    """
+    linktype = int(buf[20:24].view(endian + 'u4')[0]) & 0x0FFFFFFF if len(buf) >= 24 else 0
+    records  = __walk_blocks(buf, filesize, start, 8, 16, 16, endian)
+    hdr      = __gather(buf, records, 16).view(endian + 'u4') # 受信時刻（秒・秒未満），キャプチャ長，元の長さ
+    time_us  = __ticks_to_us(hdr[:, 0], hdr[:, 1], units)
+    return records + 16, hdr[:, 2].astype(np.int64), hdr[:, 3].astype(np.int64), time_us, np.full(len(records), linktype == LINKTYPE_ETHERNET)
+
+def __parse_idb(buf, pos, length, endian):
+    """pcapngのInterface Description Blockから (Ethernetか, 1秒あたりのタイムスタンプの単位数) を取得"""
+    linktype = struct.unpack_from(endian + 'H', buf, pos + 8)[0]
+    units    = 10**6 # if_tsresolがない場合はマイクロ秒
+    ptr      = pos + 16
+    while ptr + 4 <= pos + length - 4:
+        code, olen = struct.unpack_from(endian + 'HH', buf, ptr)
+        if code == 0: # opt_endofopt
+            break
+        if code == 9 and olen >= 1: # if_tsresol（最上位ビットが1なら2の負のべき，0なら10の負のべき）
+            tsresol = int(buf[ptr + 4])
+            units   = 2**(tsresol & 0x7f) if tsresol & 0x80 else 10**tsresol
+        ptr += 4 + (olen + 3) // 4 * 4
+    return linktype == LINKTYPE_ETHERNET, units
 
-def __find_nsamples_max(pcap_filesize, nsub):
-    """最大サンプル数を決定する"""
-    return int((pcap_filesize-24)/(12+46+18+(nsub*4)))
+def __scan_pcapng(buf, filesize, endian):
+    """pcapngの全Enhanced Packet Blockの (パケット先頭位置, キャプチャ長, 元の長さ, 絶対時刻 [us], Ethernetか) を求める"""
+    u4     = np.dtype(endian + 'u4')
+    blocks = __walk_blocks(buf, filesize, 0, 4, 0, 12, endian)
+    types  = __gather(buf, blocks, 4).view(u4).ravel()
+    sizes  = __gather(buf, blocks + 4, 4).view(u4).ravel()
 
-def read_pcap(pcap_filepath, bandwidth=0, nsamples_max=0):
-    """PCAPファイルからサンプルを読み取る"""
+    # セクション（SHB）ごとのインタフェース（IDB）のリンクタイプ・タイムスタンプの分解能（IDBは少数のため順に読む）
+    sections, first_idb, ethernet, units = [], [], [], []
+    limit = filesize
+    for pos, btype in zip(blocks[types != PCAPNG_EPB], types[types != PCAPNG_EPB]):
+        if btype == PCAPNG_SHB:
+            if int(buf[pos+8:pos+12].view(u4)[0]) != PCAPNG_BYTE_ORDER:
+                limit = int(pos) # バイトオーダーの異なるセクション以降は読み飛ばす
+                break
+            sections.append(int(pos))
+            first_idb.append(len(ethernet))
+        elif btype == PCAPNG_IDB and sections:
+            is_ethernet, resol = __parse_idb(buf, int(pos), int(buf[pos+4:pos+8].view(u4)[0]), endian)
+            ethernet.append(is_ethernet)
+            units.append(resol)
+    first_idb.append(len(ethernet))
+    ethernet.append(False) # 存在しないインタフェースを参照するブロック用
+    units.append(10**6)
+
+    # Enhanced Packet Blockのフィールド（ブロック長，インタフェースID，タイムスタンプ上位・下位，キャプチャ長，元の長さ）
+    epb       = blocks[(types == PCAPNG_EPB) & (sizes >= 32) & (blocks < limit)]
+    fields    = __gather(buf, epb + 4, 24).view(u4).astype(np.int64)
+    section   = np.searchsorted(np.array(sections, dtype=np.int64), epb, side='right') - 1
+    first_idb = np.array(first_idb, dtype=np.int64)
+    iface     = np.where(section >= 0, first_idb[np.maximum(section, 0)] + fields[:, 1], len(ethernet) - 1)
+    iface     = np.where((section >= 0) & (iface < first_idb[np.maximum(section, 0) + 1]), iface, len(ethernet) - 1)
+    units     = np.array(units, dtype=np.int64)[iface]
+    ticks     = (fields[:, 2] << 32) | fields[:, 3]
+    caplen    = np.where(28 + fields[:, 4] + 4 <= fields[:, 0], fields[:, 4], -1) # ブロックに収まらないパケットは無効
+    time_us   = __ticks_to_us(ticks // units, ticks % units, units)
+    return epb + 28, caplen, fields[:, 5], time_us, np.array(ethernet)[iface]
+
+def __validate_records(buf, data, caplen, origlen, ethernet, bandwidth):
+    """
+    Nexmon CSIのレコード（Ethernet/IPv4/UDP 5500番ポート，マジックナンバー0x1111，CSIが切れていない）のみを選択するマスクと帯域幅を求める
+
+    帯域幅が0の場合は，条件を満たすレコードで最も多いパケット長から推定する．
+    """
+    valid = ethernet & (caplen == origlen) & (caplen >= NEXMON_CSI_POS)
+    hdr   = __gather(buf, data[valid], NEXMON_HEADER_POS + 2)
+    valid[valid] = (hdr[:, 12] == 0x08) & (hdr[:, 13] == 0x00) & (hdr[:, 14] == 0x45) & (hdr[:, 23] == 17) & \
+                   (hdr[:, 36] == 0x15) & (hdr[:, 37] == 0x7c) & (hdr[:, 42] == 0x11) & (hdr[:, 43] == 0x11)
+    if bandwidth == 0:
+        detected = __find_bandwidth(caplen[valid])
+        if len(detected) > 0:
+            values, counts = np.unique(detected, return_counts=True)
+            bandwidth      = int(values[np.argmax(counts)])
+            valid[valid]   = detected == bandwidth
+    return valid & (caplen >= NEXMON_CSI_POS + int(bandwidth * 3.2) * 4), bandwidth
+
+def __scan_records(buf, filesize, bandwidth=0):
+    """
+    キャプチャファイルの形式（クラシックPCAP・pcapng，バイトオーダー，タイムスタンプの分解能）を判定し，
+    Nexmon CSIのレコードの (パケット先頭位置, 絶対受信時刻 [us], 帯域幅) を求める（他のパケットや途中で切れたレコードは除外）
+    """
+    magic = bytes(buf[:4])
+    if magic in PCAP_MAGICS:
+        endian, units = PCAP_MAGICS[magic]
+        records = __scan_pcap(buf, filesize, endian, units)
+    elif filesize >= 12 and int(buf[:4].view('<u4')[0]) == PCAPNG_SHB:
+        endian  = '<' if int(buf[8:12].view('<u4')[0]) == PCAPNG_BYTE_ORDER else '>'
+        records = __scan_pcapng(buf, filesize, endian)
+    else:
+        raise ValueError(f"対応していないファイル形式です: {magic.hex()}")
+    data, caplen, origlen, time_us, ethernet = records
+    valid, bandwidth = __validate_records(buf, data, caplen, origlen, ethernet, bandwidth)
+    return data[valid], time_us[valid], bandwidth
+
+def __gather(buf, positions, width, chunk=65536):
+    """各位置から width バイトずつ切り出し (位置数, width) の配列にする（インデックス配列はチャンク単位で作成）"""
+    out  = np.empty((len(positions), width), dtype=np.uint8)
+    cols = np.arange(width)
+    for start in range(0, len(positions), chunk):
+        out[start:start+chunk] = buf[positions[start:start+chunk, None] + cols]
+    return out
+
+def __read_headers(buf, positions, time_us):
+    """全レコードのヘッダフィールドを配列としてまとめて取り出す（positions: パケット先頭位置，time_us: 絶対受信時刻 [us]）"""
+    hdr = __gather(buf, positions + NEXMON_HEADER_POS, 14) # Nexmonヘッダ（マジックナンバー〜コア・空間ストリーム）
+    sc  = hdr[:, 10:12].copy().view('<u2').ravel()   # シーケンス制御
+    css = hdr[:, 12:14].copy().view('<u2').ravel()   # コア・空間ストリーム
+
+    fields = np.empty(len(positions), dtype=HEADER_DTYPE)
+    fields['rssi']   = hdr[:, 2].view(np.int8)
+    fields['fctl']   = hdr[:, 3]
+    fields['mac']    = hdr[:, 4:10]
+    fields['seq']    = sc >> 4
+    fields['frag']   = sc & 0xf
+    fields['css']    = css
+    fields['core']   = css & 0x7
+    fields['stream'] = (css >> 3) & 0x7
+    return {
+        'fields':  fields,
+        'time_us': time_us,
+    }
+
+def __mac_to_key(mac):
+    """MACアドレス（文字列・バイト列・(N, 6)配列）を整数キーに変換"""
+    if isinstance(mac, str):
+        mac = bytes.fromhex(mac.replace(':', '').replace('-', ''))
+    mac = np.asarray(bytearray(mac) if isinstance(mac, (bytes, bytearray)) else mac, dtype=np.uint64)
+    return mac.reshape(-1, 6) @ (np.uint64(256) ** np.arange(5, -1, -1, dtype=np.uint64))
+
+def __filter_mask(headers, macs=None, fctls=None, rssi_min=None):
+    """ヘッダ配列に対してフィルタ条件を満たすレコードのマスクを作成"""
+    mask = np.ones(len(headers['time_us']), dtype=bool)
+    if macs is not None:
+        mask &= np.isin(__mac_to_key(headers['fields']['mac']), np.concatenate([__mac_to_key(mac) for mac in macs]))
+    if fctls is not None:
+        mask &= np.isin(headers['fields']['fctl'], list(fctls))
+    if rssi_min is not None:
+        mask &= headers['fields']['rssi'] >= rssi_min
+    return mask
+
+def __gather_csi(buf, positions, nsub):
+    """指定したレコードのCSI（int16 I/Q）を (レコード数, サブキャリア数*2) の配列として取り出す"""
+    return __gather(buf, positions + NEXMON_CSI_POS, nsub * 4).view('<i2')
+
+def __build_sampleset(headers, mask, bandwidth, csi_raw, time_origin, precision):
+    """マスクで選択したレコードのヘッダとint16 I/Q列からSampleSetを作成（複素CSIへの変換は遅延）"""
+    time_us = headers['time_us'][mask]
+    return SampleSet(headers['fields'][mask], csi_raw, bandwidth, epoch_seconds(time_us, time_origin), precision=precision,
+                     time_us=time_us, time_origin=time_origin)
+
+def __time_origin(time_us):
+    """先頭レコードの絶対受信時刻 [us]（相対時間の基準）"""
+    return int(time_us[0]) if len(time_us) > 0 else 0
+
+# サイドカーインデックスの形式のバージョン
+INDEX_VERSION = 2
+
+def __index_path(pcap_filepath):
+    """サイドカーインデックスのファイルパス"""
+    return f"{pcap_filepath}.idx.npz"
+
+# 直近に読み込んだサイドカーインデックス（PCAPファイルパス -> ((サイズ, 更新時刻), インデックス)）
+_index_cache      = OrderedDict()
+_index_cache_lock = threading.Lock()
+INDEX_CACHE_SIZE  = 16
+
+def __cache_index(pcap_filepath, stat, index):
+    """読み込んだインデックスを保持（古いものから破棄）"""
+    with _index_cache_lock:
+        _index_cache[pcap_filepath] = ((stat.st_size, stat.st_mtime_ns), index)
+        _index_cache.move_to_end(pcap_filepath)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+def __load_index(pcap_filepath):
+    """サイドカーインデックスを読み込む（存在しない，またはPCAPファイルが更新されている場合はNone）"""
+    stat = os.stat(pcap_filepath)
+    with _index_cache_lock:
+        cached = _index_cache.get(pcap_filepath)
+    if cached is not None and cached[0] == (stat.st_size, stat.st_mtime_ns):
+        return cached[1]
+    index_path = __index_path(pcap_filepath)
+    if not os.path.exists(index_path):
+        return None
+    try:
+        with np.load(index_path) as index:
+            if 'version' not in index.files or int(index['version']) != INDEX_VERSION:
+                return None # 形式の異なる古いインデックス
+            if int(index['filesize']) != stat.st_size or int(index['mtime_ns']) != stat.st_mtime_ns:
+                return None
+            return __cache_index(pcap_filepath, stat, {key: index[key] for key in index.files})
+    except (OSError, ValueError, KeyError):
+        return None
+
+def __save_index(pcap_filepath, positions, headers, bandwidth):
+    """パケット先頭位置・絶対受信時刻・シーケンス番号をサイドカーインデックスとして保存"""
+    stat  = os.stat(pcap_filepath)
+    index = {
+        'version':    INDEX_VERSION,
+        'positions':  positions,                 # パケット先頭位置（Nexmon CSIのレコードのみ）
+        'timestamps': headers['time_us'],        # 絶対時刻 [us]
+        'seq':        headers['fields']['seq'],  # シーケンス番号
+        'sorted':     np.all(np.diff(headers['time_us']) >= 0),
+        'bandwidth':  bandwidth,
+        'filesize':   stat.st_size,
+        'mtime_ns':   stat.st_mtime_ns,
+    }
+    # 書き込み途中のファイルを読まれないよう，一時ファイルに保存してから置き換える
+    tmp_path = f"{__index_path(pcap_filepath)}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **index)
+        os.replace(tmp_path, __index_path(pcap_filepath))
+    except OSError:
+        # 書き込めない場所ではインデックスなしで続行
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return __cache_index(pcap_filepath, stat, index)
+
+def __read_records(fc, pcap_filesize, bandwidth, nsamples_max, pcap_filepath=None):
+    """キャプチャファイルの内容からパケット先頭位置とヘッダ配列を求める（インデックスがあればレコードの探索を省略）"""
+    buf   = np.frombuffer(fc, dtype=np.uint8)
+    index = __load_index(pcap_filepath) if pcap_filepath is not None else None
+    if index is None and pcap_filepath is not None:
+        # 初回のパース時にインデックスを作成（インデックスは帯域幅を推定して探索した結果で作成）
+        positions, time_us, detected = __scan_records(buf, pcap_filesize)
+        index = __save_index(pcap_filepath, positions, __read_headers(buf, positions, time_us), detected)
+    if index is not None and bandwidth in (0, int(index['bandwidth'])):
+        positions, time_us, bandwidth = index['positions'], index['timestamps'], int(index['bandwidth'])
+    else:
+        # 推定と異なる帯域幅を指定した場合は，その帯域幅で探索し直す
+        positions, time_us, bandwidth = __scan_records(buf, pcap_filesize, bandwidth)
+    headers = __read_headers(buf, positions, time_us)
+
+    if nsamples_max > 0:
+        positions = positions[:nsamples_max]
+        headers   = {key: value[:nsamples_max] for key, value in headers.items()}
+    return buf, positions, headers, bandwidth, int(bandwidth * 3.2)
+
+def __with_mapped(pcap_filepath, func):
+    """
+    PCAPファイルをメモリマップしてfunc(buf)の結果を返す（funcはバッファを参照しないコピーを返すこと）
+
+    例外時もバッファの参照（例外のトレースバックが保持する呼び出し先のフレームを含む）を解放してからマップを閉じ，元の例外を送出する．
+    空のファイルはメモリマップできないため，空のバッファを渡す．
+    """
+    if os.stat(pcap_filepath).st_size == 0:
+        return func(np.empty(0, dtype=np.uint8))
+    with open(pcap_filepath, 'rb') as pcapfile, mmap.mmap(pcapfile.fileno(), 0, access=mmap.ACCESS_READ) as fc:
+        buf = np.frombuffer(fc, dtype=np.uint8)
+        try:
+            return func(buf)
+        except BaseException as e:
+            traceback.clear_frames(e.__traceback__)
+            raise
+        finally:
+            del buf # mmapを閉じる前にバッファの参照を解放
+
+def __scan_file(buf):
+    """ファイル全体のNexmon CSIのレコードを探索し，(パケット先頭位置, ヘッダ配列, 帯域幅) を求める（空のファイルは0レコード）"""
+    if len(buf) == 0:
+        positions, time_us, bandwidth = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 0
+    else:
+        positions, time_us, bandwidth = __scan_records(buf, len(buf))
+    return positions, __read_headers(buf, positions, time_us), bandwidth
+
+def __get_index(pcap_filepath):
+    """サイドカーインデックスを取得（存在しなければヘッダのみを読み取って作成）"""
+    index = __load_index(pcap_filepath)
+    if index is not None:
+        return index
+    positions, headers, bandwidth = __with_mapped(pcap_filepath, __scan_file)
+    return __save_index(pcap_filepath, positions, headers, bandwidth)
+
+def __read_indexed(pcap_filepath, index, rows, bandwidth, macs, fctls, rssi_min, precision):
+    """インデックス上の指定した行（スライスまたは行番号の配列）のレコードのみを読み取る"""
+    if bandwidth == 0:
+        bandwidth = int(index['bandwidth'])
+    nsub      = int(bandwidth * 3.2)
+    positions = index['positions'][rows]
+
+    def gather(buf):
+        headers = __read_headers(buf, positions, index['timestamps'][rows])
+        mask    = __filter_mask(headers, macs=macs, fctls=fctls, rssi_min=rssi_min)
+        return headers, mask, __gather_csi(buf, positions[mask], nsub)
+
+    headers, mask, csi_raw = __with_mapped(pcap_filepath, gather)
+    return __build_sampleset(headers, mask, bandwidth, csi_raw, __time_origin(index['timestamps']), precision)
+
+def __load_pcap(pcap_filepath):
+    """PCAPファイルの内容とファイルサイズを読み込む"""
     pcap_filesize = os.stat(pcap_filepath).st_size
     with open(pcap_filepath, 'rb') as pcapfile:
         fc = pcapfile.read()
+    return fc, pcap_filesize
+
+def read_pcap(pcap_filepath, bandwidth=0, nsamples_max=0, macs=None, fctls=None, rssi_min=None, precision='complex128'):
+    """
+    PCAPファイルからサンプルを読み取る
 
+    クラシックPCAP（リトル・ビッグエンディアン，マイクロ秒・ナノ秒精度）とpcapngに対応し，
+    Nexmon CSI以外のパケットや途中で切れたレコードは読み飛ばす．
+    macs / fctls / rssi_min を指定すると，ヘッダのみを先に読み取り，
+    条件を満たすフレームだけをCSIに変換する（受信時間は先頭レコードからの相対時間）．
+    絶対受信時刻はint64のマイクロ秒としてSampleSet.time_usに保持する
+    """
+    fc, pcap_filesize = __load_pcap(pcap_filepath)
+    buf, positions, headers, bandwidth, nsub = __read_records(fc, pcap_filesize, bandwidth, nsamples_max, pcap_filepath)
+    mask = __filter_mask(headers, macs=macs, fctls=fctls, rssi_min=rssi_min)
+    return __build_sampleset(headers, mask, bandwidth, __gather_csi(buf, positions[mask], nsub), __time_origin(headers['time_us']), precision)
+
+def demux_pcap(pcap_filepath, bandwidth=0, nsamples_max=0, macs=None, fctls=None, rssi_min=None, precision='complex128'):
+    """PCAPファイルからサンプルを読み取り，送信元MACアドレスごとのSampleSetに分割する"""
+    fc, pcap_filesize = __load_pcap(pcap_filepath)
+    buf, positions, headers, bandwidth, nsub = __read_records(fc, pcap_filesize, bandwidth, nsamples_max, pcap_filepath)
+    mask = __filter_mask(headers, macs=macs, fctls=fctls, rssi_min=rssi_min)
+    keys = __mac_to_key(headers['fields']['mac'])
+
+    sample_sets = {}
+    for key in np.unique(keys[mask]):
+        macid = int(key).to_bytes(6, byteorder='big').hex()
+        macid = ':'.join([macid[i:i+2] for i in range(0, len(macid), 2)])
+        mac_mask = mask & (keys == key)
+        sample_sets[macid] = __build_sampleset(headers, mac_mask, bandwidth, __gather_csi(buf, positions[mac_mask], nsub), __time_origin(headers['time_us']), precision)
+    return sample_sets
+
+def __pcap_boundary(buf, filesize, target, endian, window=1 << 18, chain=8):
+    """
+    クラシックPCAPの target バイト目以降で最初のレコードの境界を求める（見つからなければNone）
+
+    レコードヘッダとして妥当な位置（キャプチャ長 <= 元の長さ・スナップ長，受信時刻が先頭レコードから1週間以内）を
+    window バイトの範囲でまとめて絞り込み，そこから chain 個のレコードが続けて妥当（またはファイル末尾に一致）な位置を境界とする．
+    """
+    u4        = np.dtype(endian + 'u4')
+    snaplen   = int(buf[16:20].view(u4)[0]) or 0xFFFFFFFF
+    first_sec = int(buf[24:28].view(u4)[0])
+
+    def plausible(hdr):
+        return (hdr[..., 2] <= hdr[..., 3]) & (hdr[..., 2] <= snaplen) & (np.abs(hdr[..., 0].astype(np.int64) - first_sec) < 7 * 86400)
+
+    cand = np.arange(target, max(min(target + window, filesize - 16), target), dtype=np.int64)
+    for pos in cand[plausible(__gather(buf, cand, 16).view(u4))]:
+        ptr, n = int(pos), 0
+        while n < chain and ptr + 16 <= filesize:
+            hdr = buf[ptr:ptr+16].view(u4)
+            if not plausible(hdr) or ptr + 16 + int(hdr[2]) > filesize:
+                break
+            ptr += 16 + int(hdr[2])
+            n   += 1
+        if n == chain or ptr == filesize:
+            return int(pos)
+    return None
+
+def __detect_bandwidth(pcap_filepath, head_size=65536):
+    """
+    PCAPファイルの帯域幅を推定（サイドカーインデックスがあればその値，なければ先頭のブロックに含まれるCSIのレコードから推定）
+
+    先頭のブロックにCSIのレコードがない場合（ヘッダのみのファイルなど）は0を返す．
+    """
+    index = __load_index(pcap_filepath)
+    if index is not None:
+        return int(index['bandwidth'])
+    with open(pcap_filepath, 'rb') as f:
+        head = np.frombuffer(f.read(head_size), dtype=np.uint8)
+    if len(head) == 0:
+        return 0
+    return __scan_records(head, len(head))[2]
+
+def __parse_range(pcap_filepath, start, stop, bandwidth, macs, fctls, rssi_min, shm_name, shape, offset, positions=None, time_us=None):
+    """
+    ワーカープロセス：担当範囲のレコードを探索し，ヘッダの解析・フィルタ・CSIの取り出しまでを行う
+
+    クラシックPCAPは [start, stop) バイトの範囲（レコードの境界）を探索する．
+    positions / time_us（サイドカーインデックスの担当範囲）を指定した場合は探索を省略する．
+    CSIは共有メモリの offset 行目以降に直接書き込み，(ヘッダ配列, フィルタのマスク) を返す．
+    """
+    nsub = int(bandwidth * 3.2)
+
+    def parse(buf):
+        nonlocal positions, time_us
+        if positions is None:
+            endian, units = PCAP_MAGICS[bytes(buf[:4])]
+            data, caplen, origlen, times, ethernet = __scan_pcap(buf, stop, endian, units, start=start)
+            valid, _  = __validate_records(buf, data, caplen, origlen, ethernet, bandwidth)
+            positions, time_us = data[valid], times[valid]
+        headers  = __read_headers(buf, positions, time_us)
+        mask     = __filter_mask(headers, macs=macs, fctls=fctls, rssi_min=rssi_min)
+        selected = positions[mask]
+        shm      = shared_memory.SharedMemory(name=shm_name)
+        try:
+            out = np.ndarray(shape, dtype=np.int16, buffer=shm.buf)
+            for i in range(0, len(selected), 65536):
+                out[offset+i:offset+i+len(selected[i:i+65536])] = __gather_csi(buf, selected[i:i+65536], nsub)
+            del out
+        finally:
+            shm.close()
+        return headers, mask
+    return __with_mapped(pcap_filepath, parse)
+
+def read_pcap_parallel(pcap_filepath, bandwidth=0, nsamples_max=0, macs=None, fctls=None, rssi_min=None, precision='complex128', nworkers=None):
+    """
+    PCAPファイルをバイト範囲に分割し，複数プロセスで並列に読み取る（結果はread_pcapと同じ1つのSampleSet）
+
+    クラシックPCAPは，親プロセスが分割位置の付近からレコードの境界を探して（固定のレコードヘッダの形式で検証）範囲を決め，
+    各ワーカーが担当範囲のレコードの探索・ヘッダの解析・フィルタ・CSIの取り出しを行う．
+    pcapngはサイドカーインデックス（なければ作成）のレコード位置で分割し，ワーカーがヘッダの解析以降を行う．
+    CSIはワーカーが共有メモリ（範囲ごとの最大行数で区切った領域）に直接書き込み，最後に1つの配列に詰める．
+    帯域幅を省略した場合はサイドカーインデックス，または先頭のレコードから推定する．
+    受信時間はファイル全体の先頭レコードからの相対時間．nworkers=1 や nsamples_max を指定した場合はread_pcapで読み取る．
+    """
+    nworkers = nworkers or os.cpu_count() or 1
+    filesize = os.stat(pcap_filepath).st_size
+    if nworkers <= 1 or nsamples_max > 0 or filesize < 24:
+        return read_pcap(pcap_filepath, bandwidth=bandwidth, nsamples_max=nsamples_max, macs=macs, fctls=fctls, rssi_min=rssi_min, precision=precision)
+    bandwidth = bandwidth or __detect_bandwidth(pcap_filepath) or int(__get_index(pcap_filepath)['bandwidth'])
     if bandwidth == 0:
-        bandwidth = __find_bandwidth(fc[32:36])
+        # CSIのレコードがない
+        return read_pcap(pcap_filepath, macs=macs, fctls=fctls, rssi_min=rssi_min, precision=precision)
     nsub = int(bandwidth * 3.2)
-    if nsamples_max == 0:
-        nsamples_max = __find_nsamples_max(pcap_filesize, nsub)
-
-    rssi = bytearray(nsamples_max * 1)
-    fctl = bytearray(nsamples_max * 1)
-    mac  = bytearray(nsamples_max * 6)
-    seq  = bytearray(nsamples_max * 2)
-    css  = bytearray(nsamples_max * 2)
-    csi  = bytearray(nsamples_max * nsub * 4)
-    timestamps = np.zeros(nsamples_max, dtype=np.float64)
-
-    ptr = 24
-    nsamples = 0
-    first_timestamp = None
-
-    while ptr < pcap_filesize:
-        ts_sec  = int.from_bytes(fc[ptr:ptr+4], byteorder='little', signed=False)
-        ts_usec = int.from_bytes(fc[ptr+4:ptr+8], byteorder='little', signed=False)
-        timestamp = ts_sec + ts_usec / 1e6
-
-        if first_timestamp is None:
-            first_timestamp = timestamp
-
-        timestamps[nsamples] = timestamp - first_timestamp
-
-        ptr += 8
-        frame_len = int.from_bytes(fc[ptr:ptr+4], byteorder='little', signed=False)
-        ptr += 50
-
-        rssi[nsamples] = fc[ptr+2]
-        fctl[nsamples] = fc[ptr+3]
-        mac[nsamples*6:(nsamples+1)*6] = fc[ptr+4:ptr+10]
-        seq[nsamples*2:(nsamples+1)*2] = fc[ptr+10:ptr+12]
-        css[nsamples*2:(nsamples+1)*2] = fc[ptr+12:ptr+14]
-        csi[nsamples*(nsub*4):(nsamples+1)*(nsub*4)] = fc[ptr+18:ptr+18+nsub*4]
-
-        ptr += (frame_len - 42)
-        nsamples += 1
-
-    csi_np = np.frombuffer(csi, dtype=np.int16, count=nsub * 2 * nsamples)
-    csi_np = csi_np.reshape((nsamples, nsub * 2))
-    csi_cmplx = np.fft.fftshift(csi_np[:, ::2] + 1.j * csi_np[:, 1::2], axes=(1,))
-    rssi = np.frombuffer(rssi, dtype=np.int8, count=nsamples)
-
-    return SampleSet((rssi, fctl, mac, seq, css, csi_cmplx), bandwidth, timestamps[:nsamples])
+
+    # 担当範囲と，その範囲に含まれうるCSIのレコードの最大数
+    with open(pcap_filepath, 'rb') as f:
+        magic = f.read(4)
+    tasks, limits = [], []
+    if magic in PCAP_MAGICS:
+        # 等分した位置の付近のレコードの境界で分割
+        def boundaries(buf):
+            targets = [24 + (filesize - 24) * i // nworkers for i in range(1, nworkers)]
+            found   = [__pcap_boundary(buf, filesize, target, PCAP_MAGICS[magic][0]) for target in targets]
+            return sorted({24, filesize} | {pos for pos in found if pos is not None})
+        bounds = __with_mapped(pcap_filepath, boundaries)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            tasks.append(((start, stop), {}))
+            limits.append((stop - start) // (16 + NEXMON_CSI_POS + nsub * 4))
+    else:
+        index = __get_index(pcap_filepath)
+        if bandwidth != int(index['bandwidth']):
+            # インデックスと異なる帯域幅ではレコード位置が使えない
+            return read_pcap(pcap_filepath, bandwidth=bandwidth, macs=macs, fctls=fctls, rssi_min=rssi_min, precision=precision)
+        for rows in np.array_split(np.arange(len(index['positions'])), nworkers):
+            tasks.append(((0, filesize), {'positions': index['positions'][rows], 'time_us': index['timestamps'][rows]}))
+            limits.append(len(rows))
+
+    offsets = np.concatenate([[0], np.cumsum(limits)]).astype(np.int64)
+    shape   = (int(offsets[-1]), nsub * 2)
+    shm     = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * 2))
+    try:
+        with ProcessPoolExecutor(max_workers=min(nworkers, len(tasks))) as executor:
+            futures = [executor.submit(__parse_range, pcap_filepath, start, stop, bandwidth, macs, fctls, rssi_min, shm.name, shape, int(offset), **kwargs)
+                       for ((start, stop), kwargs), offset in zip(tasks, offsets[:-1])]
+            parts = [future.result() for future in futures]
+
+        # 範囲ごとに書き込まれた行を詰めて1つの配列にする
+        counts  = [int(mask.sum()) for _, mask in parts]
+        csi_raw = np.empty((sum(counts), nsub * 2), dtype=np.int16)
+        out     = np.ndarray(shape, dtype=np.int16, buffer=shm.buf)
+        for offset, count, dest in zip(offsets[:-1], counts, np.concatenate([[0], np.cumsum(counts)])):
+            csi_raw[dest:dest+count] = out[offset:offset+count]
+        del out
+    finally:
+        shm.close()
+        shm.unlink()
+
+    headers = {
+        'fields':  np.concatenate([headers['fields'] for headers, _ in parts]),
+        'time_us': np.concatenate([headers['time_us'] for headers, _ in parts]),
+    }
+    mask = np.concatenate([mask for _, mask in parts])
+    return __build_sampleset(headers, mask, bandwidth, csi_raw, __time_origin(headers['time_us']), precision)
+
+def read_pcap_range(pcap_filepath, t0, t1, absolute=False, bandwidth=0, macs=None, fctls=None, rssi_min=None, precision='complex128'):
+    """
+    受信時刻が [t0, t1] のフレームのみをPCAPファイルから読み取る
+
+    サイドカーインデックス（{pcap_filepath}.idx.npz）を二分探索して範囲を決定する．
+    t0, t1 は先頭レコードからの相対時間 [s]（absolute=True の場合はエポック秒）
+    """
+    index      = __get_index(pcap_filepath)
+    timestamps = index['timestamps']
+    base       = 0 if absolute or len(timestamps) == 0 else int(timestamps[0])
+    t0_us      = base + int(round(t0 * 1e6))
+    t1_us      = base + int(round(t1 * 1e6))
+    if bool(index['sorted']):
+        start = int(np.searchsorted(timestamps, t0_us, side='left'))
+        stop  = int(np.searchsorted(timestamps, t1_us, side='right'))
+        return __read_indexed(pcap_filepath, index, slice(start, stop), bandwidth, macs, fctls, rssi_min, precision)
+
+    # 受信時刻が単調増加でない場合は範囲内のレコードを全て選択
+    rows = np.flatnonzero((timestamps >= t0_us) & (timestamps <= t1_us))
+    return __read_indexed(pcap_filepath, index, rows, bandwidth, macs, fctls, rssi_min, precision)
+
+def read_pcap_slice(pcap_filepath, start, stop, bandwidth=0, macs=None, fctls=None, rssi_min=None, precision='complex128'):
+    """インデックス上の [start, stop) 番目のレコードのみをPCAPファイルから読み取る"""
+    index = __get_index(pcap_filepath)
+    return __read_indexed(pcap_filepath, index, slice(start, stop), bandwidth, macs, fctls, rssi_min, precision)
+
+def iter_pcap(pcap_filepath, chunk_records=4096, start=0, follow=False, poll_interval=1.0, idle_timeout=None,
+              bandwidth=0, macs=None, fctls=None, rssi_min=None, precision='complex128'):
+    """
+    PCAPファイルをchunk_records件ずつのSampleSetとして順に読み取るジェネレータ
+
+    サイドカーインデックスの [start, ...) 番目のレコードから読み取る（受信時間はファイル全体の先頭レコードからの相対時間）．
+    follow=True の場合は末尾に達した後もpoll_interval [s] ごとにファイルの追記を確認し，
+    idle_timeout [s] の間追記がなければ終了する（Noneの場合は終了しない）．
+    """
+    idle = 0.0
+    while True:
+        index    = __get_index(pcap_filepath)
+        nrecords = len(index['positions'])
+        while start < nrecords:
+            stop = min(start + chunk_records, nrecords)
+            yield __read_indexed(pcap_filepath, index, slice(start, stop), bandwidth, macs, fctls, rssi_min, precision)
+            start = stop
+            idle  = 0.0
+        if not follow or (idle_timeout is not None and idle >= idle_timeout):
+            return
+        time.sleep(poll_interval)
+        idle += poll_interval
+
+def read_pcap_summary(pcap_filepath):
+    """サイドカーインデックスからレコード数・先頭の絶対受信時刻 [s]・記録時間 [s]・帯域幅を取得（CSIは読み込まない）"""
+    index      = __get_index(pcap_filepath)
+    timestamps = index['timestamps']
+    nrecords   = len(index['positions'])
+    return {
+        'nrecords':  nrecords,
+        'start':     float(timestamps.min()) / 1e6 if nrecords > 0 else None,
+        'duration':  float(timestamps.max() - timestamps.min()) / 1e6 if nrecords > 0 else None,
+        'bandwidth': int(index['bandwidth']),
+    }
+
+def read_pcap_index(pcap_filepath):
+    """サイドカーインデックスから全レコードの絶対受信時刻 [us]・シーケンス番号・帯域幅を取得（CSIは読み込まない）"""
+    index = __get_index(pcap_filepath)
+    return {
+        'timestamps': index['timestamps'],
+        'seq':        index['seq'],
+        'sorted':     bool(index['sorted']),
+        'bandwidth':  int(index['bandwidth']),
+    }
+
+# デバイス（PCAPディレクトリ）ごとの帯域幅・サブキャリア数（パス -> (ディレクトリのmtime, 帯域幅・サブキャリア数)）
+_device_meta = {}
+
+def get_device_meta(pcap_dir, ext='.pcap'):
+    """
+    デバイスのPCAPディレクトリの帯域幅・サブキャリア数を取得
+
+    PCAPファイルを名前順に調べ，サイドカーインデックス（なければ先頭のレコード）から帯域幅を推定できた最初のファイルの値を使う．
+    ディレクトリのmtimeが変わるまでは前回の結果を再利用する（同じデバイスの帯域幅は変わらない前提）．
+    どのファイルからも推定できない場合（ヘッダのみのファイルしかないなど）は帯域幅0の結果を返し，保持せずに次の呼び出しで再度推定する．
+    ディレクトリが存在しない，またはPCAPファイルがない場合はNoneを返す．
+    """
+    if not os.path.isdir(pcap_dir):
+        return None
+    dir_stat = os.stat(pcap_dir).st_mtime_ns
+    cached   = _device_meta.get(pcap_dir)
+    if cached is not None and cached[0] == dir_stat:
+        return cached[1]
+    names = sorted(name for name in os.listdir(pcap_dir) if name.endswith(ext))
+    if not names:
+        return None
+    bandwidth = 0
+    for name in names:
+        try:
+            bandwidth = __detect_bandwidth(os.path.join(pcap_dir, name))
+        except (OSError, ValueError):
+            # 読めないファイルは飛ばして次のファイルから推定
+            continue
+        if bandwidth:
+            break
+    meta = {'bandwidth': bandwidth, 'nsubcarriers': NSUBCARRIERS.get(bandwidth, int(bandwidth * 3.2))}
+    if bandwidth:
+        _device_meta[pcap_dir] = (dir_stat, meta)
+    else:
+        _device_meta.pop(pcap_dir, None)
+    return meta
+
+def read_pcap_tensor(pcap_filepath, bandwidth=0, nsamples_max=0, precision='complex128'):
+    """PCAPファイルからサンプルを読み取り，コア・空間ストリームごとに整列したテンソルで返す"""
+    return read_pcap(pcap_filepath, bandwidth=bandwidth, nsamples_max=nsamples_max, precision=precision).to_tensor()
 
 if __name__ == "__main__":
     samples = read_pcap('pcap_files/_sample.pcap')
@@ -0,0 +1,195 @@
+import os
+import struct
+import numpy as np
+from datetime import datetime
+
+from .interleaved import NULL_MASKS
+
+__all__ = ['generate_pcap', 'generate_capture_set']
+
+# PCAPグローバルヘッダ（リトルエンディアン，マイクロ秒精度，Ethernet）
+PCAP_GLOBAL_HEADER = struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)
+
+# Nexmon CSI フレームのUDPポートとマジックナンバー
+NEXMON_UDP_PORT = 5500
+NEXMON_MAGIC    = 0x1111
+NEXMON_CHIP     = 0x4345
+
+# 帯域幅ごとのchanspec（36ch / 5GHz帯）
+CHANSPECS = {20: 0xd024, 40: 0xd826, 80: 0xe02a, 160: 0xe832}
+
+def _record_dtype(nsub: int) -> np.dtype:
+    """1レコード分（PCAPレコードヘッダ + Ethernet/IP/UDP + Nexmonペイロード）の構造化dtype"""
+    return np.dtype([
+        ('ts_sec',   '<u4'), ('ts_usec', '<u4'), ('incl_len', '<u4'), ('orig_len', '<u4'),
+        ('eth',      'u1', 14), ('ip', 'u1', 20), ('udp', 'u1', 8),
+        ('magic',    '<u2'), ('rssi', 'i1'), ('fctl', 'u1'), ('mac', 'u1', 6),
+        ('seq',      '<u2'), ('css', '<u2'), ('chanspec', '<u2'), ('chip', '<u2'),
+        ('csi',      '<i2', (nsub * 2,)),
+    ])
+
+def _ip_checksum(header: bytes) -> int:
+    """IPv4ヘッダのチェックサムを計算する"""
+    total = sum(struct.unpack('!10H', header))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+def _udp_headers(nsub: int) -> tuple:
+    """Ethernet/IP/UDPヘッダのバイト列を作成する"""
+    payload_len = 18 + nsub * 4
+    eth = bytes.fromhex('ffffffffffff') + b'NEXMON' + struct.pack('!H', 0x0800)
+    ip  = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + 8 + payload_len, 0, 0, 1, 17, 0,
+                      bytes([10, 10, 10, 10]), bytes([255, 255, 255, 255]))
+    ip  = ip[:10] + struct.pack('!H', _ip_checksum(ip)) + ip[12:]
+    udp = struct.pack('!HHHH', NEXMON_UDP_PORT, NEXMON_UDP_PORT, 8 + payload_len, 0)
+    return eth, ip, udp
+
+def _synthetic_csi(rng, nframes: int, bandwidth: int, nsub: int) -> np.ndarray:
+    """Nexmon（fftshift前の並び）と同じ配置のint16 I/Q列を生成する"""
+    k      = np.arange(nsub) - nsub // 2
+    amp    = 400.0 + 150.0 * np.cos(2 * np.pi * k / nsub * 3.0)                # サブキャリアごとの振幅
+    slope  = rng.uniform(-0.05, 0.05, size=(nframes, 1))                         # フレームごとの線形ドリフト
+    offset = rng.uniform(-np.pi, np.pi, size=(nframes, 1))                       # フレームごとの位相オフセット
+    motion = 0.3 * np.sin(2 * np.pi * np.arange(nframes) / 97.0)[:, None]        # ゆっくり変化する成分
+    phase  = slope * k[None, :] + offset + motion
+    noise  = rng.normal(0.0, 10.0, size=(nframes, nsub)) + 1.j * rng.normal(0.0, 10.0, size=(nframes, nsub))
+    csi    = (amp * (1.0 + 0.1 * motion)) * np.exp(1.j * phase) + noise
+    csi[:, NULL_MASKS[bandwidth]] = 0
+    csi    = np.fft.ifftshift(csi, axes=(1,))
+
+    iq = np.empty((nframes, nsub * 2), dtype=np.int16)
+    iq[:, ::2]  = np.clip(np.rint(csi.real), -32768, 32767)
+    iq[:, 1::2] = np.clip(np.rint(csi.imag), -32768, 32767)
+    return iq
+
+def generate_pcap(pcap_filepath: str, bandwidth: int = 80, nframes: int = 1000, rate: float = 100.0,
+                  jitter: float = 0.0, ntx: int = 1, ncores: int = 1, nstreams: int = 1, fctl: int = 0x08,
+                  start_time: float = 0.0, drop_rate: float = 0.0, seed: int = 0) -> str:
+    """
+    Nexmon CSI形式の合成PCAPファイルを生成する
+
+    params
+    ------
+    pcap_filepath: str
+        出力先のPCAPファイルパス
+    bandwidth: int
+        帯域幅（20/40/80/160 MHz）
+    nframes: int
+        送信フレーム数（1フレームにつき ncores*nstreams 個のレコードを出力）
+    rate: float
+        フレームの送信レート [Hz]
+    jitter: float
+        受信時刻に加える揺らぎの標準偏差 [s]
+    ntx: int
+        送信元MACアドレスの数（フレームごとに巡回）
+    ncores: int
+        コア数
+    nstreams: int
+        空間ストリーム数
+    fctl: int
+        フレームコントロール
+    start_time: float
+        先頭フレームのエポック秒
+    drop_rate: float
+        フレームの欠落率
+    seed: int
+        乱数シード
+
+    return
+    ------
+    str
+        出力したPCAPファイルパス
+    """
+    if bandwidth not in CHANSPECS:
+        raise ValueError(f"未対応の帯域幅です: {bandwidth}")
+
+    rng  = np.random.default_rng(seed)
+    nsub = int(bandwidth * 3.2)
+
+    # 受信するフレームの選択（欠落を再現）
+    frame_idx = np.arange(nframes)
+    if drop_rate > 0:
+        frame_idx = frame_idx[rng.random(nframes) >= drop_rate]
+
+    # フレームごとの受信時刻（送信周期 + 揺らぎ），単調増加を保証
+    times = start_time + frame_idx / rate
+    if jitter > 0:
+        times = times + rng.normal(0.0, jitter, size=times.shape)
+    times = np.maximum.accumulate(times)
+
+    # コア・空間ストリームごとにレコードを展開
+    nstream_total = ncores * nstreams
+    nrecords      = len(frame_idx) * nstream_total
+    cores, ss     = np.meshgrid(np.arange(ncores), np.arange(nstreams), indexing='ij')
+
+    eth, ip, udp = _udp_headers(nsub)
+    rec = np.zeros(nrecords, dtype=_record_dtype(nsub))
+    ts_usec_total   = np.rint(np.repeat(times, nstream_total) * 1e6).astype(np.int64)
+    rec['ts_sec']   = ts_usec_total // 1_000_000
+    rec['ts_usec']  = ts_usec_total %  1_000_000
+    rec['incl_len'] = rec.dtype.itemsize - 16
+    rec['orig_len'] = rec.dtype.itemsize - 16
+    rec['eth']      = np.frombuffer(eth, dtype=np.uint8)
+    rec['ip']       = np.frombuffer(ip,  dtype=np.uint8)
+    rec['udp']      = np.frombuffer(udp, dtype=np.uint8)
+    rec['magic']    = NEXMON_MAGIC
+    rec['rssi']     = np.repeat(rng.integers(-75, -35, size=len(frame_idx)), nstream_total)
+    rec['fctl']     = fctl
+    tx              = np.repeat(frame_idx % ntx, nstream_total)
+    rec['mac']      = np.stack([np.full(len(tx), 0x02), np.zeros(len(tx)), np.zeros(len(tx)),
+                                np.zeros(len(tx)), tx >> 8, tx & 0xff], axis=1)
+    rec['seq']      = np.repeat((frame_idx // ntx) % 4096, nstream_total) << 4
+    rec['css']      = np.tile((cores | (ss << 3)).ravel(), len(frame_idx))
+    rec['chanspec'] = CHANSPECS[bandwidth]
+    rec['chip']     = NEXMON_CHIP
+    rec['csi']      = _synthetic_csi(rng, nrecords, bandwidth, nsub)
+
+    with open(pcap_filepath, 'wb') as f:
+        f.write(PCAP_GLOBAL_HEADER)
+        rec.tofile(f)
+    return pcap_filepath
+
+def generate_capture_set(root_dir: str, ndevices: int = 4, nfiles: int = 1, bandwidth: int = 80,
+                         nframes: int = 1000, rate: float = 100.0, jitter: float = 0.001,
+                         start: str = "2025-03-13T00-00-00", seed: int = 0, **kwargs) -> dict:
+    """
+    複数デバイスが同一フレームを受信した合成キャプチャを生成する
+    （{root_dir}/{デバイス名}/{タイムスタンプ}.pcap の構成）
+
+    return
+    ------
+    dict
+        デバイス名 -> PCAPファイルパスのリスト
+    """
+    timestamp_format = "%Y-%m-%dT%H-%M-%S"
+    start_time       = datetime.strptime(start, timestamp_format).timestamp()
+    file_duration    = nframes / rate
+
+    captures = {}
+    for device_idx in range(ndevices):
+        device = f"minelab-iot-nexmon-{device_idx+1}"
+        os.makedirs(f"{root_dir}/{device}", exist_ok=True)
+        captures[device] = []
+        for file_idx in range(nfiles):
+            file_start = start_time + file_idx * file_duration
+            filename   = datetime.fromtimestamp(file_start).strftime(timestamp_format)
+            captures[device].append(generate_pcap(
+                pcap_filepath = f"{root_dir}/{device}/{filename}.pcap",
+                bandwidth     = bandwidth,
+                nframes       = nframes,
+                rate          = rate,
+                jitter        = jitter,
+                start_time    = file_start,
+                seed          = seed + device_idx * nfiles + file_idx,
+                **kwargs
+            ))
+    return captures
+
+# 使用例
+if __name__ == "__main__":
+    from .interleaved import read_pcap
+    for bw in [20, 40, 80, 160]:
+        path = generate_pcap(f"/tmp/_sample_{bw}.pcap", bandwidth=bw, nframes=100, jitter=0.0005)
+        samples = read_pcap(path)
+        print(f"{bw}MHz: nsamples={samples.nsamples}, nsub={samples.nsubcarriers}, bandwidth={samples.bandwidth}")
@@ -0,0 +1,156 @@
+import os
+import numpy as np
+
+from . import interleaved
+
+class PcapTimeline:
+    """
+    デバイスの連続したPCAPファイル（タイムスタンプ名）を1つの時系列として扱うクラス
+
+    各ファイルのサイドカーインデックスからレコード数・受信時刻のみを読み取り，通しの行番号をファイルごとの行番号に
+    対応付ける（仮想連結）．CSIは読み取る範囲を含むファイルのみからメモリマップで取り出し，受信時間は先頭ファイルの
+    先頭レコードからの相対時間とする．受信時刻の間隔がmax_gap [s] を超える箇所（ファイル内・ファイル間）を途切れとして検出し，
+    途切れのない区間（セグメント）に分割する．
+    """
+
+    def __init__(self, pcap_dir: str, ext: str = '.pcap', max_gap: float = 1.0, bandwidth: int = 0, macs: list = None,
+                 fctls: list = None, rssi_min: int = None, precision: str = 'complex128'):
+        """コンストラクタ"""
+        self.pcap_dir = pcap_dir                       # デバイスのPCAPディレクトリ
+        self.ext      = ext                            # 拡張子
+        self.max_gap  = max_gap                        # 途切れとみなす受信時刻の間隔 [s]
+        self.options  = {"bandwidth": bandwidth, "macs": macs, "fctls": fctls, "rssi_min": rssi_min, "precision": precision}
+        self.files    = []                             # ファイル名（時刻順）
+        self.offsets  = np.zeros(1, dtype=np.int64)    # ファイルごとの先頭の通しの行番号（末尾は総レコード数）
+        self.origin   = 0                              # 相対時間の基準 [us]
+        self.gaps     = []                             # 途切れ（{"row", "file", "start_us", "end_us", "duration"}）
+        self.segments = []                             # 途切れのない区間（{"start", "stop", "file", "start_us", "end_us"}）
+        self._stats   = {}                             # ファイル名 -> ((サイズ, 更新時刻), ファイルの情報)
+        self.refresh()
+
+    def __len__(self) -> int:
+        """総レコード数"""
+        return int(self.offsets[-1])
+
+    def _inspect(self, path: str) -> dict:
+        """ファイルのサイドカーインデックスからレコード数・受信時刻の範囲・ファイル内の途切れを取得"""
+        index = interleaved.read_pcap_index(path)
+        times = index['timestamps']
+        if len(times) == 0:
+            return {"nrecords": 0, "bandwidth": index['bandwidth']}
+        rows = np.flatnonzero(np.abs(np.diff(times)) > int(self.max_gap * 1e6)) + 1
+        return {
+            "nrecords":  len(times),
+            "bandwidth": index['bandwidth'],
+            "first":     int(times[0]),                 # 先頭レコードの受信時刻 [us]
+            "last":      int(times[-1]),                # 末尾レコードの受信時刻 [us]
+            "min":       int(times.min()),
+            "max":       int(times.max()),
+            "gaps":      [(int(row), int(times[row-1]), int(times[row])) for row in rows],
+        }
+
+    def refresh(self) -> "PcapTimeline":
+        """ファイルの一覧を更新し，追加・更新されたファイルのみインデックスを読み直して連結し直す"""
+        names = sorted(name for name in os.listdir(self.pcap_dir) if name.endswith(self.ext)) if os.path.isdir(self.pcap_dir) else []
+        stats = {}
+        for name in names:
+            stat = os.stat(os.path.join(self.pcap_dir, name))
+            key  = (stat.st_size, stat.st_mtime_ns)
+            if name in self._stats and self._stats[name][0] == key:
+                stats[name] = self._stats[name]
+            else:
+                stats[name] = (key, self._inspect(os.path.join(self.pcap_dir, name)))
+        self._stats = stats
+        self.files  = [name for name in names if stats[name][1]["nrecords"] > 0]
+        infos       = [stats[name][1] for name in self.files]
+
+        # 帯域幅が異なるとサブキャリア数が揃わないため連結できない
+        bandwidths = {info["bandwidth"] for info in infos}
+        if len(bandwidths) > 1 and self.options["bandwidth"] == 0:
+            raise ValueError(f"帯域幅の異なるファイルは連結できません: {sorted(bandwidths)}")
+
+        self.offsets = np.concatenate([[0], np.cumsum([info["nrecords"] for info in infos])]).astype(np.int64)
+        self.origin  = infos[0]["first"] if infos else 0
+
+        # ファイル内の途切れと，前のファイルの末尾から次のファイルの先頭までの途切れ
+        self.gaps = []
+        for i, (name, info) in enumerate(zip(self.files, infos)):
+            if i > 0 and abs(info["first"] - infos[i-1]["last"]) > int(self.max_gap * 1e6):
+                self.gaps.append(self._gap(int(self.offsets[i]), name, infos[i-1]["last"], info["first"]))
+            self.gaps += [self._gap(int(self.offsets[i]) + row, name, start_us, end_us) for row, start_us, end_us in info["gaps"]]
+
+        # 途切れで区切ったセグメント
+        self.segments = []
+        bounds = [0] + [gap["row"] for gap in self.gaps] + [len(self)]
+        starts = [infos[0]["first"] if infos else 0] + [gap["end_us"] for gap in self.gaps]
+        ends   = [gap["start_us"] for gap in self.gaps] + [infos[-1]["last"] if infos else 0]
+        for start, stop, start_us, end_us in zip(bounds[:-1], bounds[1:], starts, ends):
+            if stop > start:
+                file = self.files[int(np.searchsorted(self.offsets, start, side='right')) - 1]
+                self.segments.append({"start": start, "stop": stop, "file": file, "start_us": start_us, "end_us": end_us})
+        return self
+
+    @staticmethod
+    def _gap(row: int, file: str, start_us: int, end_us: int) -> dict:
+        """途切れの情報"""
+        return {"row": row, "file": file, "start_us": start_us, "end_us": end_us, "duration": (end_us - start_us) / 1e6}
+
+    def read(self, start: int, stop: int):
+        """通しの行番号 [start, stop) のレコードを，ファイルをまたいで1つのSampleSetとして読み取る"""
+        if not self.files:
+            raise ValueError(f"PCAPファイルがありません: {self.pcap_dir}")
+        start, stop = max(int(start), 0), min(int(stop), len(self))
+        first = max(int(np.searchsorted(self.offsets, start, side='right')) - 1, 0)
+        parts = []
+        for i in range(first, len(self.files)):
+            if self.offsets[i] >= stop:
+                break
+            path = os.path.join(self.pcap_dir, self.files[i])
+            parts.append(interleaved.read_pcap_slice(path, max(start - self.offsets[i], 0), min(stop, self.offsets[i+1]) - self.offsets[i], **self.options))
+        if not parts:
+            parts = [interleaved.read_pcap_slice(os.path.join(self.pcap_dir, self.files[first]), 0, 0, **self.options)]
+        return interleaved.SampleSet.concat(parts, time_origin=self.origin)
+
+    def read_range(self, t0: float, t1: float, absolute: bool = False):
+        """
+        受信時刻が [t0, t1] のレコードを，ファイルをまたいで1つのSampleSetとして読み取る
+
+        t0, t1 は先頭ファイルの先頭レコードからの相対時間 [s]（absolute=True の場合はエポック秒）
+        """
+        if not self.files:
+            raise ValueError(f"PCAPファイルがありません: {self.pcap_dir}")
+        base  = 0 if absolute else self.origin
+        t0_us = base + int(round(t0 * 1e6))
+        t1_us = base + int(round(t1 * 1e6))
+        parts = []
+        for name in self.files:
+            info = self._stats[name][1]
+            if info["max"] >= t0_us and info["min"] <= t1_us:
+                parts.append(interleaved.read_pcap_range(os.path.join(self.pcap_dir, name), t0_us / 1e6, t1_us / 1e6, absolute=True, **self.options))
+        if not parts:
+            parts = [interleaved.read_pcap_slice(os.path.join(self.pcap_dir, self.files[0]), 0, 0, **self.options)]
+        return interleaved.SampleSet.concat(parts, time_origin=self.origin)
+
+    def iter_chunks(self, chunk_records: int = 4096, segment: int = None):
+        """
+        chunk_records件ずつのSampleSetを順に返すジェネレータ（ファイルの境界では区切らず，途切れでは区切る）
+
+        segmentを指定した場合はそのセグメントのみを読み取る．
+        """
+        segments = self.segments if segment is None else [self.segments[segment]]
+        for seg in segments:
+            for start in range(seg["start"], seg["stop"], chunk_records):
+                yield self.read(start, min(start + chunk_records, seg["stop"]))
+
+# 使用例
+if __name__ == "__main__":
+    import tempfile
+    from .pcap_generator import generate_capture_set
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 1デバイス・4ファイルの連続したキャプチャを作成し，3つ目のファイルを削除して途切れを作る
+        captures = generate_capture_set(tmp_dir, ndevices=1, nfiles=4, nframes=500, bandwidth=20)
+        os.remove(captures["minelab-iot-nexmon-1"][2])
+        timeline = PcapTimeline(os.path.dirname(captures["minelab-iot-nexmon-1"][0]), max_gap=0.5)
+        print(len(timeline), timeline.gaps, [(seg["start"], seg["stop"]) for seg in timeline.segments])
+        samples = timeline.read(400, 600)
+        print(samples.nsamples, samples.timestamps[[0, -1]])
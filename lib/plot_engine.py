@@ -0,0 +1,188 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .correlation import CorrelationAccumulator, draw_correlation
+
+# 図の種類ごとの大きさ（インチ）
+FIGSIZES = {
+    "spectrogram": (10, 4),
+    "lineplot":    (10, 4),
+    "timestd":     (10, 5),
+    "heatmap":     (8, 8),
+}
+
+# ワーカープロセスごとに使い回す図（図の種類 -> Figure）
+_figures = {}
+
+def _init_worker() -> None:
+    """ワーカープロセスの初期化（画面を使わないAggバックエンドを使用）"""
+    import matplotlib
+    matplotlib.use("Agg")
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int) -> tuple:
+    """
+    折れ線をmax_points点程度に間引く（区間ごとの最小値・最大値の点を残すため，ピークは失われない）
+    """
+    if max_points is None or len(y) <= max_points:
+        return x, y
+    width  = int(np.ceil(len(y) / max(max_points // 2, 1)))
+    nbins  = int(np.ceil(len(y) / width))
+    padded = np.full(nbins * width, np.nan)
+    padded[:len(y)] = y
+    blocks = padded.reshape(nbins, width)
+    offset = np.arange(nbins) * width
+    lows   = offset + np.argmin(np.where(np.isnan(blocks), np.inf, blocks), axis=1)
+    highs  = offset + np.argmax(np.where(np.isnan(blocks), -np.inf, blocks), axis=1)
+    index  = np.unique(np.concatenate([lows, highs]))
+    index  = index[index < len(y)]
+    return x[index], y[index]
+
+def downsample_columns(values: np.ndarray, max_columns: int) -> np.ndarray:
+    """2次元配列の列（時間方向）を区間平均でmax_columns列以下に縮約"""
+    if max_columns is None or values.shape[1] <= max_columns:
+        return values
+    edges = np.linspace(0, values.shape[1], max_columns + 1).astype(int)
+    return np.add.reduceat(values, edges[:-1], axis=1) / np.diff(edges)
+
+def _plot_spectrogram(figure, ax, job: dict) -> None:
+    """スペクトログラム（行：時刻，列：周波数のCSV）をimshowで描画"""
+    df     = pd.read_csv(job["sources"][0], index_col=0)
+    times  = df.index.to_numpy(dtype=np.float64)
+    freqs  = df.columns.to_numpy(dtype=np.float64)
+    values = downsample_columns(df.to_numpy(dtype=np.float64).T, job.get("max_columns", 2000))
+    ax.imshow(values, aspect="auto", origin="lower", cmap="jet", extent=[times[0], times[-1], freqs[0], freqs[-1]])
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Frequency [Hz]")
+
+def _plot_lineplot(figure, ax, job: dict) -> None:
+    """CSVの各列（最大max_lines列）を間引いた折れ線で描画"""
+    df = pd.read_csv(job["sources"][0], index_col=0)
+    df = df.drop(columns=[col for col in ["Time"] if col in df.columns])
+    x  = df.index.to_numpy(dtype=np.float64)
+    for column in df.columns[:job.get("max_lines", 8)]:
+        ax.plot(*downsample(x, df[column].to_numpy(dtype=np.float64), job.get("max_points", 5000)), linewidth=0.5, label=column)
+    ax.set_xlabel("Time")
+    ax.legend(fontsize=6, loc="upper right")
+
+def _plot_timestd(figure, ax, job: dict) -> None:
+    """デバイス間の受信時刻の標準偏差を，グループ（時刻補正前・後など）ごとに折れ線で描画"""
+    groups = np.array_split(np.array(job["sources"]), len(job["labels"]))
+    for label, paths in zip(job["labels"], groups):
+        # 受信時刻の列のみを読み込む
+        times = pd.concat([pd.read_csv(path, usecols=["Time"])["Time"].rename(i) for i, path in enumerate(paths)], axis=1)
+        std   = times.std(axis=1).to_numpy(dtype=np.float64)
+        ax.plot(*downsample(np.arange(len(std), dtype=np.float64), std, job.get("max_points", 5000)), label=label)
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Standard Deviation")
+    ax.legend()
+
+def _plot_heatmap(figure, ax, job: dict) -> None:
+    """保存済みの相関の累積値からヒートマップを描画"""
+    accumulator = CorrelationAccumulator.load(job["sources"][0])
+    draw_correlation(figure, ax, accumulator.correlation(), accumulator.columns, max_ticks=job.get("max_ticks", 32))
+
+PLOTTERS = {
+    "spectrogram": _plot_spectrogram,
+    "lineplot":    _plot_lineplot,
+    "timestd":     _plot_timestd,
+    "heatmap":     _plot_heatmap,
+}
+
+def _render(job: dict) -> str:
+    """ワーカープロセス：図の種類ごとのFigureを使い回して1枚を描画・保存"""
+    import matplotlib.pyplot as plt
+    kind = job["kind"]
+    if kind not in _figures:
+        _figures[kind] = plt.figure(figsize=FIGSIZES[kind])
+    figure = _figures[kind]
+    figure.clear()
+    ax = figure.add_subplot()
+    PLOTTERS[kind](figure, ax, job)
+    ax.set_title(job.get("title", ""))
+    os.makedirs(os.path.dirname(os.path.abspath(job["save_path"])), exist_ok=True)
+    figure.savefig(job["save_path"], dpi=job.get("dpi", 100), bbox_inches="tight")
+    return job["save_path"]
+
+class PlotEngine:
+    """
+    図の作成ジョブ（dict）をプロセスプールで並列に描画するクラス
+
+    ジョブは {"kind": 図の種類, "sources": 元データのパスのリスト, "save_path": 保存先, "title": タイトル, ...}．
+    元データの更新時刻・サイズとジョブの内容をマニフェストに記録し，変化がない図は描画しない．
+    """
+
+    def __init__(self, manifest_path: str, max_workers: int = None):
+        """コンストラクタ"""
+        self.manifest_path = manifest_path # マニフェスト（保存先 -> 元データの状態・ジョブの内容）
+        self.max_workers   = max_workers   # 並列数
+        self.manifest      = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                self.manifest = json.load(f)
+
+    @staticmethod
+    def _signature(job: dict) -> dict:
+        """ジョブの内容と元データの更新時刻・サイズ"""
+        stats = [os.stat(path) for path in job["sources"]]
+        return {
+            "job":     {key: value for key, value in job.items() if key != "save_path"},
+            "sources": [[stat.st_mtime_ns, stat.st_size] for stat in stats],
+        }
+
+    def run(self, jobs: list) -> dict:
+        """
+        元データ・ジョブの内容が変化した図のみを描画
+
+        描画に失敗したジョブはマニフェストに記録せず（次回も描画対象），成功したジョブのみを記録する．
+
+        return
+        ------
+        dict
+            {"plotted": 描画した枚数, "skipped": スキップした枚数, "failed": [{"save_path": 保存先, "error": エラー内容}, ...]}
+        """
+        signatures, failed = {}, []
+        for job in jobs:
+            try:
+                signatures[job["save_path"]] = self._signature(job)
+            except OSError as e:
+                # 元データがないジョブは描画できない
+                failed.append({"save_path": job["save_path"], "error": repr(e)})
+        targets = [job for job in jobs if job["save_path"] in signatures and
+                   (not os.path.exists(job["save_path"]) or self.manifest.get(job["save_path"]) != signatures[job["save_path"]])]
+        plotted = 0
+        if targets:
+            # 同じ種類の図が同じワーカーで続けて描画されるように並べる
+            targets.sort(key=lambda job: job["kind"])
+            workers = self.max_workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                futures = {executor.submit(_render, job): job["save_path"] for job in targets}
+                for future in as_completed(futures):
+                    save_path = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # 1枚の失敗で他の図・マニフェストの保存を止めない
+                        self.manifest.pop(save_path, None)
+                        failed.append({"save_path": save_path, "error": repr(e)})
+                        continue
+                    self.manifest[save_path] = signatures[save_path]
+                    plotted += 1
+            os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+            with open(f"{self.manifest_path}.tmp", "w") as f:
+                json.dump(self.manifest, f)
+            os.replace(f"{self.manifest_path}.tmp", self.manifest_path)
+        return {"plotted": plotted, "skipped": len(signatures) - len(targets), "failed": failed}
+
+# 使用例
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # ダミーのスペクトログラムCSVを作成
+        for i in range(4):
+            pd.DataFrame(np.random.rand(5000, 65), index=np.arange(5000) * 0.5, columns=np.linspace(0, 0.5, 65)).to_csv(f"{tmp_dir}/{i}.csv")
+        jobs   = [{"kind": "spectrogram", "sources": [f"{tmp_dir}/{i}.csv"], "save_path": f"{tmp_dir}/plot/{i}.png", "title": f"Spectrogram {i}"} for i in range(4)]
+        engine = PlotEngine(f"{tmp_dir}/plot/manifest.json", max_workers=2)
+        print(engine.run(jobs), engine.run(jobs))
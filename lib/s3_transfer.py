@@ -0,0 +1,259 @@
+import os
+import time
+import hashlib
+import asyncio
+import threading
+from datetime import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+# タイムスタンプのフォーマット
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H-%M-%S"
+
+class LocalS3Client:
+    """
+    ローカルディレクトリをS3バケットとして扱うスタブクライアント（オフライン検証用）
+
+    {root_dir}/{バケット名}/{キー} にオブジェクトを保存し，boto3のS3クライアントのうち
+    list_objects_v2・download_file・upload_file・head_object と同じ引数・戻り値を提供する
+    （ETagはマルチパートの有無によらず単純なMD5）
+    """
+
+    def __init__(self, root_dir: str, page_size: int = 1000, chunk_size: int = 256 * 1024):
+        """コンストラクタ"""
+        self.root_dir   = root_dir   # バケットを置くディレクトリ
+        self.page_size  = page_size  # 1回のlist_objects_v2で返すオブジェクト数
+        self.chunk_size = chunk_size # コールバックを呼ぶ単位 [byte]
+
+    def _object_path(self, bucket: str, key: str) -> str:
+        """オブジェクトのローカルパス"""
+        return os.path.join(self.root_dir, bucket, key)
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", ContinuationToken: str = None, **kwargs) -> dict:
+        """プレフィックス内のオブジェクト一覧をキー順・ページ単位で返す"""
+        bucket_dir = os.path.join(self.root_dir, Bucket)
+        keys = []
+        for dirpath, _, filenames in os.walk(bucket_dir):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(dirpath, filename), bucket_dir).replace(os.sep, "/")
+                if key.startswith(Prefix) and not filename.endswith(".part"):
+                    keys.append(key)
+        keys.sort()
+        start    = int(ContinuationToken) if ContinuationToken else 0
+        page     = keys[start:start + kwargs.get("MaxKeys", self.page_size)]
+        response = {"IsTruncated": start + len(page) < len(keys), "KeyCount": len(page)}
+        if page:
+            response["Contents"] = [self.head_object(Bucket=Bucket, Key=key) | {"Key": key} for key in page]
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + len(page))
+        return response
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        """オブジェクトのサイズ・更新時刻・ETag（MD5）を返す"""
+        path = self._object_path(Bucket, Key)
+        stat = os.stat(path)
+        md5  = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                md5.update(chunk)
+        return {"Size": stat.st_size, "ContentLength": stat.st_size, "LastModified": dt.fromtimestamp(stat.st_mtime),
+                "ETag": f'"{md5.hexdigest()}"'}
+
+    def _copy(self, src: str, dst: str, callback) -> None:
+        """chunk_size単位でコピーし，転送したバイト数をコールバックに渡す"""
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            for chunk in iter(lambda: fin.read(self.chunk_size), b""):
+                fout.write(chunk)
+                if callback is not None:
+                    callback(len(chunk))
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, Callback=None, **kwargs) -> None:
+        """オブジェクトをローカルファイルにダウンロード"""
+        self._copy(self._object_path(Bucket, Key), Filename, Callback)
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, Callback=None, **kwargs) -> None:
+        """ローカルファイルをオブジェクトとしてアップロード"""
+        dst = self._object_path(Bucket, Key)
+        self._copy(Filename, f"{dst}.part", Callback)
+        os.replace(f"{dst}.part", dst)
+
+class BandwidthLimiter:
+    """複数スレッドで共有する転送帯域の上限（トークンバケット）"""
+
+    def __init__(self, max_bandwidth: float):
+        """コンストラクタ（max_bandwidth: 全転送の合計の上限 [byte/s]）"""
+        self.rate   = float(max_bandwidth)
+        self.tokens = self.rate
+        self.last   = time.monotonic()
+        self.lock   = threading.Lock()
+
+    def consume(self, nbytes: int) -> None:
+        """nbytesを転送した分だけトークンを消費し，不足していれば待機する"""
+        with self.lock:
+            now         = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate) - nbytes
+            self.last   = now
+            wait        = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+class TransferProgress:
+    """転送の進捗（ファイル数・バイト数）をスレッドセーフに集計するクラス"""
+
+    def __init__(self, callback=None):
+        """コンストラクタ（callback: 進捗が更新されるたびに (TransferProgress, 増分バイト数) で呼ばれる関数）"""
+        self.total_files = 0
+        self.total_bytes = 0
+        self.done_files  = 0
+        self.done_bytes  = 0
+        self.skipped     = 0
+        self.failed      = 0
+        self.callback    = callback
+        self.lock        = threading.Lock()
+
+    def add_total(self, nfiles: int, nbytes: int) -> None:
+        """転送予定のファイル数・バイト数を追加"""
+        with self.lock:
+            self.total_files += nfiles
+            self.total_bytes += nbytes
+
+    def update(self, nbytes: int = 0, done: int = 0, skipped: int = 0, failed: int = 0) -> None:
+        """転送済みのバイト数・ファイル数を加算"""
+        with self.lock:
+            self.done_bytes += nbytes
+            self.done_files += done
+            self.skipped    += skipped
+            self.failed     += failed
+        if self.callback is not None:
+            self.callback(self, nbytes)
+
+    def snapshot(self) -> dict:
+        """現在の進捗を返す"""
+        with self.lock:
+            return {
+                "total_files": self.total_files, "total_bytes": self.total_bytes,
+                "done_files":  self.done_files,  "done_bytes":  self.done_bytes,
+                "skipped":     self.skipped,     "failed":      self.failed
+            }
+
+class S3TransferEngine:
+    """
+    複数プレフィックスのS3オブジェクトをasyncioで並行に一覧取得・ダウンロードするクラス
+
+    boto3のクライアントはブロッキングのため，専用のスレッドプールに処理を渡し，
+    全体の同時転送数をセマフォで，合計の転送帯域をBandwidthLimiterで制限する．
+    """
+
+    def __init__(self, s3_client, bucket_name: str, max_concurrency: int = 16, max_bandwidth: float = None,
+                 progress_callback=None):
+        """コンストラクタ"""
+        self.s3_client       = s3_client                                                     # boto3のS3クライアント（またはLocalS3Client）
+        self.bucket_name     = bucket_name                                                   # バケット名
+        self.max_concurrency = max_concurrency                                               # 同時転送数の上限
+        self.limiter         = BandwidthLimiter(max_bandwidth) if max_bandwidth else None    # 転送帯域の上限 [byte/s]
+        self.progress        = TransferProgress(callback=progress_callback)                  # 進捗
+
+    def _list_objects(self, prefix: str) -> list:
+        """指定したS3プレフィックス内のすべてのオブジェクトをページネーションで取得"""
+        objects, kwargs = [], {"Bucket": self.bucket_name, "Prefix": prefix}
+        while True:
+            response = self.s3_client.list_objects_v2(**kwargs)
+            objects.extend(response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                return objects
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def _download(self, key: str, local_file: str) -> None:
+        """1オブジェクトを一時ファイルにダウンロードしてから置き換える"""
+        def callback(nbytes):
+            if self.limiter is not None:
+                self.limiter.consume(nbytes)
+            self.progress.update(nbytes=nbytes)
+        tmp_file = f"{local_file}.part"
+        self.s3_client.download_file(self.bucket_name, key, tmp_file, Callback=callback)
+        os.replace(tmp_file, local_file)
+
+    @staticmethod
+    def _in_time_range(key: str, start_time: str, end_time: str) -> bool:
+        """ファイル名のタイムスタンプが [start_time, end_time] に含まれるか判定"""
+        if start_time is None and end_time is None:
+            return True
+        try:
+            timestamp = dt.strptime(os.path.basename(key).split(".")[0], TIMESTAMP_FORMAT)
+        except ValueError:
+            return False
+        return (start_time is None or dt.strptime(start_time, TIMESTAMP_FORMAT) <= timestamp) and \
+               (end_time   is None or timestamp <= dt.strptime(end_time, TIMESTAMP_FORMAT))
+
+    async def download_prefixes(self, jobs: list, start_time: str = None, end_time: str = None) -> list:
+        """
+        複数のS3プレフィックスを並行に一覧取得し，時間範囲内のオブジェクトをダウンロード
+
+        params
+        ------
+        jobs: list
+            (S3のプレフィックス, ローカルディレクトリ) のリスト
+        start_time: str
+            開始時間（「YYYY-MM-DDThh-mm-ss」形式，Noneの場合は制限なし）
+        end_time: str
+            終了時間（「YYYY-MM-DDThh-mm-ss」形式，Noneの場合は制限なし）
+
+        return
+        ------
+        list
+            ダウンロードしたローカルファイルパスのリスト（同じサイズのファイルが既にある場合はスキップ）
+        """
+        loop      = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # 全プレフィックスの一覧を並行に取得
+            listings = await asyncio.gather(*[loop.run_in_executor(executor, self._list_objects, prefix) for prefix, _ in jobs])
+
+            # 時間範囲内で，ローカルに同じサイズのファイルがないオブジェクトを転送対象とする
+            targets = []
+            for (_, local_dir), objects in zip(jobs, listings):
+                os.makedirs(local_dir, exist_ok=True)
+                for obj in objects:
+                    if not self._in_time_range(obj["Key"], start_time, end_time):
+                        continue
+                    local_file = os.path.join(local_dir, os.path.basename(obj["Key"]))
+                    if os.path.exists(local_file) and os.path.getsize(local_file) == obj["Size"]:
+                        self.progress.update(skipped=1)
+                        continue
+                    targets.append((obj["Key"], local_file))
+                    self.progress.add_total(1, obj["Size"])
+
+            async def download(key, local_file):
+                async with semaphore:
+                    try:
+                        await loop.run_in_executor(executor, self._download, key, local_file)
+                    except Exception:
+                        self.progress.update(failed=1)
+                        raise
+                    self.progress.update(done=1)
+                    return local_file
+
+            return await asyncio.gather(*[download(key, local_file) for key, local_file in targets])
+
+    def download(self, jobs: list, start_time: str = None, end_time: str = None) -> list:
+        """download_prefixesを同期的に実行"""
+        return asyncio.run(self.download_prefixes(jobs, start_time=start_time, end_time=end_time))
+
+# 使用例
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # スタブのバケットにダミーのオブジェクトを作成
+        for device in ["minelab-iot-camera-1", "minelab-iot-camera-2"]:
+            os.makedirs(f"{tmp_dir}/s3/minelab-iot-storage/projects/csi/image-data/{device}")
+            for hour in range(3):
+                with open(f"{tmp_dir}/s3/minelab-iot-storage/projects/csi/image-data/{device}/2025-03-13T0{hour}-00-00.jpg", "wb") as f:
+                    f.write(os.urandom(512 * 1024))
+        engine = S3TransferEngine(LocalS3Client(f"{tmp_dir}/s3"), "minelab-iot-storage", max_concurrency=4, max_bandwidth=4 * 1024 * 1024)
+        start  = time.perf_counter()
+        files  = engine.download(
+            jobs       = [(f"projects/csi/image-data/{device}/", f"{tmp_dir}/local/{device}/") for device in ["minelab-iot-camera-1", "minelab-iot-camera-2"]],
+            start_time = "2025-03-13T00-00-00",
+            end_time   = "2025-03-13T01-00-00"
+        )
+        print(f"{len(files)} files, {time.perf_counter() - start:.2f} s", engine.progress.snapshot())
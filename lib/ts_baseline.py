@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import heapq
+import hashlib
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from sklearn.metrics import accuracy_score, adjusted_rand_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.neighbors import KNeighborsClassifier
+from tslearn.clustering import TimeSeriesKMeans
+from tslearn.metrics import cdist_dtw, cdist_soft_dtw_normalized, dtw
+from tslearn.preprocessing import TimeSeriesScalerMeanVariance
+
+def to_series(X: np.ndarray, sz: int = 64) -> np.ndarray:
+    """
+    CSIの窓 (窓数, デバイス数, 窓長, サブキャリア数) をtslearnの時系列 (窓数, sz, デバイス数) に変換
+
+    サブキャリア方向に平均したデバイスごとの時系列を区間平均（PAA）でsz点に縮約し，系列ごとに標準化する．
+    """
+    X      = np.nan_to_num(np.asarray(X, dtype=np.float64)).mean(axis=3).transpose(0, 2, 1) # (窓数, 窓長, デバイス数)
+    sz     = min(sz, X.shape[1])
+    length = X.shape[1] - X.shape[1] % sz
+    series = X[:, :length].reshape(len(X), sz, length // sz, X.shape[2]).mean(axis=2)
+    return TimeSeriesScalerMeanVariance().fit_transform(series)
+
+def dataset_to_series(dataset, sz: int = 64, batch_size: int = 256) -> tuple:
+    """CSIWindowDatasetの全ての窓をバッチ単位で時系列に変換し，(時系列, ラベル) を返す"""
+    series, labels = [], []
+    for X, y in dataset.iter_batches(batch_size=batch_size, shuffle=False):
+        series.append(to_series(X, sz=sz))
+        if y is not None:
+            labels.append(y)
+    series = np.concatenate(series) if series else np.empty((0, sz, len(dataset.devices)))
+    return series, (np.concatenate(labels) if labels else None)
+
+class DistanceCache:
+    """
+    時系列間の距離行列を計算し，{cache_dir}/{ハッシュ値}.npy に保存するクラス
+
+    ハッシュ値は時系列の内容・距離の種類・パラメータから計算するため，
+    同じデータで複数のモデルを比較する場合や再実行時は距離行列を再計算しない．
+    """
+
+    def __init__(self, cache_dir: str):
+        """コンストラクタ"""
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def _key(X: np.ndarray, Y: np.ndarray, metric: str, params: dict) -> str:
+        """キャッシュのキー（時系列・距離の種類・パラメータのハッシュ値）"""
+        sha1 = hashlib.sha1(json.dumps({"metric": metric, "params": params}, sort_keys=True).encode())
+        for array in (X, Y):
+            if array is not None:
+                sha1.update(str(array.shape).encode())
+                sha1.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        return sha1.hexdigest()
+
+    def cdist(self, X: np.ndarray, Y: np.ndarray = None, metric: str = "dtw", n_jobs: int = None, **params) -> np.ndarray:
+        """
+        距離行列を返す（保存済みの場合は読み込む）
+
+        params
+        ------
+        X, Y: np.ndarray
+            時系列 (系列数, 系列長, 次元数)（Yを省略した場合はX同士）
+        metric: str
+            "dtw"（params: global_constraint, sakoe_chiba_radius）または "softdtw"（params: gamma）
+        n_jobs: int
+            DTWの並列数
+        """
+        path = os.path.join(self.cache_dir, f"{self._key(X, Y, metric, params)}.npy")
+        if os.path.exists(path):
+            return np.load(path)
+        if metric == "dtw":
+            matrix = cdist_dtw(X, Y, n_jobs=n_jobs, **params)
+        elif metric == "softdtw":
+            # 正規化したsoft-DTWは数値誤差で僅かに負になるため0で打ち切る
+            matrix = np.maximum(cdist_soft_dtw_normalized(X, Y, **params), 0.0)
+        else:
+            raise ValueError(f"対応していない距離です: {metric}")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        np.save(f"{path}.tmp.npy", matrix)
+        os.replace(f"{path}.tmp.npy", path)
+        return matrix
+
+class LBKeoghKNeighbors:
+    """
+    LB_Keoghによる枝刈り付きのDTW k近傍分類器
+
+    クエリの包絡線（Sakoe-Chibaの窓幅）から全ての学習系列の下界をまとめて計算し，
+    下界の小さい順にDTWを計算して，下界がk番目の距離以上になった時点で打ち切る．
+    """
+
+    def __init__(self, n_neighbors: int = 1, radius: int = 8, n_jobs: int = 1):
+        """コンストラクタ"""
+        self.n_neighbors = n_neighbors # 近傍数
+        self.radius      = radius      # Sakoe-Chibaの窓幅
+        self.n_jobs      = n_jobs      # クエリの並列数
+        self.pruned_     = 0.0         # 直近の予測で枝刈りしたDTW計算の割合
+
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        """学習系列を保持"""
+        self.X_, self.y_ = np.asarray(X, dtype=np.float64), np.asarray(y)
+        return self
+
+    def lb_keogh(self, query: np.ndarray) -> np.ndarray:
+        """クエリと全ての学習系列のLB_Keogh（多次元の場合は次元ごとの逸脱の二乗和の平方根）"""
+        size  = 2 * self.radius + 1
+        upper = maximum_filter1d(query, size=size, axis=0, mode="nearest")
+        lower = minimum_filter1d(query, size=size, axis=0, mode="nearest")
+        excess = np.square(np.maximum(self.X_ - upper, 0.0)) + np.square(np.maximum(lower - self.X_, 0.0))
+        return np.sqrt(excess.sum(axis=(1, 2)))
+
+    def _query(self, query: np.ndarray) -> tuple:
+        """1つのクエリの近傍（インデックス, 距離）とDTWを計算した回数を返す"""
+        bounds = self.lb_keogh(query)
+        best   = [] # (-距離, インデックス) の最大ヒープ
+        ncalc  = 0
+        for i in np.argsort(bounds, kind="stable"):
+            if len(best) == self.n_neighbors and bounds[i] >= -best[0][0]:
+                break
+            dist   = dtw(query, self.X_[i], global_constraint="sakoe_chiba", sakoe_chiba_radius=self.radius)
+            ncalc += 1
+            if len(best) < self.n_neighbors:
+                heapq.heappush(best, (-dist, i))
+            elif dist < -best[0][0]:
+                heapq.heapreplace(best, (-dist, i))
+        best = sorted((-d, i) for d, i in best)
+        return np.array([i for _, i in best]), np.array([d for d, _ in best]), ncalc
+
+    def _query_batch(self, X: np.ndarray) -> list:
+        """複数のクエリの近傍を返す（並列処理の単位）"""
+        return [self._query(query) for query in X]
+
+    def kneighbors(self, X: np.ndarray) -> tuple:
+        """各クエリの近傍のインデックスと距離を返す"""
+        X       = np.asarray(X, dtype=np.float64)
+        batches = np.array_split(np.arange(len(X)), max(min(self.n_jobs, len(X)), 1))
+        results = Parallel(n_jobs=self.n_jobs)(delayed(self._query_batch)(X[batch]) for batch in batches)
+        results = [result for batch in results for result in batch]
+        self.pruned_ = 1.0 - sum(ncalc for _, _, ncalc in results) / max(len(X) * len(self.X_), 1)
+        return np.array([ind for ind, _, _ in results]), np.array([dist for _, dist, _ in results])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """近傍の多数決でラベルを予測（同数の場合はより近い近傍のラベル）"""
+        indices, _ = self.kneighbors(X)
+        predictions = []
+        for neighbors in self.y_[indices]:
+            labels, first, counts = np.unique(neighbors, return_index=True, return_counts=True)
+            predictions.append(labels[np.lexsort((first, -counts))[0]])
+        return np.array(predictions)
+
+def evaluate_baselines(X: np.ndarray, y: np.ndarray, cache: DistanceCache, n_splits: int = 5, radius: int = 8,
+                       gamma: float = 1.0, n_neighbors: int = 1, n_jobs: int = 1, seed: int = 0) -> list:
+    """
+    tslearnのベースラインを層化k分割交差検証で比較
+
+    - knn-dtw      : 事前計算したDTW距離行列によるk近傍
+    - knn-softdtw  : 事前計算した正規化soft-DTW距離行列によるk近傍
+    - knn-dtw-lb   : LB_Keoghで枝刈りしたDTW k近傍（未知データへの予測と同じ計算）
+    - kmeans-dtw   : DTW k-means（クラス数のクラスタ，テストデータのARIで評価）
+    距離行列は全系列で1度だけ計算してキャッシュし，(モデル, 分割) の組をプロセスで並列に評価する．
+
+    return
+    ------
+    list
+        (モデル, 分割) ごとの {"model", "fold", "metric", "score", "time", "pruned"} のリスト
+    """
+    constraint = {"global_constraint": "sakoe_chiba", "sakoe_chiba_radius": radius}
+    distances  = {
+        "knn-dtw":     cache.cdist(X, metric="dtw", n_jobs=n_jobs, **constraint),
+        "knn-softdtw": cache.cdist(X, metric="softdtw", gamma=gamma),
+    }
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed).split(X, y))
+
+    def evaluate(name, fold, train, test):
+        start  = time.perf_counter()
+        pruned = None
+        if name in distances:
+            model  = KNeighborsClassifier(n_neighbors=n_neighbors, metric="precomputed")
+            score  = accuracy_score(y[test], model.fit(distances[name][np.ix_(train, train)], y[train]).predict(distances[name][np.ix_(test, train)]))
+        elif name == "knn-dtw-lb":
+            model  = LBKeoghKNeighbors(n_neighbors=n_neighbors, radius=radius).fit(X[train], y[train])
+            score  = accuracy_score(y[test], model.predict(X[test]))
+            pruned = model.pruned_
+        else:
+            model  = TimeSeriesKMeans(n_clusters=len(np.unique(y)), metric="dtw", metric_params=constraint, random_state=seed)
+            score  = adjusted_rand_score(y[test], model.fit(X[train]).predict(X[test]))
+        metric = "ari" if name == "kmeans-dtw" else "accuracy"
+        return {"model": name, "fold": fold, "metric": metric, "score": score, "time": time.perf_counter() - start, "pruned": pruned}
+
+    names = list(distances) + ["knn-dtw-lb", "kmeans-dtw"]
+    return Parallel(n_jobs=n_jobs)(
+        delayed(evaluate)(name, fold, train, test) for name in names for fold, (train, test) in enumerate(folds)
+    )
+
+# 使用例
+if __name__ == "__main__":
+    import tempfile
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    # 2クラスのダミーの窓（クラス1は周期的な変動を含む）
+    X = rng.normal(size=(60, 3, 256, 52)).astype(np.float32)
+    y = np.repeat([0, 1], 30)
+    X[y == 1] += np.sin(np.linspace(0, 8 * np.pi, 256))[None, None, :, None]
+    series = to_series(X, sz=32)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = evaluate_baselines(series, y, DistanceCache(tmp_dir), n_splits=3, radius=4)
+    print(pd.DataFrame(results).groupby("model")[["score", "time", "pruned"]].mean())
@@ -8,6 +8,11 @@ from pathlib import Path
 
 class Util:
     """ユーティリティクラス"""
+    # ファイル名のタイムスタンプ形式
+    TIMESTAMP_FORMAT = "%Y-%m-%dT%H-%M-%S"
+    # ディレクトリごとのファイルカタログ（パス -> (ディレクトリのmtime, ファイル一覧, ディレクトリ一覧)）
+    _catalog_cache = {}
+
     @staticmethod
     def get_mac_address(interface: str = "wlan0") -> str:
         """MACアドレスを取得する関数"""
@@ -73,11 +78,69 @@ class Util:
         except Exception as e:
             raise e
 
+    @staticmethod
+    def parse_timestamp(file_name: str) -> datetime:
+        """ファイル名（「YYYY-MM-DDThh-mm-ss.拡張子」形式）から日時を取得する関数（形式が異なる場合はNone）"""
+        try:
+            return datetime.strptime(os.path.splitext(file_name)[0], Util.TIMESTAMP_FORMAT)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def scan_dir(path: str) -> tuple:
+        """
+        指定したパスをos.scandirで1度だけ走査し，ファイルカタログとディレクトリ名のリストを返す関数
+        （ディレクトリのmtimeが変わるまでは前回の結果を再利用する）
+        """
+        try:
+            path     = os.path.abspath(path)
+            dir_stat = os.stat(path).st_mtime_ns
+            cached   = Util._catalog_cache.get(path)
+            if cached is not None and cached[0] == dir_stat:
+                return cached[1], cached[2]
+            files, dirs = [], []
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files.append({
+                            "name"     : entry.name,
+                            "size"     : stat.st_size,
+                            "mtime"    : stat.st_mtime,
+                            "datetime" : Util.parse_timestamp(entry.name)
+                        })
+                    elif entry.is_dir():
+                        dirs.append(entry.name)
+            files.sort(key=lambda f: f["name"])
+            dirs.sort()
+            Util._catalog_cache[path] = (dir_stat, files, dirs)
+            return files, dirs
+        except Exception as e:
+            raise e
+
+    @staticmethod
+    def clear_catalog_cache(path: str = None) -> None:
+        """ファイルカタログのキャッシュを削除する関数（パスを省略すると全て削除）"""
+        if path is None:
+            Util._catalog_cache.clear()
+        else:
+            Util._catalog_cache.pop(os.path.abspath(path), None)
+
+    @staticmethod
+    def get_file_catalog(path: str, ext: str = "") -> list:
+        """指定したパス内のファイルカタログ（name, size, mtime, datetime）をファイル名順のリストで返す関数"""
+        try:
+            files, _ = Util.scan_dir(path)
+            return [f for f in files if f["name"].endswith(ext)]
+        except Exception as e:
+            raise e
+
     @staticmethod
     def get_dir_list(path: str) -> list:
         """指定したパス内のすべてのディレクトリ名をリストで返す関数"""
         try:
-            return sorted([d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))])
+            _, dirs = Util.scan_dir(path)
+            return list(dirs)
         except Exception as e:
             raise e
 
@@ -85,7 +148,7 @@ class Util:
     def get_file_name_list(path: str, ext: str) -> list:
         """指定したパス内のすべてのファイル名をリストで返す関数"""
         try:
-            return sorted([f for f in os.listdir(path) if f.endswith(ext) and os.path.isfile(os.path.join(path, f))])
+            return [f["name"] for f in Util.get_file_catalog(path, ext)]
         except Exception as e:
             raise e
 
@@ -113,15 +176,41 @@ class Util:
             raise e
 
     @staticmethod
-    def get_common_files(path_list:list) -> list:
+    def get_common_files(path_list:list, ext: str = "") -> list:
+        """全てのパスに共通して存在するファイル名をリストで返す関数"""
         try:
-            common_files = []
-            for i in range(len(path_list)):
-                if i == 0:
-                    common_files = set(Util.get_file_name_list(path_list[i], ""))
-                else:
-                    common_files = common_files & set(Util.get_file_name_list(path_list[i], ""))
-            return sorted(list(common_files))
+            common_files = None
+            for path in path_list:
+                names = {f["name"] for f in Util.get_file_catalog(path, ext)}
+                common_files = names if common_files is None else common_files & names
+            return sorted(common_files) if common_files else []
+        except Exception as e:
+            raise e
+
+    @staticmethod
+    def select_time_window(catalog: list, start=None, end=None) -> list:
+        """ファイルカタログから，ファイル名の日時が [start, end) に含まれるものを返す関数（日時はdatetimeまたは「YYYY-MM-DDThh-mm-ss」形式）"""
+        try:
+            if isinstance(start, str):
+                start = datetime.strptime(start, Util.TIMESTAMP_FORMAT)
+            if isinstance(end, str):
+                end = datetime.strptime(end, Util.TIMESTAMP_FORMAT)
+            return [
+                f for f in catalog
+                if f["datetime"] is not None
+                and (start is None or f["datetime"] >= start)
+                and (end is None or f["datetime"] < end)
+            ]
+        except Exception as e:
+            raise e
+
+    @staticmethod
+    def get_common_files_in_window(path_list: list, start=None, end=None, ext: str = "") -> list:
+        """全てのパスに共通して存在し，ファイル名の日時が [start, end) に含まれるファイル名をリストで返す関数"""
+        try:
+            common_files = set(Util.get_common_files(path_list, ext))
+            catalog      = Util.get_file_catalog(path_list[0], ext) if path_list else []
+            return [f["name"] for f in Util.select_time_window(catalog, start, end) if f["name"] in common_files]
         except Exception as e:
             raise e
 
@@ -157,9 +246,14 @@ if __name__ == "__main__":
         # アルファベットリストを取得
         print("Alphabet List: ", Util.get_alphabet_list(50))
         # 共通ファイルを取得
-        print("Common Files: ", Util.get_common_files(
+        print("Common Files: ", Util.get_common_files([
+            "/home/pi/minelab-agri-platform/minelab-iot-gateway/pcap/minelab-iot-nexmon-1",
+            "/home/pi/minelab-agri-platform/minelab-iot-gateway/pcap/minelab-iot-nexmon-2"
+        ]))
+        # 時間窓内の共通ファイルを取得
+        print("Common Files (Window): ", Util.get_common_files_in_window([
             "/home/pi/minelab-agri-platform/minelab-iot-gateway/pcap/minelab-iot-nexmon-1",
             "/home/pi/minelab-agri-platform/minelab-iot-gateway/pcap/minelab-iot-nexmon-2"
-        ))
+        ], start="2025-03-13T00-00-00", end="2025-03-14T00-00-00"))
     except Exception as e:
         print(e)
\ No newline at end of file
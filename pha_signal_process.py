@@ -0,0 +1,43 @@
+import json
+from tqdm import tqdm
+
+from lib import Util, ErrorHandler, ChunkedPhaSignalProcessor, DatasetCatalog
+
+# 定数
+chunksize = 10000
+
+if __name__ == "__main__":
+    try:
+        # 設定ファイルの読み込み
+        with open(f"{Util.get_root_dir()}/config/config.json", "r") as f:
+            config = json.load(f)
+
+        # データセットカタログから共通ファイルを取得
+        catalog = DatasetCatalog()
+        catalog.refresh(stages=["adjusted-data"])
+        common_file = catalog.common_files(stage="adjusted-data", kind="pha", devices=config["AllDevice"]["Pcap"])
+
+        # 各ファイルに対して信号処理を適用（未使用サブキャリア除去 → 位相アンラップ → 線形ドリフト除去 → PCA → STFT）
+        for field_device in sorted(config["AllDevice"]["Pcap"]):
+            for file_name in tqdm(common_file):
+                sp = ChunkedPhaSignalProcessor(
+                    path      = catalog.get_path("adjusted-data", field_device, file_name, kind="pha"),
+                    chunksize = config.get("PhaSignalProcess", {}).get("ChunkSize", chunksize)
+                )
+                sp.process(
+                    save_path    = catalog.get_path("preprocessed-data", field_device, file_name, kind="pha"),
+                    n_components = 1,
+                    column       = "PC1",
+                    fs           = 1.0,
+                    nperseg      = 128,
+                    noverlap     = 64
+                )
+
+        # 処理後のデータをカタログに登録
+        catalog.refresh(stages=["preprocessed-data"])
+        catalog.close()
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f"{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log")
+        handler.handle_error(e)
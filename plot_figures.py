@@ -0,0 +1,85 @@
+import os
+import json
+import matplotlib
+matplotlib.use("Agg")
+from lib import ErrorHandler, Util, DatasetCatalog, PlotEngine
+
+def spectrogram_jobs(catalog, devices: list, kind: str, doc_dir: str) -> list:
+    """信号処理後のスペクトログラムの図"""
+    return [
+        {"kind": "spectrogram", "sources": [catalog.get_path("preprocessed-data", device, file_name, kind=kind)],
+         "save_path": f"{doc_dir}/spectrogram/{device}/{kind}/{Util.remove_extension(file_name)}.png",
+         "title": f"Spectrogram of {device} {Util.remove_extension(file_name)}"}
+        for device in devices for file_name in catalog.common_files(stage="preprocessed-data", kind=kind, devices=devices)
+    ]
+
+def lineplot_jobs(catalog, devices: list, kind: str, doc_dir: str) -> list:
+    """信号処理後のデータの折れ線グラフ"""
+    return [
+        {"kind": "lineplot", "sources": [catalog.get_path("preprocessed-data", device, file_name, kind=kind)],
+         "save_path": f"{doc_dir}/lineplot/signal_process/{device}/{kind}/{Util.remove_extension(file_name)}.png",
+         "title": f"Signal Processed Data of {device} {Util.remove_extension(file_name)}"}
+        for device in devices for file_name in catalog.common_files(stage="preprocessed-data", kind=kind, devices=devices)
+    ]
+
+def timestd_jobs(catalog, devices: list, kind: str, doc_dir: str) -> list:
+    """時刻補正前・後のデバイス間の受信時刻の標準偏差の折れ線グラフ"""
+    file_names = sorted(set(catalog.common_files(stage="csv-data", kind=kind, devices=devices)) &
+                        set(catalog.common_files(stage="adjusted-data", kind=kind, devices=devices)))
+    return [
+        {"kind": "timestd", "labels": ["Before", "After"],
+         "sources": [catalog.get_path(stage, device, file_name, kind=kind) for stage in ["csv-data", "adjusted-data"] for device in devices],
+         "save_path": f"{doc_dir}/lineplot/adjust_time/{kind}/{Util.remove_extension(file_name)}.png",
+         "title": f"Standard Deviation of Received Time ({Util.remove_extension(file_name)})"}
+        for file_name in file_names
+    ]
+
+def heatmap_jobs(catalog, devices: list, kind: str, doc_dir: str) -> list:
+    """analyze_correlation.pyで保存した相関の累積値（日ごと・全期間）のヒートマップ"""
+    jobs = []
+    for device in devices:
+        result_dir = f"{catalog.data_dir}/analysis/correlation/{device}/{kind}"
+        for name in Util.get_file_name_list(path=result_dir, ext=".npz") if os.path.isdir(result_dir) else []:
+            jobs.append({"kind": "heatmap", "sources": [f"{result_dir}/{name}"],
+                         "save_path": f"{doc_dir}/heatmap/{device}/{kind}/{Util.remove_extension(name)}.png",
+                         "title": f"Correlation Coefficient Heatmap of {device} {Util.remove_extension(name)}"})
+    return jobs
+
+# 図の種類ごとのジョブの作成関数
+JOB_BUILDERS = {
+    "spectrogram": spectrogram_jobs,
+    "lineplot":    lineplot_jobs,
+    "timestd":     timestd_jobs,
+    "heatmap":     heatmap_jobs,
+}
+
+if __name__ == '__main__':
+    try:
+        # 設定ファイルの読み込み
+        with open(f'{Util.get_root_dir()}/config/config.json', 'r') as f:
+            config = json.load(f)
+
+        # 描画設定（作成する図の種類・データ種別，並列数）
+        plot_config = config.get("Plot", {})
+        doc_dir     = f"{Util.get_root_dir()}/documents"
+
+        with DatasetCatalog() as catalog:
+            catalog.refresh(stages=["csv-data", "adjusted-data", "preprocessed-data"])
+            jobs = [
+                job
+                for figure in plot_config.get("Figures", list(JOB_BUILDERS))
+                for kind in plot_config.get("Kinds", ["amp", "pha"])
+                for job in JOB_BUILDERS[figure](catalog, config["FieldDevice"]["Pcap"], kind, doc_dir)
+            ]
+
+        # 元データが更新された図のみを並列に描画
+        engine = PlotEngine(f"{doc_dir}/plot_manifest.json", max_workers=plot_config.get("MaxWorkers"))
+        result = engine.run(jobs)
+        print(f"描画: {result['plotted']}枚，スキップ: {result['skipped']}枚，失敗: {len(result['failed'])}枚")
+        for failure in result["failed"]:
+            print(f"⚠️ {failure['save_path']}: {failure['error']}")
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f'{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log')
+        handler.handle_error(e)
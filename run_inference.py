@@ -0,0 +1,121 @@
+import os
+import json
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from lib import ErrorHandler, Util, InferenceRunner, PcapTimeline, load_model
+
+def with_group(device: str, chunks, timelines: dict, margin: float = 0.01, follow: bool = False):
+    """
+    先頭デバイスのSampleSetのチャンクごとに，同じ受信時刻の範囲の他のデバイスのレコードを組にして
+    デバイス名 -> SampleSet の辞書を順に返すジェネレータ（デバイス間の行の対応付けはInferenceRunnerで行う）
+
+    最初のチャンクはmargin [s] だけ前から読み取り，以降は直前のチャンクの末尾の続きから読み取る．
+    """
+    last_us = None
+    for chunk in chunks:
+        if chunk.nsamples == 0:
+            continue
+        first_us = int(chunk.time_us[0]) - int(margin * 1e6) if last_us is None else last_us + 1
+        last_us  = int(chunk.time_us[-1])
+        group    = {device: chunk}
+        for other, timeline in timelines.items():
+            if follow:
+                # 追記中のファイルの追加分を反映
+                timeline.refresh()
+            group[other] = timeline.read_range(first_us / 1e6, last_us / 1e6, absolute=True)
+        yield group
+
+def run_timeline(bundle: dict, devices: list, inference_config: dict) -> list:
+    """
+    先頭デバイスの連続したPCAPファイルを1つの時系列として，途切れのない区間（セグメント）ごとに推論し，区間ごとの遅延のレポートを返す
+
+    ファイルの境界では窓を区切らず，推論結果は区間の先頭のファイル名で保存する（受信時間は先頭ファイルからの相対時間）．
+    他のデバイスは区間と同じ受信時刻の範囲のレコードを組にする．
+    """
+    timelines = {device: PcapTimeline(f"{Util.get_root_dir()}/data/pcap-data/{device}", max_gap=inference_config.get("MaxGap", 1.0)) for device in devices}
+    save_dir  = f"{Util.get_root_dir()}/data/predictions/{devices[0]}"
+    if not all(timeline.files for timeline in timelines.values()):
+        # PCAPファイルがないデバイスを含む組はスキップ
+        return []
+
+    reports  = []
+    segments = timelines[devices[0]].segments
+    for i, segment in enumerate(segments):
+        save_path = f"{save_dir}/{Util.remove_extension(file_name=segment['file'])}.csv"
+        # 推論済みの区間はスキップ（末尾の区間は後続のファイルで延びるため再推論）
+        if os.path.exists(save_path) and i < len(segments) - 1:
+            continue
+        runner = InferenceRunner(bundle, batch_size=inference_config.get("BatchSize", 64), devices=devices, alpha=inference_config.get("Alpha", 0.01))
+        chunks = timelines[devices[0]].iter_chunks(chunk_records=inference_config.get("ChunkRecords", 1024), segment=i)
+        runner.run(with_group(devices[0], chunks, {device: timelines[device] for device in devices[1:]}, margin=runner.alpha), save_path=save_path)
+        reports.append({"device": devices[0], "file": segment["file"], "records": segment["stop"] - segment["start"]} | runner.latency_report())
+    return reports
+
+def run_device(decoder, bundle: dict, devices: list, inference_config: dict) -> list:
+    """
+    先頭デバイスのPCAPファイルを順に推論し，ファイルごとの遅延のレポートを返す
+
+    他のデバイスはファイルの各チャンクと同じ受信時刻の範囲のレコードを組にする．
+    """
+    pcap_dir  = f"{Util.get_root_dir()}/data/pcap-data/{devices[0]}"
+    save_dir  = f"{Util.get_root_dir()}/data/predictions/{devices[0]}"
+    follow    = inference_config.get("Follow", False)
+    timelines = {device: PcapTimeline(f"{Util.get_root_dir()}/data/pcap-data/{device}") for device in devices[1:]}
+    if not all(timeline.files for timeline in timelines.values()):
+        # PCAPファイルがないデバイスを含む組はスキップ
+        return []
+    filenames = Util.get_file_name_list(path=pcap_dir, ext='.pcap')
+    if follow:
+        # 追記中の最新のファイルのみを追跡
+        filenames = filenames[-1:]
+    else:
+        # 推論済みのファイルはスキップ
+        filenames = [name for name in filenames if not os.path.exists(f"{save_dir}/{Util.remove_extension(file_name=name)}.csv")]
+
+    reports = []
+    for filename in filenames:
+        runner = InferenceRunner(bundle, batch_size=inference_config.get("BatchSize", 64), devices=devices, alpha=inference_config.get("Alpha", 0.01),
+                                 track_lag=follow)
+        chunks = decoder.iter_pcap(
+            pcap_filepath = f"{pcap_dir}/{filename}",
+            chunk_records = inference_config.get("ChunkRecords", 1024),
+            follow        = follow,
+            poll_interval = inference_config.get("PollInterval", 1.0),
+            idle_timeout  = inference_config.get("IdleTimeout", 60.0)
+        )
+        runner.run(with_group(devices[0], chunks, timelines, margin=runner.alpha, follow=follow),
+                   save_path=f"{save_dir}/{Util.remove_extension(file_name=filename)}.csv")
+        reports.append({"device": devices[0], "file": filename} | runner.latency_report())
+    return reports
+
+if __name__ == '__main__':
+    try:
+        # 設定ファイルの読み込み
+        with open(f'{Util.get_root_dir()}/config/config.json', 'r') as f:
+            config = json.load(f)
+
+        # 推論設定（モデルのパス，マイクロバッチの窓数，1チャンクのレコード数，追記の追跡，ファイルの連結）
+        inference_config = config["Inference"]
+        bundle           = load_model(f"{Util.get_root_dir()}/{inference_config['Model']}")
+        stitch           = inference_config.get("Stitch", False) and not inference_config.get("Follow", False)
+
+        # 1デバイスで学習したモデルは指定したデバイスごとに，複数デバイスで学習したモデルは学習時のデバイスの組で推論
+        if len(bundle["devices"]) == 1:
+            groups = [[device] for device in inference_config.get("Devices", config["AllDevice"]["Pcap"])]
+        else:
+            groups = [inference_config.get("Devices", bundle["devices"])]
+        if not groups or not groups[0]:
+            raise ValueError("推論するデバイスがありません")
+
+        # デバイス（の組）ごとに並行して推論
+        decoder = importlib.import_module("lib.interleaved")
+        with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            run = (lambda devices: run_timeline(bundle, devices, inference_config)) if stitch else (lambda devices: run_device(decoder, bundle, devices, inference_config))
+            for reports in executor.map(run, groups):
+                for report in reports:
+                    print(report)
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f'{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log')
+        handler.handle_error(e)
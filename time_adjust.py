@@ -0,0 +1,50 @@
+import json
+from tqdm import tqdm
+
+from lib import Util, ErrorHandler, ChunkedTimeAdjuster, DatasetCatalog
+
+# 定数
+alpha      = 0.01
+file_types = ["amp", "pha"] # 振幅・位相（同じ受信時刻の列から同じ行が選ばれるため，位相も同じ規則で補正）
+chunksize  = 10000
+
+if __name__ == "__main__":
+    try:
+        # 設定ファイルの読み込み
+        with open(f"{Util.get_root_dir()}/config/config.json", "r") as f:
+            config = json.load(f)
+
+        group1_devices = ["minelab-iot-nexmon-1", "minelab-iot-nexmon-2", "minelab-iot-nexmon-3", "minelab-iot-nexmon-4"]
+        group2_devices = ["minelab-iot-nexmon-a", "minelab-iot-nexmon-b"]
+
+        # データセットカタログの更新
+        catalog = DatasetCatalog()
+        catalog.refresh(stages=["csv-data"])
+
+        # グループごとに保存先を分ける
+        for group_devices, save_stage in [
+            (group1_devices, "adjusted-data"),
+            (group2_devices, "adjusted-data-natori")
+        ]:
+            for file_type in file_types:
+                # グループ内の共通ファイル
+                common_files = catalog.common_files(stage="csv-data", kind=file_type, devices=group_devices)
+                for file_name in tqdm(common_files):
+                    # 時刻補正処理（チャンク単位で読み込み・保存）
+                    ta = ChunkedTimeAdjuster(
+                        path_dict = {device: catalog.get_path("csv-data", device, file_name, kind=file_type) for device in group_devices},
+                        alpha     = alpha,
+                        chunksize = config.get("TimeAdjust", {}).get("ChunkSize", chunksize)
+                    )
+                    ta.adjust_time(
+                        save_path_dict = {device: catalog.get_path(save_stage, device, file_name, kind=file_type) for device in group_devices}
+                    )
+
+        # 補正後のデータをカタログに登録
+        catalog.refresh(stages=["adjusted-data", "adjusted-data-natori"])
+        catalog.close()
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f"{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log")
+        handler.handle_error(e)
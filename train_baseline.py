@@ -0,0 +1,45 @@
+import json
+import pandas as pd
+from lib import ErrorHandler, Util, DatasetCatalog, CSIWindowDataset, DistanceCache, dataset_to_series, evaluate_baselines
+
+if __name__ == '__main__':
+    try:
+        # 設定ファイルの読み込み
+        with open(f"{Util.get_root_dir()}/config/config.json") as f:
+            config = json.load(f)
+
+        # ベースラインの設定（ラベル: ファイル名 -> ラベル，窓長・移動量 [行]，系列長，DTWの窓幅，分割数，並列数）
+        baseline_config = config["Baseline"]
+        labels          = baseline_config["Labels"]
+        kind            = baseline_config.get("Kind", "amp")
+        devices         = sorted(config["AllDevice"]["Pcap"])
+
+        with DatasetCatalog() as catalog:
+            catalog.refresh(stages=["adjusted-data"])
+            # ラベルが付いている共通ファイルの窓を時系列に変換
+            file_names = [name for name in catalog.common_files(stage="adjusted-data", kind=kind, devices=devices) if name in labels]
+            dataset    = CSIWindowDataset(
+                file_dict = {name: {device: catalog.get_path("adjusted-data", device, name, kind=kind) for device in devices} for name in file_names},
+                cache_dir = f'{Util.get_root_dir()}/data/cache/adjusted-data/{kind}',
+                window    = baseline_config.get("Window", 256),
+                stride    = baseline_config.get("Stride", 128),
+                labels    = labels
+            )
+        series, y = dataset_to_series(dataset, sz=baseline_config.get("Size", 64))
+
+        # 距離行列をキャッシュしながら各モデルを交差検証
+        results = evaluate_baselines(
+            series, y,
+            cache    = DistanceCache(f'{Util.get_root_dir()}/data/baseline/distance-cache'),
+            n_splits = baseline_config.get("NSplits", 5),
+            radius   = baseline_config.get("Radius", 8),
+            n_jobs   = baseline_config.get("NJobs", 1)
+        )
+        results = pd.DataFrame(results)
+        results.to_csv(f'{Util.get_root_dir()}/data/baseline/{kind}.csv', index=False)
+        print(results.groupby("model")[["score", "time", "pruned"]].mean())
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f'{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log')
+        handler.handle_error(e)
@@ -0,0 +1,33 @@
+import json
+from tqdm import tqdm
+from lib import AWSHandler, ErrorHandler, Util
+
+if __name__ == '__main__':
+    try:
+        # 設定ファイルの読み込み
+        with open(f"{Util.get_root_dir()}/config/config.json") as f:
+            config = json.load(f)
+
+        # アップロード設定（対象の処理段階・同時送信数・シャードにまとめるファイルの大きさ [byte]）
+        upload_config   = config.get("Upload", {})
+        transfer_config = config.get("Transfer", {})
+
+        # AWSハンドラを初期化（リージョン・バケット・接続設定は "AWS"，ローカルスタブは "Transfer" セクションから取得）
+        aws_handler = AWSHandler.from_config(config)
+
+        for stage in upload_config.get("Stages", ["preprocessed-data"]):
+            for all_device in tqdm(Util.get_dir_list(path=f'{Util.get_root_dir()}/data/{stage}')):
+                # 処理済みのデータをアップロード（変更のないファイルはスキップ）
+                result = aws_handler.upload_s3_objects(
+                    local_path      = f'{Util.get_root_dir()}/data/{stage}/{all_device}/', # ローカルパス
+                    remote_path     = f'projects/csi/{stage}/{all_device}/',               # S3のプレフィックス
+                    ext             = upload_config.get("Ext", ""),
+                    max_concurrency = transfer_config.get("MaxConcurrency", 8),
+                    shard_threshold = upload_config.get("ShardThreshold", 0)
+                )
+                print(f"{stage}/{all_device}: {len(result['uploaded'])} 件送信，{len(result['skipped'])} 件スキップ")
+
+    except Exception as e:
+        # エラーハンドラを初期化
+        handler = ErrorHandler(log_file=f'{Util.get_root_dir()}/log/{Util.get_exec_file_name()}.log')
+        handler.handle_error(e)
\ No newline at end of file